@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
+    # Solo para desarrollo; en producción se usa gunicorn (wsgi.py y gunicorn.conf.py)
     app.run(debug=True, host='0.0.0.0') # debug=True para desarrollo, host para Docker
\ No newline at end of file
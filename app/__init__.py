@@ -39,6 +39,7 @@ def create_app():
     from app.routes.waiter_orders import waiter_orders_bp # Importar la blueprint de pedidos de meseros
     from app.routes.cashier_routes import cashier_bp # Importar el blueprint del cajero
     from app.routes.admin_reports import admin_reports_bp # Importar el blueprint de reportes
+    from app.routes.waiter_api import waiter_api_bp # API JSON del cliente móvil del mesero
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(admin_branches_bp, url_prefix='/admin/branches') # Registrar la blueprint con su propio prefijo
     app.register_blueprint(admin_products_bp, url_prefix='/admin') # Registrar la nueva Blueprint con un prefijo /admin
@@ -46,6 +47,31 @@ def create_app():
     app.register_blueprint(waiter_orders_bp, url_prefix='/waiter/orders') # Registrar la blueprint de meseros
     app.register_blueprint(cashier_bp, url_prefix='/cashier') # Registrar el blueprint del cajero
     app.register_blueprint(admin_reports_bp, url_prefix='/admin') # Registrar el blueprint de reportes
+    app.register_blueprint(waiter_api_bp, url_prefix='/api/v1/waiter') # API JSON versionada
+
+    # Límites de la caché de reportes según la configuración
+    from app.utils.report_cache import cache_reportes
+    cache_reportes.configurar(app.config['REPORT_CACHE_MAX_BYTES'], app.config['REPORT_CACHE_MAX_ENTRY_BYTES'])
+
+    # Máximo de dashboards conectados a los eventos en vivo
+    from app.utils.events import bus_eventos
+    bus_eventos.configurar(app.config['SSE_MAX_CONNECTIONS'])
+
+    # Vigencia del usuario autenticado en caché (load_user)
+    from app.utils.principal import cache_principales
+    cache_principales.configurar(app.config['PRINCIPAL_TTL_SECONDS'], app.config['PRINCIPAL_CHECK_SECONDS'])
+
+    # Métricas de los pools de conexiones y sesión de lectura en la réplica (reportes)
+    from app.utils.db_routing import registrar_enrutamiento
+    registrar_enrutamiento(app)
+
+    # Conteo de sentencias SQL por petición para las pantallas con presupuesto de consultas
+    from app.utils.query_budget import registrar_presupuesto_consultas
+    registrar_presupuesto_consultas(app)
+
+    # Comandos de mantenimiento (flask rebuild-sales-summary, ...)
+    from app.commands import register_commands
+    register_commands(app)
     
 
     # Ruta por defecto para redirigir al login
@@ -54,61 +80,23 @@ def create_app():
         from flask import redirect, url_for
         return redirect(url_for('auth.login'))
 
-    with app.app_context():
-        # Importa los nuevos modelos para que db.create_all() los considere
-        from app.models.user import Role, User
-        from app.models.branch import Sede, Mesa # Importa los modelos de sede y mesa
-        from app.models.product import CategoriaProducto, Producto
-        from app.models.inventory import Inventario # Importar el modelo de Inventario
-        from app.models.order import Pedido, DetallePedido # Importar los modelos de Pedido y DetallePedido
-        from app.models.payment import Pago # Importar el modelo Pago
-
-        db.create_all() # Crea las tablas si no existen
-
-        # Asegúrarde que los roles existan
-        if not Role.query.filter_by(nombre_rol='Administrador').first():
-            db.session.add(Role(nombre_rol='Administrador'))
-            db.session.add(Role(nombre_rol='Cajero'))
-            db.session.add(Role(nombre_rol='Mesero'))
-            db.session.commit()
-        # Buscar si el usuario admin ya existe
-        admin_user = User.query.filter_by(nombre_usuario='admin').first()
-        admin_role = Role.query.filter_by(nombre_rol='Administrador').first()
-
-        # Datos correctos de seguridad
-        pregunta_correcta = '¿Cual es el nombre del proyecto?'
-        respuesta_correcta = 'bars'  # La respuesta será "bars"
-
-        if admin_role:
-            if not admin_user:
-                # CASO 1: El admin no existe, lo creamos desde cero
-                print(">>> Creando usuario Admin por primera vez...")
-                new_admin = User(
-                    nombre_usuario='admin',
-                    nombre_completo='Administrador Principal',
-                    id_rol=admin_role.id_rol,
-                    id_sede=None,
-                    pregunta_seguridad=pregunta_correcta
-                )
-                new_admin.set_password('admin123')
-                new_admin.set_security_answer(respuesta_correcta) # Python genera el hash aquí
-                db.session.add(new_admin)
-            else:
-                # CASO 2: El admin YA existe, corregimos sus datos
-                print(">>> Corrigiendo datos de seguridad del Admin existente...")
-                admin_user.pregunta_seguridad = pregunta_correcta # 
-                admin_user.set_security_answer(respuesta_correcta) # Regenera el hash válido
-                db.session.add(admin_user)
-            
-            db.session.commit()
-            
-    return app
+    # Registra todos los modelos (las relaciones y "flask init-db" los necesitan). Arrancar no
+    # crea tablas ni escribe datos: eso lo hace "flask init-db" una sola vez por despliegue.
+    from app.models.user import Role, User
+    from app.models.branch import Sede, Mesa # Importa los modelos de sede y mesa
+    from app.models.product import CategoriaProducto, Producto
+    from app.models.inventory import Inventario # Importar el modelo de Inventario
+    from app.models.order import Pedido, DetallePedido, VersionPedidosSede # Pedidos, sus líneas y el sello de pedidos por sede
+    from app.models.payment import Pago # Importar el modelo Pago
+    from app.models.sales_summary import ResumenVentaDiaria, VersionVentasDia # Resumen diario de ventas y su sello
+    from app.models.idempotency import ClaveIdempotencia # Operaciones ya aplicadas (sincronización offline)
+    from app.models.cash_drawer import TurnoCaja, DenominacionCaja # Caja de efectivo por turno
 
+    return app
 
-from app.models.user import User
 
 @login_manager.user_loader
 def load_user(user_id):
-    # Carga el usuario y precarga la relación 'sede'
-    # Esto evitará el AttributeError al acceder a current_user.sede
-    return User.query.options(db.joinedload(User.sede)).get(int(user_id))
\ No newline at end of file
+    # Principal compacto (id, rol, sede, nombre) en caché: sin consultas en la mayoría de peticiones
+    from app.utils.principal import cache_principales
+    return cache_principales.obtener(int(user_id))
\ No newline at end of file
@@ -0,0 +1,83 @@
+# app/commands.py
+# Comandos de consola (flask <comando>) para tareas de mantenimiento.
+
+from datetime import datetime
+
+import click
+
+
+def _parse_fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+
+def register_commands(app):
+
+    @app.cli.command('rebuild-sales-summary')
+    @click.option('--desde', help='Primer día a reconstruir (YYYY-MM-DD). Por defecto, todo el histórico.')
+    @click.option('--hasta', help='Último día a reconstruir (YYYY-MM-DD).')
+    def rebuild_sales_summary(desde, hasta):
+        """Recalcula Resumen_Ventas_Diarias a partir de los pedidos pagados."""
+        from app.utils.sales_summary import reconstruir_resumen
+        filas = reconstruir_resumen(_parse_fecha(desde), _parse_fecha(hasta))
+        click.echo(f'>>> Resumen de ventas reconstruido: {filas} filas.')
+
+    @app.cli.command('rebuild-inventory-value')
+    def rebuild_inventory_value():
+        """Verifica el valor acumulado del inventario de cada sede contra la suma en SQL y lo corrige."""
+        from app import db
+        from app.models.branch import Sede
+        from app.utils.inventory import recalcular_valor_inventario
+        for sede in Sede.query.order_by(Sede.id_sede).all():
+            anterior, nuevo = recalcular_valor_inventario(sede.id_sede)
+            estado = 'OK' if anterior == nuevo else f'corregido (antes {anterior})'
+            click.echo(f'>>> {sede.nombre_sede}: {nuevo:.2f} {estado}')
+        db.session.commit()
+
+    @app.cli.command('purge-idempotency-keys')
+    @click.option('--dias', default=7, show_default=True, help='Conservar las claves de los últimos N días.')
+    def purge_idempotency_keys(dias):
+        """Elimina de Claves_Idempotencia las operaciones sincronizadas hace más de N días."""
+        from app.utils.sync import purgar_claves
+        click.echo(f'>>> Claves de idempotencia eliminadas: {purgar_claves(dias)}')
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Crea el esquema con las migraciones pendientes y siembra roles y admin (idempotente)."""
+        from app import db
+        from app.migrations import aplicar_pendientes
+        from app.seed import sembrar_datos_iniciales
+        # Sin create_all: las migraciones son la única fuente del esquema (app/migrations)
+        aplicadas = aplicar_pendientes(db.engine, eco=click.echo)
+        sembrar_datos_iniciales(eco=click.echo)
+        click.echo(f'>>> Base de datos lista ({len(aplicadas)} migraciones aplicadas).')
+
+    @app.cli.command('migrate-db')
+    def migrate_db():
+        """Aplica las migraciones del esquema pendientes (app/migrations)."""
+        from app import db
+        from app.migrations import aplicar_pendientes
+        aplicadas = aplicar_pendientes(db.engine, eco=click.echo)
+        click.echo(f'>>> Migraciones aplicadas: {len(aplicadas)}')
+
+    @app.cli.command('migrate-status')
+    def migrate_status():
+        """Lista las migraciones del esquema y si ya están aplicadas."""
+        from app import db
+        from app.migrations import MIGRACIONES, pendientes
+        faltan = {m.VERSION for m in pendientes(db.engine)}
+        for migracion in MIGRACIONES:
+            estado = 'pendiente' if migracion.VERSION in faltan else 'aplicada'
+            click.echo(f'{migracion.VERSION}  {estado:<9}  {migracion.DESCRIPCION}')
+
+    @app.cli.command('explain-check')
+    @click.option('--permitir-tabla', 'tablas', multiple=True,
+                  help='Tabla (repetible) en la que un índice posible pero no usado solo advierte.')
+    @click.option('--permitir-tablas-pequenas', is_flag=True,
+                  help='Solo advertir cuando el plan no usa un índice posible (base con pocos datos).')
+    def explain_check(tablas, permitir_tablas_pequenas):
+        """Verifica con EXPLAIN que las consultas críticas usan sus índices; termina con error si alguna no."""
+        from app.migrations.explain import verificar_planes
+        fallas = verificar_planes(eco=click.echo, tablas_permitidas=set(tablas),
+                                  permitir_tablas_pequenas=permitir_tablas_pequenas)
+        if fallas:
+            raise click.ClickException(f'{len(fallas)} consulta(s) sin su índice: {", ".join(fallas)}')
@@ -0,0 +1,77 @@
+# app/migrations/__init__.py
+# Migraciones del esquema: la única fuente del esquema. "flask init-db" (base nueva) y
+# "flask migrate-db" (base existente) aplican las mismas, en orden, desde m0000 (tablas base).
+# Toda tabla, columna o índice nuevo del modelo necesita su migración; init.sql se mantiene
+# igual solo como referencia para el contenedor de MySQL.
+#
+# Cada migración es un módulo mNNNN_<nombre>.py con VERSION, DESCRIPCION y aplicar(conexion).
+# Las aplicadas se registran en Migraciones_Esquema. Las migraciones deben ser idempotentes
+# (crear una tabla o un índice solo si no existe): en una base creada con init.sql ya están
+# los cambios y la migración solo queda registrada.
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.migrations import (
+    m0000_esquema_base,
+    m0001_indice_pedidos_activos,
+    m0002_indices_consultas_frecuentes,
+    m0003_version_sesion_usuarios,
+    m0004_valor_inventario_y_menu,
+    m0005_resumen_ventas,
+    m0006_caja,
+    m0007_claves_idempotencia,
+    m0008_version_pedidos_sede,
+    m0009_version_pedidos,
+    m0010_rellenar_resumen_ventas,
+)
+
+# En orden de aplicación
+MIGRACIONES = [
+    m0000_esquema_base,
+    m0001_indice_pedidos_activos,
+    m0002_indices_consultas_frecuentes,
+    m0003_version_sesion_usuarios,
+    m0004_valor_inventario_y_menu,
+    m0005_resumen_ventas,
+    m0006_caja,
+    m0007_claves_idempotencia,
+    m0008_version_pedidos_sede,
+    m0009_version_pedidos,
+    m0010_rellenar_resumen_ventas,
+]
+
+_CREAR_TABLA_VERSIONES = text(
+    'CREATE TABLE IF NOT EXISTS Migraciones_Esquema ('
+    ' version VARCHAR(10) NOT NULL PRIMARY KEY,'
+    ' descripcion VARCHAR(150) NOT NULL,'
+    ' fecha_aplicada DATETIME NOT NULL)'
+)
+
+
+def versiones_aplicadas(conexion):
+    conexion.execute(_CREAR_TABLA_VERSIONES)
+    return {fila.version for fila in conexion.execute(text('SELECT version FROM Migraciones_Esquema'))}
+
+
+def pendientes(engine):
+    with engine.begin() as conexion:
+        aplicadas = versiones_aplicadas(conexion)
+    return [m for m in MIGRACIONES if m.VERSION not in aplicadas]
+
+
+def aplicar_pendientes(engine, eco=print):
+    """Aplica en orden las migraciones no registradas; cada una en su propia transacción."""
+    aplicadas = []
+    for migracion in pendientes(engine):
+        eco(f'>>> Aplicando {migracion.VERSION}: {migracion.DESCRIPCION}')
+        # En MySQL el DDL hace commit implícito: el registro va después, si la migración terminó
+        with engine.begin() as conexion:
+            migracion.aplicar(conexion)
+            conexion.execute(
+                text('INSERT INTO Migraciones_Esquema (version, descripcion, fecha_aplicada) VALUES (:v, :d, :f)'),
+                {'v': migracion.VERSION, 'd': migracion.DESCRIPCION, 'f': datetime.utcnow()}
+            )
+        aplicadas.append(migracion.VERSION)
+    return aplicadas
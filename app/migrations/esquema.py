@@ -0,0 +1,43 @@
+# app/migrations/esquema.py
+# Utilidades de DDL idempotente para las migraciones.
+
+from sqlalchemy import text
+
+
+def indice_existe(conexion, tabla, nombre):
+    return conexion.execute(text(
+        'SELECT COUNT(*) FROM information_schema.statistics '
+        'WHERE table_schema = DATABASE() AND table_name = :tabla AND index_name = :nombre'
+    ), {'tabla': tabla, 'nombre': nombre}).scalar() > 0
+
+
+def crear_indice_si_no_existe(conexion, tabla, nombre, columnas):
+    """
+    Agrega el índice solo si no existe (MySQL no tiene CREATE INDEX IF NOT EXISTS). Se crea en
+    línea (ALGORITHM=INPLACE, LOCK=NONE): la tabla sigue aceptando lecturas y escrituras
+    mientras se construye; si MySQL no puede hacerlo así, falla en vez de bloquear la tabla.
+    """
+    if indice_existe(conexion, tabla, nombre):
+        return False
+    conexion.execute(text(
+        f'ALTER TABLE `{tabla}` ADD INDEX `{nombre}` ({", ".join(f"`{c}`" for c in columnas)}), '
+        'ALGORITHM=INPLACE, LOCK=NONE'
+    ))
+    return True
+
+
+def columna_existe(conexion, tabla, nombre):
+    return conexion.execute(text(
+        'SELECT COUNT(*) FROM information_schema.columns '
+        'WHERE table_schema = DATABASE() AND table_name = :tabla AND column_name = :nombre'
+    ), {'tabla': tabla, 'nombre': nombre}).scalar() > 0
+
+
+def agregar_columna_si_no_existe(conexion, tabla, nombre, definicion):
+    """Agrega la columna solo si no existe, en línea como los índices (ALGORITHM=INPLACE, LOCK=NONE)."""
+    if columna_existe(conexion, tabla, nombre):
+        return False
+    conexion.execute(text(
+        f'ALTER TABLE `{tabla}` ADD COLUMN `{nombre}` {definicion}, ALGORITHM=INPLACE, LOCK=NONE'
+    ))
+    return True
@@ -0,0 +1,142 @@
+# app/migrations/explain.py
+# Verificación de los planes de ejecución (EXPLAIN) de las consultas críticas.
+#
+# Cada verificación arma la consulta real de la aplicación, la compila para MySQL y revisa que
+# el plan use el índice esperado y no recorra la tabla completa (type = ALL). En tablas casi
+# vacías MySQL puede preferir recorrer la tabla aunque el índice exista: también es una falla,
+# salvo que se permita para esa tabla o para todas (base de desarrollo con pocos datos).
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+
+from app import db
+
+
+def _pedido_abierto():
+    from app.utils.payments import consulta_pedido_abierto
+    return consulta_pedido_abierto(1).limit(1)
+
+
+def _mesas_ocupadas():
+    from app.utils.payments import consulta_mesas_ocupadas
+    return consulta_mesas_ocupadas(1)
+
+
+def _mesas_libres():
+    # Como waiter_dashboard y la API /tables
+    from app.models.branch import Mesa
+    return Mesa.query.filter_by(id_sede=1, estado='libre')
+
+
+def _pedidos_del_mesero():
+    # Como waiter_dashboard
+    from app.models.order import Pedido
+    return Pedido.query.options(joinedload(Pedido.mesa)).filter_by(id_usuario_mesero=1, estado='pendiente')
+
+
+def _pedidos_abiertos_api():
+    # Como /api/v1/waiter/orders
+    from app.models.order import Pedido
+    return Pedido.query.filter(Pedido.estado.in_(['pendiente', 'en_preparacion']), Pedido.id_usuario_mesero == 1)\
+        .order_by(Pedido.fecha_creacion)
+
+
+def _menu_sede():
+    from app.utils.menu_cache import consulta_menu
+    return consulta_menu(1)
+
+
+def _menor_stock():
+    from app.utils.inventory import consulta_menor_stock
+    return consulta_menor_stock(1, 10)
+
+
+def _rango_reporte():
+    hasta = datetime(2025, 1, 31, 23, 59, 59)
+    return hasta - timedelta(days=30), hasta
+
+
+def _reporte_detalle():
+    from app.utils.reports import consulta_detalle_ventas
+    return consulta_detalle_ventas(*_rango_reporte(), None)
+
+
+def _reporte_por_dia():
+    from app.utils.reports import TIPOS_REPORTE
+    return TIPOS_REPORTE['por_dia'][1](*_rango_reporte(), None)
+
+
+def _turno_abierto():
+    # Como turno_abierto (en cada pago en efectivo)
+    from app.models.cash_drawer import TurnoCaja
+    return TurnoCaja.query.filter_by(id_usuario_cajero=1, estado='abierto').limit(1)
+
+
+def _claves_a_purgar():
+    # Las filas que borra purgar_claves
+    from app.models.idempotency import ClaveIdempotencia
+    return db.session.query(ClaveIdempotencia.clave).filter(ClaveIdempotencia.fecha < datetime(2025, 1, 1))
+
+
+# (nombre, constructor de la consulta, tabla, índice esperado)
+VERIFICACIONES = [
+    ('pedido abierto de una mesa', _pedido_abierto, 'Pedidos', 'idx_Pedidos_mesa_estado_fecha'),
+    ('dashboard del cajero', _mesas_ocupadas, 'Pedidos', 'idx_Pedidos_mesa_estado_fecha'),
+    ('mesas ocupadas de la sede', _mesas_ocupadas, 'Mesas', 'idx_Mesas_sede_estado'),
+    ('mesas libres del mesero', _mesas_libres, 'Mesas', 'idx_Mesas_sede_estado'),
+    ('pedidos del mesero', _pedidos_del_mesero, 'Pedidos', 'idx_Pedidos_mesero_estado'),
+    ('pedidos abiertos (API)', _pedidos_abiertos_api, 'Pedidos', 'idx_Pedidos_mesero_estado'),
+    ('menú de la sede', _menu_sede, 'Inventario', 'idx_Inventario_sede_bloqueado_cantidad'),
+    ('menor stock de la sede', _menor_stock, 'Inventario', 'idx_Inventario_sede_bloqueado_cantidad'),
+    ('reporte de detalle', _reporte_detalle, 'Pedidos', 'idx_Pedidos_estado_fecha'),
+    ('reporte por día', _reporte_por_dia, 'Pedidos', 'idx_Pedidos_estado_fecha'),
+    ('turno abierto del cajero', _turno_abierto, 'Turnos_Caja', 'idx_Turnos_Caja_cajero_estado'),
+    ('purga de claves de idempotencia', _claves_a_purgar, 'Claves_Idempotencia', 'idx_Claves_Idempotencia_fecha'),
+]
+
+
+def plan(query):
+    """Filas de EXPLAIN para una consulta de SQLAlchemy (ORM o Core)."""
+    stmt = getattr(query, 'statement', query)
+    sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [dict(fila._mapping) for fila in db.session.execute(text(f'EXPLAIN {sql}'))]
+
+
+def verificar_planes(eco=print, tablas_permitidas=(), permitir_tablas_pequenas=False):
+    """
+    Ejecuta las verificaciones; devuelve la lista de fallas (vacía si todo usa sus índices).
+
+    Si el índice es posible pero el plan no lo eligió (típico de una tabla casi vacía), cuenta
+    como falla salvo que la tabla esté en tablas_permitidas o permitir_tablas_pequenas sea True;
+    en ese caso se informa como advertencia.
+    """
+    fallas = []
+    for nombre, construir, tabla, indice in VERIFICACIONES:
+        filas = [f for f in plan(construir()) if f.get('table') == tabla]
+        if not filas:
+            eco(f'FALLA       {nombre}: {tabla} no aparece en el plan')
+            fallas.append(nombre)
+            continue
+        usados = {f.get('key') for f in filas}
+        recorre = any(f.get('type') == 'ALL' for f in filas)
+        posibles = set()
+        for f in filas:
+            posibles.update((f.get('possible_keys') or '').split(','))
+        if indice in usados and not recorre:
+            eco(f'OK          {nombre}: {tabla} usa {indice}')
+        elif indice in usados:
+            eco(f'FALLA       {nombre}: {tabla} usa {indice} pero el plan también la recorre completa (type ALL)')
+            fallas.append(nombre)
+        elif indice in posibles and (permitir_tablas_pequenas or tabla in tablas_permitidas):
+            eco(f'ADVERTENCIA {nombre}: {tabla} podría usar {indice} pero el plan eligió {usados - {None} or "recorrerla"} '
+                '(permitido para tablas pequeñas)')
+        elif indice in posibles:
+            eco(f'FALLA       {nombre}: {tabla} podría usar {indice} pero el plan eligió {usados - {None} or "recorrerla"} '
+                '(con pocos datos, usar --permitir-tabla o --permitir-tablas-pequenas)')
+            fallas.append(nombre)
+        else:
+            eco(f'FALLA       {nombre}: {indice} no aparece en el plan de {tabla} (claves: {usados - {None} or "ninguna"})')
+            fallas.append(nombre)
+    return fallas
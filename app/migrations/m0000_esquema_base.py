@@ -0,0 +1,182 @@
+# Esquema inicial de la aplicación (las tablas de init.sql antes de las migraciones). En una
+# base nueva crea todo; en una existente no cambia nada (CREATE TABLE IF NOT EXISTS) y solo
+# queda registrada. Las migraciones siguientes agregan índices, columnas y tablas.
+
+from sqlalchemy import text
+
+VERSION = '0000'
+DESCRIPCION = 'Esquema base: usuarios, sedes, mesas, productos, inventario, pedidos y pagos'
+
+# En orden: cada tabla después de las que referencia
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Roles` (
+      `id_rol` INT NOT NULL AUTO_INCREMENT,
+      `nombre_rol` VARCHAR(45) NOT NULL,
+      PRIMARY KEY (`id_rol`),
+      UNIQUE INDEX `nombre_rol_UNIQUE` (`nombre_rol` ASC))
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Sedes` (
+      `id_sede` INT NOT NULL AUTO_INCREMENT,
+      `nombre_sede` VARCHAR(45) NOT NULL UNIQUE,
+      PRIMARY KEY (`id_sede`))
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Usuarios` (
+      `id_usuario` INT NOT NULL AUTO_INCREMENT,
+      `nombre_usuario` VARCHAR(45) NOT NULL,
+      `contrasena` VARCHAR(255) NOT NULL,
+      `nombre_completo` VARCHAR(45) NOT NULL,
+      `id_rol` INT NOT NULL,
+      `id_sede` INT NULL,
+      `pregunta_seguridad` VARCHAR(150) NULL,
+      `respuesta_seguridad` VARCHAR(255) NULL,
+      PRIMARY KEY (`id_usuario`),
+      UNIQUE INDEX `nombre_usuario_UNIQUE` (`nombre_usuario` ASC),
+      INDEX `fk_Usuarios_Roles_idx` (`id_rol` ASC),
+      INDEX `fk_Usuarios_Sedes1_idx` (`id_sede` ASC),
+      CONSTRAINT `fk_Usuarios_Roles`
+        FOREIGN KEY (`id_rol`)
+        REFERENCES `Roles` (`id_rol`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Usuarios_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Mesas` (
+      `id_mesa` INT NOT NULL AUTO_INCREMENT,
+      `estado` VARCHAR(45) NOT NULL DEFAULT 'libre',
+      `id_sede` INT NOT NULL,
+      PRIMARY KEY (`id_mesa`),
+      INDEX `fk_Mesas_Sedes1_idx` (`id_sede` ASC),
+      CONSTRAINT `fk_Mesas_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Categorias_Producto` (
+      `id_categoria` INT NOT NULL AUTO_INCREMENT,
+      `nombre` VARCHAR(45) NOT NULL,
+      `descripcion` VARCHAR(100) NULL,
+      PRIMARY KEY (`id_categoria`),
+      UNIQUE INDEX `nombre_UNIQUE` (`nombre` ASC))
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Productos` (
+      `id_producto` INT NOT NULL AUTO_INCREMENT,
+      `codigo` VARCHAR(45) NULL UNIQUE,
+      `nombre` VARCHAR(100) NOT NULL,
+      `descripcion` VARCHAR(100) NULL,
+      `costo_compra` DECIMAL(10,2) NOT NULL,
+      `precio_venta` DECIMAL(10,2) NOT NULL,
+      `id_categoria` INT NOT NULL,
+      PRIMARY KEY (`id_producto`),
+      INDEX `fk_Productos_Categorias_Producto1_idx` (`id_categoria` ASC),
+      CONSTRAINT `fk_Productos_Categorias_Producto1`
+        FOREIGN KEY (`id_categoria`)
+        REFERENCES `Categorias_Producto` (`id_categoria`)
+        ON DELETE RESTRICT
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Inventario` (
+      `id_inventario` INT NOT NULL AUTO_INCREMENT,
+      `cantidad` INT NOT NULL DEFAULT 0,
+      `esta_bloqueado` TINYINT(1) NOT NULL DEFAULT 0,
+      `id_producto` INT NOT NULL,
+      `id_sede` INT NOT NULL,
+      PRIMARY KEY (`id_inventario`),
+      UNIQUE INDEX `_producto_sede_uc` (`id_producto` ASC, `id_sede` ASC),
+      INDEX `fk_Inventario_Productos1_idx` (`id_producto` ASC),
+      INDEX `fk_Inventario_Sedes1_idx` (`id_sede` ASC),
+      CONSTRAINT `fk_Inventario_Productos1`
+        FOREIGN KEY (`id_producto`)
+        REFERENCES `Productos` (`id_producto`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Inventario_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Pedidos` (
+      `id_pedido` INT NOT NULL AUTO_INCREMENT,
+      `estado` VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+      `total_pedido` DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+      `fecha_creacion` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      `id_usuario_mesero` INT NOT NULL,
+      `id_mesa` INT NOT NULL,
+      PRIMARY KEY (`id_pedido`),
+      INDEX `fk_Pedidos_Usuarios1_idx` (`id_usuario_mesero` ASC),
+      INDEX `fk_Pedidos_Mesas1_idx` (`id_mesa` ASC),
+      CONSTRAINT `fk_Pedidos_Usuarios1`
+        FOREIGN KEY (`id_usuario_mesero`)
+        REFERENCES `Usuarios` (`id_usuario`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Pedidos_Mesas1`
+        FOREIGN KEY (`id_mesa`)
+        REFERENCES `Mesas` (`id_mesa`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Detalle_Pedido` (
+      `id_detalle_pedido` INT NOT NULL AUTO_INCREMENT,
+      `cantidad` INT NOT NULL,
+      `precio_unitario` DECIMAL(10,2) NOT NULL,
+      `costo_unitario` DECIMAL(10,2) NOT NULL,
+      `subtotal` DECIMAL(10,2) NOT NULL,
+      `id_pedido` INT NOT NULL,
+      `id_producto` INT NOT NULL,
+      PRIMARY KEY (`id_detalle_pedido`),
+      INDEX `fk_Detalle_Pedido_Pedidos1_idx` (`id_pedido` ASC),
+      INDEX `fk_Detalle_Pedido_Productos1_idx` (`id_producto` ASC),
+      CONSTRAINT `fk_Detalle_Pedido_Pedidos1`
+        FOREIGN KEY (`id_pedido`)
+        REFERENCES `Pedidos` (`id_pedido`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Detalle_Pedido_Productos1`
+        FOREIGN KEY (`id_producto`)
+        REFERENCES `Productos` (`id_producto`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Pagos` (
+      `id_pago` INT NOT NULL AUTO_INCREMENT,
+      `monto_pago` DECIMAL(10,2) NOT NULL,
+      `metodo_pago` VARCHAR(45) NOT NULL,
+      `fecha_hora_pago` DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+      `id_pedido` INT NOT NULL,
+      `id_usuario_cajero` INT NOT NULL,
+      PRIMARY KEY (`id_pago`),
+      INDEX `fk_Pagos_Pedidos1_idx` (`id_pedido` ASC),
+      INDEX `fk_Pagos_Usuarios1_idx` (`id_usuario_cajero` ASC),
+      CONSTRAINT `fk_Pagos_Pedidos1`
+        FOREIGN KEY (`id_pedido`)
+        REFERENCES `Pedidos` (`id_pedido`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Pagos_Usuarios1`
+        FOREIGN KEY (`id_usuario_cajero`)
+        REFERENCES `Usuarios` (`id_usuario`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
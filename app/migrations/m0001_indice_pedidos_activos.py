@@ -0,0 +1,12 @@
+# Índice del pedido abierto de cada mesa, usado por el dashboard del cajero y por
+# view_order_for_payment. Sin él, buscar el pedido abierto recorre todo el histórico de la mesa.
+
+from app.migrations.esquema import crear_indice_si_no_existe
+
+VERSION = '0001'
+DESCRIPCION = 'Índice Pedidos (id_mesa, estado, fecha_creacion, total_pedido)'
+
+
+def aplicar(conexion):
+    crear_indice_si_no_existe(conexion, 'Pedidos', 'idx_Pedidos_mesa_estado_fecha',
+                              ['id_mesa', 'estado', 'fecha_creacion', 'total_pedido'])
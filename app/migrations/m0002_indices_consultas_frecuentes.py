@@ -0,0 +1,24 @@
+# Índices de las consultas frecuentes de meseros, cajeros y reportes:
+#   Mesas (id_sede, estado)                      mesas libres/ocupadas de una sede
+#   Pedidos (id_usuario_mesero, estado)          pedidos abiertos del mesero (dashboard y API)
+#   Pedidos (estado, fecha_creacion)             reportes de pedidos pagados por rango de fechas
+#   Inventario (id_sede, esta_bloqueado, cantidad)  menú disponible de la sede
+#   Inventario (id_sede, cantidad)               inventario por stock; bases anteriores a este índice
+
+from app.migrations.esquema import crear_indice_si_no_existe
+
+VERSION = '0002'
+DESCRIPCION = 'Índices de mesas por sede, pedidos por mesero y fecha, e inventario del menú'
+
+INDICES = [
+    ('Mesas', 'idx_Mesas_sede_estado', ['id_sede', 'estado']),
+    ('Pedidos', 'idx_Pedidos_mesero_estado', ['id_usuario_mesero', 'estado']),
+    ('Pedidos', 'idx_Pedidos_estado_fecha', ['estado', 'fecha_creacion']),
+    ('Inventario', 'idx_Inventario_sede_bloqueado_cantidad', ['id_sede', 'esta_bloqueado', 'cantidad']),
+    ('Inventario', 'idx_Inventario_sede_cantidad', ['id_sede', 'cantidad']),
+]
+
+
+def aplicar(conexion):
+    for tabla, nombre, columnas in INDICES:
+        crear_indice_si_no_existe(conexion, tabla, nombre, columnas)
@@ -0,0 +1,12 @@
+# Sello por usuario que aumenta al cambiar su rol, sede o contraseña. La caché de usuarios
+# autenticados (app/utils/principal.py) lo compara cada PRINCIPAL_CHECK_SECONDS, así un cambio
+# hecho en un proceso de gunicorn invalida el usuario en caché de todos los demás.
+
+from app.migrations.esquema import agregar_columna_si_no_existe
+
+VERSION = '0003'
+DESCRIPCION = 'Columna Usuarios.version_sesion'
+
+
+def aplicar(conexion):
+    agregar_columna_si_no_existe(conexion, 'Usuarios', 'version_sesion', 'INT NOT NULL DEFAULT 0')
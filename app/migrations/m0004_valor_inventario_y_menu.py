@@ -0,0 +1,38 @@
+# Valor acumulado del inventario por sede (panel del administrador) y sello del menú por sede
+# (caché del menú de los meseros, app/utils/menu_cache.py).
+
+from sqlalchemy import text
+
+VERSION = '0004'
+DESCRIPCION = 'Tablas Valor_Inventario_Sede y Version_Menu_Sede'
+
+# En orden: cada tabla después de las que referencia
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Valor_Inventario_Sede` (
+      `id_sede` INT NOT NULL,
+      `valor` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+      PRIMARY KEY (`id_sede`),
+      CONSTRAINT `fk_Valor_Inventario_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Version_Menu_Sede` (
+      `id_sede` INT NOT NULL,
+      `version` BIGINT NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id_sede`),
+      CONSTRAINT `fk_Version_Menu_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
@@ -0,0 +1,52 @@
+# Resumen diario de ventas por sede y producto (reportes sin recorrer los pedidos) y sello de
+# ventas por día y sede (caché de reportes, app/utils/report_cache.py).
+
+from sqlalchemy import text
+
+VERSION = '0005'
+DESCRIPCION = 'Tablas Resumen_Ventas_Diarias y Version_Ventas_Dia'
+
+# En orden: cada tabla después de las que referencia
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Resumen_Ventas_Diarias` (
+      `fecha` DATE NOT NULL,
+      `id_sede` INT NOT NULL,
+      `id_producto` INT NOT NULL,
+      `cantidad` INT NOT NULL DEFAULT 0,
+      `ventas` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+      `costo` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+      `ganancia` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+      PRIMARY KEY (`fecha`, `id_sede`, `id_producto`),
+      INDEX `fk_Resumen_Ventas_Sedes1_idx` (`id_sede` ASC),
+      INDEX `fk_Resumen_Ventas_Productos1_idx` (`id_producto` ASC),
+      CONSTRAINT `fk_Resumen_Ventas_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Resumen_Ventas_Productos1`
+        FOREIGN KEY (`id_producto`)
+        REFERENCES `Productos` (`id_producto`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Version_Ventas_Dia` (
+      `fecha` DATE NOT NULL,
+      `id_sede` INT NOT NULL,
+      `version` INT NOT NULL DEFAULT 0,
+      PRIMARY KEY (`fecha`, `id_sede`),
+      INDEX `fk_Version_Ventas_Dia_Sedes1_idx` (`id_sede` ASC),
+      CONSTRAINT `fk_Version_Ventas_Dia_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
@@ -0,0 +1,49 @@
+# Turnos de caja del cajero y existencias por denominación (cálculo de la devuelta).
+
+from sqlalchemy import text
+
+VERSION = '0006'
+DESCRIPCION = 'Tablas Turnos_Caja y Caja_Denominaciones'
+
+# En orden: cada tabla después de las que referencia
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Turnos_Caja` (
+      `id_turno` INT NOT NULL AUTO_INCREMENT,
+      `estado` VARCHAR(10) NOT NULL DEFAULT 'abierto',
+      `fecha_apertura` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      `fecha_cierre` DATETIME NULL,
+      `id_usuario_cajero` INT NOT NULL,
+      `id_sede` INT NULL,
+      PRIMARY KEY (`id_turno`),
+      INDEX `idx_Turnos_Caja_cajero_estado` (`id_usuario_cajero` ASC, `estado` ASC),
+      INDEX `fk_Turnos_Caja_Sedes1_idx` (`id_sede` ASC),
+      CONSTRAINT `fk_Turnos_Caja_Usuarios1`
+        FOREIGN KEY (`id_usuario_cajero`)
+        REFERENCES `Usuarios` (`id_usuario`)
+        ON DELETE NO ACTION
+        ON UPDATE NO ACTION,
+      CONSTRAINT `fk_Turnos_Caja_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE SET NULL
+        ON UPDATE NO ACTION)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `Caja_Denominaciones` (
+      `id_turno` INT NOT NULL,
+      `valor` INT NOT NULL,
+      `cantidad` INT NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id_turno`, `valor`),
+      CONSTRAINT `fk_Caja_Denominaciones_Turnos1`
+        FOREIGN KEY (`id_turno`)
+        REFERENCES `Turnos_Caja` (`id_turno`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
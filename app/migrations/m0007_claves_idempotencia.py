@@ -0,0 +1,31 @@
+# Claves de idempotencia de los pagos y de la cola offline del mesero (app/utils/sync.py).
+
+from sqlalchemy import text
+
+VERSION = '0007'
+DESCRIPCION = 'Tabla Claves_Idempotencia'
+
+# En orden: cada tabla después de las que referencia
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Claves_Idempotencia` (
+      `clave` VARCHAR(64) NOT NULL,
+      `tipo` VARCHAR(30) NOT NULL,
+      `resultado` TEXT NULL,
+      `fecha` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      `id_usuario` INT NOT NULL,
+      PRIMARY KEY (`clave`),
+      INDEX `idx_Claves_Idempotencia_fecha` (`fecha` ASC),
+      INDEX `fk_Claves_Idempotencia_Usuarios1_idx` (`id_usuario` ASC),
+      CONSTRAINT `fk_Claves_Idempotencia_Usuarios1`
+        FOREIGN KEY (`id_usuario`)
+        REFERENCES `Usuarios` (`id_usuario`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
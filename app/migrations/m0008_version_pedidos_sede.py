@@ -0,0 +1,26 @@
+# Sello de las mesas y pedidos abiertos por sede: los dashboards de meseros y cajeros lo
+# consultan para saber si otro proceso cambió su panel (app/utils/events.py).
+
+from sqlalchemy import text
+
+VERSION = '0008'
+DESCRIPCION = 'Tabla Version_Pedidos_Sede'
+
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS `Version_Pedidos_Sede` (
+      `id_sede` INT NOT NULL,
+      `version` BIGINT NOT NULL DEFAULT 0,
+      PRIMARY KEY (`id_sede`),
+      CONSTRAINT `fk_Version_Pedidos_Sedes1`
+        FOREIGN KEY (`id_sede`)
+        REFERENCES `Sedes` (`id_sede`)
+        ON DELETE CASCADE
+        ON UPDATE NO ACTION)
+    """,
+]
+
+
+def aplicar(conexion):
+    for ddl in TABLAS:
+        conexion.execute(text(ddl))
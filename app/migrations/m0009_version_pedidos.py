@@ -0,0 +1,11 @@
+# Versión de fila de cada pedido: aumenta al añadirle líneas y al cobrarlo. Es el ETag del
+# detalle del pedido en la API del mesero (app/routes/waiter_api.py).
+
+from app.migrations.esquema import agregar_columna_si_no_existe
+
+VERSION = '0009'
+DESCRIPCION = 'Columna Pedidos.version'
+
+
+def aplicar(conexion):
+    agregar_columna_si_no_existe(conexion, 'Pedidos', 'version', 'INT NOT NULL DEFAULT 0')
@@ -0,0 +1,31 @@
+# Rellena Resumen_Ventas_Diarias con el histórico: m0005 creó la tabla vacía y los pagos solo
+# suman al resumen desde entonces, así que los reportes de días anteriores salían en cero.
+# Recalcula todo desde los pedidos pagados (lo mismo que "flask rebuild-sales-summary" sin
+# fechas), así que repetirla no duplica nada, y sube los sellos de ventas para que ningún
+# proceso siga sirviendo reportes en caché calculados antes del relleno.
+
+from sqlalchemy import text
+
+VERSION = '0010'
+DESCRIPCION = 'Relleno de Resumen_Ventas_Diarias con los pedidos pagados'
+
+SENTENCIAS = [
+    'DELETE FROM `Resumen_Ventas_Diarias`',
+    """
+    INSERT INTO `Resumen_Ventas_Diarias` (`fecha`, `id_sede`, `id_producto`, `cantidad`, `ventas`, `costo`, `ganancia`)
+    SELECT DATE(p.`fecha_creacion`), m.`id_sede`, d.`id_producto`,
+           SUM(d.`cantidad`), SUM(d.`subtotal`), SUM(d.`cantidad` * d.`costo_unitario`),
+           SUM(d.`subtotal`) - SUM(d.`cantidad` * d.`costo_unitario`)
+    FROM `Pedidos` p
+    JOIN `Detalle_Pedido` d ON d.`id_pedido` = p.`id_pedido`
+    JOIN `Mesas` m ON m.`id_mesa` = p.`id_mesa`
+    WHERE p.`estado` = 'pagado'
+    GROUP BY DATE(p.`fecha_creacion`), m.`id_sede`, d.`id_producto`
+    """,
+    'UPDATE `Version_Ventas_Dia` SET `version` = `version` + 1',
+]
+
+
+def aplicar(conexion):
+    for sentencia in SENTENCIAS:
+        conexion.execute(text(sentencia))
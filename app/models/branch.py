@@ -17,5 +17,10 @@ class Mesa(db.Model):
     estado = db.Column(db.String(45), default='libre', nullable=False) # 'libre', 'ocupada', etc.
     id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede'), nullable=False)
 
+    __table_args__ = (
+        # Mesas libres u ocupadas de una sede (dashboards de mesero y cajero)
+        db.Index('idx_Mesas_sede_estado', 'id_sede', 'estado'),
+    )
+
     def __repr__(self):
         return f'<Mesa {self.id_mesa} (Sede: {self.id_sede}) - {self.estado}>'
\ No newline at end of file
@@ -0,0 +1,40 @@
+from app import db
+from datetime import datetime
+
+# Importar modelos relacionados para las FK
+from app.models.user import User
+from app.models.branch import Sede
+
+
+class TurnoCaja(db.Model):
+    """Turno de un cajero con su caja de efectivo. Un cajero tiene a lo sumo un turno abierto."""
+    __tablename__ = 'Turnos_Caja'
+    id_turno = db.Column(db.Integer, primary_key=True)
+    estado = db.Column(db.String(10), nullable=False, default='abierto') # 'abierto' o 'cerrado'
+    fecha_apertura = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fecha_cierre = db.Column(db.DateTime, nullable=True)
+    id_usuario_cajero = db.Column(db.Integer, db.ForeignKey('Usuarios.id_usuario'), nullable=False)
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede'), nullable=True)
+
+    # Relaciones
+    cajero = db.relationship('User', lazy=True)
+    denominaciones = db.relationship('DenominacionCaja', backref='turno', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Turno abierto del cajero (en cada pago en efectivo)
+        db.Index('idx_Turnos_Caja_cajero_estado', 'id_usuario_cajero', 'estado'),
+    )
+
+    def __repr__(self):
+        return f'<TurnoCaja {self.id_turno} - Cajero: {self.id_usuario_cajero} - {self.estado}>'
+
+
+class DenominacionCaja(db.Model):
+    """Cantidad de billetes o monedas de una denominación en la caja de un turno."""
+    __tablename__ = 'Caja_Denominaciones'
+    id_turno = db.Column(db.Integer, db.ForeignKey('Turnos_Caja.id_turno', ondelete='CASCADE'), primary_key=True)
+    valor = db.Column(db.Integer, primary_key=True) # Ej: 2000, 5000
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DenominacionCaja Turno: {self.id_turno} ${self.valor} x {self.cantidad}>'
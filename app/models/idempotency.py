@@ -0,0 +1,26 @@
+from app import db
+from datetime import datetime
+
+# Importar el modelo relacionado para la FK
+from app.models.user import User
+
+
+class ClaveIdempotencia(db.Model):
+    """
+    Operaciones ya aplicadas, identificadas por una clave generada en el cliente. Si la misma
+    operación llega otra vez (reintento, cola offline reenviada) se devuelve el resultado guardado.
+    """
+    __tablename__ = 'Claves_Idempotencia'
+    clave = db.Column(db.String(64), primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False) # Ej: 'crear_pedido', 'agregar_lineas'
+    resultado = db.Column(db.Text, nullable=True) # JSON con el resultado de la operación
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('Usuarios.id_usuario', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        # Para purgar las claves antiguas
+        db.Index('idx_Claves_Idempotencia_fecha', 'fecha'),
+    )
+
+    def __repr__(self):
+        return f'<ClaveIdempotencia {self.clave} - {self.tipo} - Usuario: {self.id_usuario}>'
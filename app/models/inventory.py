@@ -15,7 +15,33 @@ class Inventario(db.Model):
     id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede'), nullable=False)
 
     # Combinación única de producto y sede para evitar duplicados en el inventario de una sede
-    __table_args__ = (db.UniqueConstraint('id_producto', 'id_sede', name='_producto_sede_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('id_producto', 'id_sede', name='_producto_sede_uc'),
+        # Índice para listar el inventario de una sede ordenado por stock (manage_inventory)
+        db.Index('idx_Inventario_sede_cantidad', 'id_sede', 'cantidad'),
+        # Menú disponible de una sede: no bloqueados y con stock (construir_menu)
+        db.Index('idx_Inventario_sede_bloqueado_cantidad', 'id_sede', 'esta_bloqueado', 'cantidad'),
+    )
 
     def __repr__(self):
-        return f'<Inventario Producto: {self.id_producto} Sede: {self.id_sede} Cantidad: {self.cantidad} Bloqueado: {self.esta_bloqueado}>'
\ No newline at end of file
+        return f'<Inventario Producto: {self.id_producto} Sede: {self.id_sede} Cantidad: {self.cantidad} Bloqueado: {self.esta_bloqueado}>'
+
+
+class ValorInventarioSede(db.Model):
+    """Costo total del inventario de cada sede (SUM(cantidad * costo_compra)), mantenido con cada cambio de stock o de costo."""
+    __tablename__ = 'Valor_Inventario_Sede'
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede', ondelete='CASCADE'), primary_key=True)
+    valor = db.Column(db.Numeric(14, 2), nullable=False, default=0.00)
+
+    def __repr__(self):
+        return f'<ValorInventarioSede Sede: {self.id_sede} Valor: {self.valor}>'
+
+
+class VersionMenuSede(db.Model):
+    """Sello de versión del menú disponible de cada sede; aumenta con cada cambio de stock o de precio."""
+    __tablename__ = 'Version_Menu_Sede'
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionMenuSede Sede: {self.id_sede} Version: {self.version}>'
\ No newline at end of file
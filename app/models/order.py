@@ -15,12 +15,22 @@ class Pedido(db.Model):
     fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     id_usuario_mesero = db.Column(db.Integer, db.ForeignKey('Usuarios.id_usuario'), nullable=False)
     id_mesa = db.Column(db.Integer, db.ForeignKey('Mesas.id_mesa'), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0) # Aumenta al añadir líneas y al cobrar (ETag de la API)
 
     # Relaciones
     mesero = db.relationship('User', backref='pedidos_realizados', lazy=True)
     mesa = db.relationship('Mesa', backref=db.backref('pedidos', lazy=True, cascade='all, delete-orphan'))
     detalles = db.relationship('DetallePedido', backref='pedido', lazy='dynamic', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Pedido abierto de cada mesa (dashboard del cajero); incluye el total para no leer la fila
+        db.Index('idx_Pedidos_mesa_estado_fecha', 'id_mesa', 'estado', 'fecha_creacion', 'total_pedido'),
+        # Pedidos abiertos de un mesero (dashboard del mesero y API)
+        db.Index('idx_Pedidos_mesero_estado', 'id_usuario_mesero', 'estado'),
+        # Pedidos pagados por rango de fechas (reportes)
+        db.Index('idx_Pedidos_estado_fecha', 'estado', 'fecha_creacion'),
+    )
+
     def __repr__(self):
         return f'<Pedido {self.id_pedido} - Mesa {self.id_mesa} - Estado: {self.estado}>'
 
@@ -38,4 +48,14 @@ class DetallePedido(db.Model):
     producto = db.relationship('Producto', backref='detalle_pedidos', lazy=True)
 
     def __repr__(self):
-        return f'<DetallePedido {self.id_detalle_pedido} - Pedido: {self.id_pedido} - Producto: {self.id_producto}>'
\ No newline at end of file
+        return f'<DetallePedido {self.id_detalle_pedido} - Pedido: {self.id_pedido} - Producto: {self.id_producto}>'
+
+
+class VersionPedidosSede(db.Model):
+    """Sello de versión de las mesas y pedidos abiertos de cada sede; aumenta con cada pedido abierto, línea añadida, cobro o cambio de mesas."""
+    __tablename__ = 'Version_Pedidos_Sede'
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionPedidosSede Sede: {self.id_sede} Version: {self.version}>'
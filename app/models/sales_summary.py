@@ -0,0 +1,35 @@
+from app import db
+
+# Importar modelos relacionados para las FK
+from app.models.branch import Sede
+from app.models.product import Producto
+
+
+class ResumenVentaDiaria(db.Model):
+    """Ventas acumuladas por día, sede y producto. Se actualiza al registrar cada pago."""
+    __tablename__ = 'Resumen_Ventas_Diarias'
+    fecha = db.Column(db.Date, primary_key=True) # Día de creación del pedido (misma referencia que los reportes)
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede'), primary_key=True)
+    id_producto = db.Column(db.Integer, db.ForeignKey('Productos.id_producto'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas = db.Column(db.Numeric(14, 2), nullable=False, default=0.00)
+    costo = db.Column(db.Numeric(14, 2), nullable=False, default=0.00)
+    ganancia = db.Column(db.Numeric(14, 2), nullable=False, default=0.00)
+
+    # Relaciones
+    sede = db.relationship('Sede', lazy=True)
+    producto = db.relationship('Producto', lazy=True)
+
+    def __repr__(self):
+        return f'<ResumenVentaDiaria {self.fecha} Sede: {self.id_sede} Producto: {self.id_producto} Cantidad: {self.cantidad}>'
+
+
+class VersionVentasDia(db.Model):
+    """Sello de las ventas de un día y sede: aumenta con cada pago (valida la caché de reportes de todos los procesos)."""
+    __tablename__ = 'Version_Ventas_Dia'
+    fecha = db.Column(db.Date, primary_key=True)
+    id_sede = db.Column(db.Integer, db.ForeignKey('Sedes.id_sede'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionVentasDia {self.fecha} Sede: {self.id_sede} v{self.version}>'
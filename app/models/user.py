@@ -24,6 +24,8 @@ class User(UserMixin, db.Model):
      # --- RECUPERACIÓN ---
     pregunta_seguridad = db.Column(db.String(150), nullable=True) # pregunta de seguridad
     respuesta_seguridad = db.Column(db.String(255), nullable=True) # Hash de la respuesta
+    # Aumenta al cambiar rol, sede o contraseña: invalida el usuario en caché de todos los procesos
+    version_sesion = db.Column(db.Integer, nullable=False, default=0)
     
     sede = db.relationship('Sede', backref='usuarios', lazy=True) # relacion con sede
 
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models.branch import Sede, Mesa
 from app import db
+from app.utils.events import incrementar_version_pedidos # Los dashboards ven las mesas nuevas o eliminadas
 
 # Blueprint
 admin_branches_bp = Blueprint('admin_branches', __name__, template_folder='../templates/admin')
@@ -56,6 +57,7 @@ def create_branch():
             for _ in range(num_mesas):
                 mesa = Mesa(id_sede=new_sede.id_sede, estado='libre')
                 db.session.add(mesa)
+            incrementar_version_pedidos(new_sede.id_sede)
 
             db.session.commit()
             flash('Sede y mesas creadas exitosamente.', 'success')
@@ -104,6 +106,8 @@ def edit_branch(branch_id):
                 mesas_a_eliminar = sede.mesas.order_by(Mesa.id_mesa.desc()).limit(current_num_mesas - new_num_mesas).all()
                 for mesa in mesas_a_eliminar:
                     db.session.delete(mesa)
+            if new_num_mesas != current_num_mesas:
+                incrementar_version_pedidos(sede.id_sede)
 
             db.session.commit()
             flash('Sede y mesas actualizadas exitosamente.', 'success')
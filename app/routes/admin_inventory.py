@@ -1,12 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from app.models.inventory import Inventario # modelo de Inventario
 from app.models.product import Producto # Necesario para listar productos disponibles
 from app.models.branch import Sede # Necesario para la sede específica
 from app import db
-from sqlalchemy import exc
-from app.utils.algorithms import ordenar_inventario_por_stock, calcular_valor_inventario_recursivo #Recursivo
-from app.utils.algorithms import recomendar_reabastecimiento # Mochila
+from sqlalchemy import exc, or_, and_
+from sqlalchemy.orm import joinedload
+from app.utils.restock import candidatos_sede, planificar_sede, planificar_todas # Mochila acotada por sede
+from app.utils.inventory import obtener_valor_inventario, ajustar_valor_por_stock, consulta_menor_stock, bloquear_item_inventario
+from app.utils.menu_cache import incrementar_version_menu # Sello del menú disponible de la sede
+
+# Items por página en la vista de inventario y tamaño del panel de menor stock
+INVENTARIO_POR_PAGINA = 50
+TOP_MENOR_STOCK = 10
 
 admin_inventory_bp = Blueprint('admin_inventory', __name__, template_folder='../templates/admin')
 
@@ -27,50 +33,88 @@ def optimize_restock(sede_id):
     resultado_items = []
     ganancia_maxima = 0
     presupuesto = 0
+    dias_historial = request.form.get('dias_historial', 30, type=int)
+    dias_cobertura = request.form.get('dias_cobertura', 7, type=int)
 
     if request.method == 'POST':
         presupuesto = request.form.get('presupuesto', type=int)
-        
-        # Obtenemos productos candidatos (ej: todos los productos del sistema)
-        productos = Producto.query.all()
-        lista_candidatos = []
-        
-        for p in productos:
-            # Definimos:
-            # Costo (Peso en la mochila) = costo_compra
-            # Valor (Ganancia en la mochila) = precio_venta - costo_compra
-            ganancia = float(p.precio_venta) - float(p.costo_compra)
-            
-            if ganancia > 0: # Solo consideramos productos rentables
-                lista_candidatos.append({
-                    'id': p.id_producto,
-                    'nombre': p.nombre,
-                    'costo': int(p.costo_compra),
-                    'ganancia': int(ganancia)
-                })
-        
-        # EJECUTAR ALGORITMO DE LA MOCHILA
-        resultado_items, ganancia_maxima = recomendar_reabastecimiento(presupuesto, lista_candidatos)
+        if not presupuesto or presupuesto <= 0 or dias_historial <= 0 or dias_cobertura <= 0:
+            flash('El presupuesto y los días deben ser números positivos.', 'danger')
+            return redirect(url_for('admin_inventory.optimize_restock', sede_id=sede_id))
+
+        # Candidatos: productos de ESTA sede, con la cantidad que falta para cubrir la demanda esperada
+        # Costo (Peso en la mochila) = costo_compra por unidad
+        # Valor (Ganancia en la mochila) = precio_venta - costo_compra por unidad
+        lista_candidatos = candidatos_sede(sede_id, dias_historial, dias_cobertura)
+
+        # EJECUTAR ALGORITMO DE LA MOCHILA ACOTADA
+        resultado_items, ganancia_maxima = planificar_sede(
+            presupuesto, lista_candidatos, granularidad=current_app.config['RESTOCK_GRANULARIDAD']
+        )
 #-------------------------------------------------------------------------------------------------------
 
-    return render_template('optimize_restock.html', sede=sede, items=resultado_items, ganancia=ganancia_maxima, presupuesto=presupuesto)
+    return render_template('optimize_restock.html', sede=sede, items=resultado_items, ganancia=ganancia_maxima, presupuesto=presupuesto,
+                           dias_historial=dias_historial, dias_cobertura=dias_cobertura)
+
+@admin_inventory_bp.route('/optimize/all', methods=['GET', 'POST'])
+def optimize_restock_all():
+    sedes = Sede.query.order_by(Sede.nombre_sede).all()
+    planes = []
+    presupuesto = 0
+    dias_historial = request.form.get('dias_historial', 30, type=int)
+    dias_cobertura = request.form.get('dias_cobertura', 7, type=int)
+
+    if request.method == 'POST':
+        presupuesto = request.form.get('presupuesto', type=int)
+        if not presupuesto or presupuesto <= 0 or dias_historial <= 0 or dias_cobertura <= 0:
+            flash('El presupuesto y los días deben ser números positivos.', 'danger')
+            return redirect(url_for('admin_inventory.optimize_restock_all'))
+
+        # Las consultas se hacen aquí; la optimización de cada sede corre en su propio proceso
+        candidatos = {sede.id_sede: candidatos_sede(sede.id_sede, dias_historial, dias_cobertura) for sede in sedes}
+        resultados = planificar_todas(presupuesto, candidatos, granularidad=current_app.config['RESTOCK_GRANULARIDAD'],
+                                      max_workers=current_app.config['RESTOCK_WORKERS'])
+        planes = [(sede, *resultados[sede.id_sede]) for sede in sedes]
+
+    return render_template('optimize_restock_all.html', planes=planes, presupuesto=presupuesto,
+                           dias_historial=dias_historial, dias_cobertura=dias_cobertura)
 
 @admin_inventory_bp.route('/<int:sede_id>')
 def manage_inventory(sede_id):
     sede = Sede.query.get_or_404(sede_id)
-    
-    # Traemos TODO sin ordenar por SQL
-    inventario_query = Inventario.query.filter_by(id_sede=sede_id).all()
+
+    # Paginación por cursor (keyset): la página siguiente empieza después del último
+    # (cantidad, id_inventario) mostrado, así MySQL recorre el índice (id_sede, cantidad)
+    # sin OFFSET y el costo por página no crece con el tamaño del catálogo
+    despues_cantidad = request.args.get('despues_cantidad', type=int)
+    despues_id = request.args.get('despues_id', type=int)
+
+    query = Inventario.query.options(
+        joinedload(Inventario.producto).joinedload(Producto.categoria) # Producto y categoría en la misma consulta
+    ).filter(Inventario.id_sede == sede_id)
+    if despues_cantidad is not None and despues_id is not None:
+        query = query.filter(or_(
+            Inventario.cantidad > despues_cantidad,
+            and_(Inventario.cantidad == despues_cantidad, Inventario.id_inventario > despues_id)
+        ))
+    # Pedimos una fila de más para saber si hay página siguiente
+    inventario = query.order_by(Inventario.cantidad, Inventario.id_inventario).limit(INVENTARIO_POR_PAGINA + 1).all()
+    siguiente = None
+    if len(inventario) > INVENTARIO_POR_PAGINA:
+        inventario = inventario[:INVENTARIO_POR_PAGINA]
+        siguiente = {'despues_cantidad': inventario[-1].cantidad, 'despues_id': inventario[-1].id_inventario}
+
 #----------------------------------------------------------------------------------------------------
-    # 1. ALGORITMO ITERATIVO: Bubble Sort
-    # Ordenamos para ver primero los productos con menos stock
-    inventario_ordenado = ordenar_inventario_por_stock(inventario_query)
-    
-    # 2. ALGORITMO RECURSIVO: Valor Total
-    valor_total_sede = calcular_valor_inventario_recursivo(inventario_ordenado, len(inventario_ordenado))
-    
+    # Los productos disponibles con menos stock de toda la sede: MySQL lee las primeras k
+    # entradas de idx_Inventario_sede_bloqueado_cantidad (ORDER BY cantidad LIMIT k)
+    menor_stock = consulta_menor_stock(sede_id, TOP_MENOR_STOCK).all()
+
+    # Valor total de la sede: acumulado mantenido en Valor_Inventario_Sede (sin recorrer el inventario)
+    valor_total_sede = obtener_valor_inventario(sede_id)
+
     # Pasamos 'valor_total_sede' al template para mostrarlo arriba
-    return render_template('manage_inventory.html', sede=sede, inventario=inventario_ordenado, valor_total=valor_total_sede)
+    return render_template('manage_inventory.html', sede=sede, inventario=inventario, valor_total=valor_total_sede,
+                           menor_stock=menor_stock, siguiente=siguiente, es_primera_pagina=despues_id is None)
 #----------------------------------------------------------------------------------------------------
 
 @admin_inventory_bp.route('/assign/<int:sede_id>', methods=['GET', 'POST'])
@@ -107,6 +151,8 @@ def assign_product_to_branch(sede_id):
                 id_sede=sede_id
             )
             db.session.add(new_inventory_item)
+            ajustar_valor_por_stock(sede_id, Producto.query.get(id_producto), 0, cantidad)
+            incrementar_version_menu(sede_id)
             db.session.commit()
             flash('Producto asignado al inventario de la sede exitosamente.', 'success')
             return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede_id))
@@ -133,17 +179,28 @@ def edit_inventory_item(item_id):
         if new_cantidad is None or new_cantidad < 0:
             flash('La cantidad debe ser un número positivo o cero.', 'danger')
             return render_template('edit_inventory_item.html', inventory_item=inventory_item, sede=sede, producto=producto)
-        
-        # Si se marca como bloqueado, la cantidad se fuerza a 0.
-        # Si no se marca como bloqueado y la cantidad es 0, también se considera bloqueado lógicamente
-        if new_esta_bloqueado or new_cantidad == 0:
-            inventory_item.esta_bloqueado = True
-            inventory_item.cantidad = 0 # Asegurar que la cantidad sea 0 si está bloqueado
-        else:
-            inventory_item.esta_bloqueado = False
-            inventory_item.cantidad = new_cantidad # Actualizar con la cantidad proporcionada
 
         try:
+            # La cantidad cargada al inicio de la petición puede estar vieja (un pedido la cambió
+            # entre medio): el ajuste del valor se calcula con la fila releída y bloqueada
+            inventory_item = bloquear_item_inventario(item_id)
+            if inventory_item is None:
+                db.session.rollback()
+                flash('El producto ya no está en el inventario de la sede.', 'warning')
+                return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede.id_sede))
+            cantidad_anterior = inventory_item.cantidad
+
+            # Si se marca como bloqueado, la cantidad se fuerza a 0.
+            # Si no se marca como bloqueado y la cantidad es 0, también se considera bloqueado lógicamente
+            if new_esta_bloqueado or new_cantidad == 0:
+                inventory_item.esta_bloqueado = True
+                inventory_item.cantidad = 0 # Asegurar que la cantidad sea 0 si está bloqueado
+            else:
+                inventory_item.esta_bloqueado = False
+                inventory_item.cantidad = new_cantidad # Actualizar con la cantidad proporcionada
+
+            ajustar_valor_por_stock(sede.id_sede, producto, cantidad_anterior, inventory_item.cantidad)
+            incrementar_version_menu(sede.id_sede)
             db.session.commit()
             flash('Inventario de producto actualizado exitosamente.', 'success')
             return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede.id_sede))
@@ -160,6 +217,13 @@ def toggle_block_inventory_item(item_id):
     sede = Sede.query.get_or_404(inventory_item.id_sede)
 
     try:
+        # Cantidad actual con la fila bloqueada (ver edit_inventory_item)
+        inventory_item = bloquear_item_inventario(item_id)
+        if inventory_item is None:
+            db.session.rollback()
+            flash('El producto ya no está en el inventario de la sede.', 'warning')
+            return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede.id_sede))
+        cantidad_anterior = inventory_item.cantidad
         if inventory_item.esta_bloqueado:
             # Si estaba bloqueado, lo desbloqueamos y le ponemos cantidad 1 por defecto (o podrías pedirla)
             inventory_item.esta_bloqueado = False
@@ -170,7 +234,9 @@ def toggle_block_inventory_item(item_id):
             inventory_item.esta_bloqueado = True
             inventory_item.cantidad = 0
             flash(f'Producto "{inventory_item.producto.nombre}" bloqueado en {sede.nombre_sede} (cantidad ajustada a 0).', 'success')
-        
+
+        ajustar_valor_por_stock(sede.id_sede, inventory_item.producto, cantidad_anterior, inventory_item.cantidad)
+        incrementar_version_menu(sede.id_sede)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -190,9 +256,22 @@ def remove_inventory_item(item_id):
     
     # Si la cantidad es 0, procedemos a la eliminación física del registro de inventario.
     try:
-        db.session.delete(inventory_item)
+        # La comprobación de arriba usa la fila cargada al inicio de la petición: se repite con la
+        # fila releída y bloqueada, para no borrar stock que un reabastecimiento acaba de sumar
+        bloqueado = bloquear_item_inventario(item_id)
+        if bloqueado is None:
+            db.session.rollback()
+            flash('El producto ya no está en el inventario de la sede.', 'warning')
+            return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede_id))
+        nombre_producto, nombre_sede = bloqueado.producto.nombre, bloqueado.sede.nombre_sede
+        if bloqueado.cantidad > 0:
+            db.session.rollback()
+            flash(f'No se puede desasignar el producto "{nombre_producto}" de {nombre_sede} porque tiene stock. Bloquéalo primero.', 'danger')
+            return redirect(url_for('admin_inventory.manage_inventory', sede_id=sede_id))
+        db.session.delete(bloqueado)
+        incrementar_version_menu(sede_id) # El producto sale del menú de la sede en todos los procesos
         db.session.commit()
-        flash(f'Producto "{inventory_item.producto.nombre}" desasignado del inventario de {inventory_item.sede.nombre_sede} exitosamente.', 'success')
+        flash(f'Producto "{nombre_producto}" desasignado del inventario de {nombre_sede} exitosamente.', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error al desasignar producto del inventario: {e}', 'danger')
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from app.models.product import CategoriaProducto, Producto
 from app import db
 from sqlalchemy import exc #manejar errores de integridad
+from app.utils.inventory import ajustar_valor_por_costo # Valor acumulado del inventario por sede
+from app.utils.menu_cache import incrementar_version_menu_producto # Sello del menú de las sedes con el producto
 
 #Blueprint para las funcionalidades de administración de productos y categorías
 admin_products_bp = Blueprint('admin_products', __name__, template_folder='../templates/admin')
@@ -204,6 +206,10 @@ def edit_product(product_id):
                 return render_template('product_form.html', product=product, is_edit=True, categories=categories)
         
         try:
+            # El nuevo costo cambia el valor del inventario de cada sede que tenga stock del producto
+            ajustar_valor_por_costo(product.id_producto, product.costo_compra, new_costo_compra)
+            # Nombre y precio aparecen en el menú de los meseros
+            incrementar_version_menu_producto(product.id_producto)
             product.codigo = new_codigo
             product.nombre = new_nombre
             product.descripcion = new_descripcion
@@ -227,6 +233,9 @@ def delete_product(product_id):
     product = Producto.query.get_or_404(product_id)
 
     try:
+        # El inventario del producto se borra en cascada: lo descontamos del valor de cada sede
+        ajustar_valor_por_costo(product.id_producto, product.costo_compra, 0)
+        incrementar_version_menu_producto(product.id_producto)
         db.session.delete(product)
         db.session.commit()
         flash(f'Producto "{product.nombre}" eliminado exitosamente.', 'success')
@@ -1,17 +1,16 @@
 # app/routes/admin_reports.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, Response, stream_with_context, current_app, abort, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-import io
-import pandas as pd #pandas para generar CSV/XLS
-import pytz # Para manejar zonas horarias, si es necesario, o utc
 
 from app import db
-from app.models.order import Pedido, DetallePedido
-from app.models.product import Producto
 from app.models.branch import Sede
-from app.models.branch import Mesa
+from app.utils.reports import TIPOS_REPORTE, filas_en_lotes, generar_csv
+from app.utils import report_jobs
+from app.utils.report_cache import cache_reportes, guardar_mientras_envia, version_ventas
+from app.utils.db_routing import sesion_lectura, en_lectura, estadisticas_conexiones # Lecturas en la réplica
+from app.utils.inventory import contador_reintentos # Deadlocks y esperas de bloqueo repetidos
 
 admin_reports_bp = Blueprint('admin_reports', __name__, template_folder='../templates/admin')
 
@@ -35,6 +34,16 @@ def generate_sales_report():
         fecha_fin_str = request.form.get('fecha_fin')
         id_sede = request.form.get('id_sede', type=int)
         export_format = request.form.get('export_format')
+        tipo_reporte = request.form.get('tipo_reporte', 'detalle')
+        en_segundo_plano = 'en_segundo_plano' in request.form
+
+        if tipo_reporte not in TIPOS_REPORTE:
+            flash('Tipo de reporte no válido.', 'danger')
+            return redirect(url_for('admin_reports.sales_reports_form'))
+
+        if export_format not in ('csv', 'excel'):
+            flash('Formato de exportación no válido.', 'danger')
+            return redirect(url_for('admin_reports.sales_reports_form'))
 
         # Convertir fechas a objetos datetime
         # Asumimos que las fechas se ingresan en formato YYYY-MM-DD
@@ -46,83 +55,87 @@ def generate_sales_report():
             flash('Formato de fecha inválido. Por favor, usa YYYY-MM-DD.', 'danger')
             return redirect(url_for('admin_reports.sales_reports_form'))
 
-        # Consulta base
-        query = db.session.query(
-            Pedido.fecha_creacion,
-            Producto.codigo.label('codigo_producto'),
-            Producto.nombre.label('nombre_producto'),
-            DetallePedido.cantidad,
-            DetallePedido.costo_unitario,
-            DetallePedido.precio_unitario,
-            DetallePedido.subtotal,
-            Sede.nombre_sede
-        ).join(DetallePedido, Pedido.id_pedido == DetallePedido.id_pedido)\
-         .join(Producto, DetallePedido.id_producto == Producto.id_producto)\
-         .join(Mesa, Pedido.id_mesa == Mesa.id_mesa)\
-         .join(Sede, Mesa.id_sede == Sede.id_sede)\
-         .filter(Pedido.estado == 'pagado') # Solo reportes de pedidos pagados
-
-        # Filtrar por fecha de creación del pedido
-        if fecha_inicio:
-            query = query.filter(Pedido.fecha_creacion >= fecha_inicio)
-        if fecha_fin:
-            query = query.filter(Pedido.fecha_creacion <= fecha_fin)
-
-        # Filtrar por sede
-        if id_sede:
-            query = query.filter(Sede.id_sede == id_sede)
-
-        resultados = query.all()
-
-        if not resultados:
+        nombre_archivo = f'reporte_ventas_{datetime.now().strftime("%Y%m%d%H%M%S")}.csv'
+        clave_cache = cache_reportes.clave(tipo_reporte, export_format, fecha_inicio, fecha_fin, id_sede)
+        # Sello de los pagos del rango: cambia con cada pago, registrado en cualquier proceso
+        version = version_ventas(fecha_inicio, fecha_fin, id_sede)
+
+        # Un CSV directo con los mismos filtros ya generado se sirve desde la caché (una consulta del sello)
+        if export_format == 'csv' and not en_segundo_plano:
+            contenido = cache_reportes.obtener(clave_cache, version)
+            if contenido is not None:
+                return Response(
+                    contenido,
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={nombre_archivo}'}
+                )
+
+        encabezados, consulta, fila = TIPOS_REPORTE[tipo_reporte]
+        query = en_lectura(consulta(fecha_inicio, fecha_fin, id_sede)) # Réplica si está configurada
+
+        # Verificamos que haya datos con un EXISTS en lugar de traer todas las filas
+        if not sesion_lectura().query(query.exists()).scalar():
             flash('No se encontraron datos para los criterios de filtro seleccionados.', 'info')
             return redirect(url_for('admin_reports.sales_reports_form'))
 
-        # Procesar los resultados para el reporte
-        reporte_data = []
-        for row in resultados:
-            costo_vendido = row.cantidad * row.costo_unitario
-            ventas = row.subtotal # Subtotal ya es cantidad * precio_unitario
-            ganancia = ventas - costo_vendido
-            reporte_data.append({
-                'Fecha Pedido': row.fecha_creacion.strftime('%Y-%m-%d %H:%M'),
-                'Código Producto': row.codigo_producto,
-                'Nombre Producto': row.nombre_producto,
-                'Cantidad': row.cantidad,
-                'Costo de lo Vendido': f"{costo_vendido:.2f}",
-                'Ventas': f"{ventas:.2f}",
-                'Ganancia': f"{ganancia:.2f}",
-                'Sede': row.nombre_sede
-            })
-        
-        # Convertir a DataFrame de Pandas
-        df = pd.DataFrame(reporte_data)
-
-        if export_format == 'csv':
-            output = io.StringIO()
-            df.to_csv(output, index=False, encoding='utf-8')
-            output.seek(0)
-            return send_file(
-                io.BytesIO(output.getvalue().encode('utf-8')),
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=f'reporte_ventas_{datetime.now().strftime("%Y%m%d%H%M%S")}.csv'
-            )
-        elif export_format == 'excel':
-            output = io.BytesIO()
-            writer = pd.ExcelWriter(output, engine='xlsxwriter') # Asegura el motor
-            df.to_excel(writer, index=False, sheet_name='Reporte de Ventas')
-            writer.close() # Cierra el ExcelWriter
-            output.seek(0)
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name=f'reporte_ventas_{datetime.now().strftime("%Y%m%d%H%M%S")}.xlsx'
-            )
-        else:
-            flash('Formato de exportación no válido.', 'danger')
-            return redirect(url_for('admin_reports.sales_reports_form'))
+        # El Excel siempre (y el CSV si el admin lo pide) se genera en el pool de reportes,
+        # para no ocupar un worker web que necesitan meseros y cajeros
+        if export_format == 'excel' or en_segundo_plano:
+            id_trabajo = report_jobs.encolar_reporte(current_app._get_current_object(), tipo_reporte, export_format, fecha_inicio, fecha_fin, id_sede)
+            flash('El reporte se está generando. El enlace de descarga aparecerá en esta página.', 'info')
+            return redirect(url_for('admin_reports.report_job_status', id_trabajo=id_trabajo))
+
+        # CSV directo: se envía por partes mientras se leen las filas de la base de datos
+        # (y se guarda en la caché al terminar si no es demasiado grande)
+        bloques = generar_csv(filas_en_lotes(query, fila), encabezados)
+        return Response(
+            stream_with_context(guardar_mientras_envia(bloques, clave_cache, version)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={nombre_archivo}'}
+        )
             
     # Si es GET, simplemente mostramos el formulario
-    return redirect(url_for('admin_reports.sales_reports_form'))
\ No newline at end of file
+    return redirect(url_for('admin_reports.sales_reports_form'))
+
+@admin_reports_bp.route('/reports/cache')
+def report_cache_stats():
+    # Tasa de aciertos y memoria usada por la caché de reportes de este proceso
+    return jsonify(cache_reportes.estadisticas())
+
+@admin_reports_bp.route('/db/pool')
+def db_pool_stats():
+    # Conexiones prestadas, tiempo de uso, lecturas enviadas a la réplica y transacciones
+    # repetidas por deadlock o espera de bloqueo en este proceso
+    return jsonify({**estadisticas_conexiones(), 'reintentos': contador_reintentos.estadisticas()})
+
+@admin_reports_bp.route('/reports/jobs/<id_trabajo>')
+def report_job_status(id_trabajo):
+    trabajo = report_jobs.obtener_trabajo(current_app, id_trabajo)
+    if not trabajo:
+        flash('El reporte solicitado no existe o ya expiró.', 'warning')
+        return redirect(url_for('admin_reports.sales_reports_form'))
+    return render_template('report_job.html', trabajo=trabajo)
+
+@admin_reports_bp.route('/reports/jobs/<id_trabajo>/status')
+def report_job_progress(id_trabajo):
+    # Consultado por la página del trabajo para mostrar el avance sin recargar
+    trabajo = report_jobs.obtener_trabajo(current_app, id_trabajo)
+    if not trabajo:
+        return jsonify({'estado': 'expirado'}), 404
+    return jsonify({
+        'estado': trabajo['estado'],
+        'procesadas': trabajo['procesadas'],
+        'error': trabajo['error'],
+    })
+
+@admin_reports_bp.route('/reports/jobs/<id_trabajo>/download')
+def download_report(id_trabajo):
+    trabajo = report_jobs.obtener_trabajo(current_app, id_trabajo)
+    if not trabajo or trabajo['estado'] != 'listo':
+        abort(404)
+    return send_file(
+        trabajo['ruta'],
+        mimetype=trabajo['mimetype'],
+        as_attachment=True,
+        download_name=trabajo['nombre_archivo']
+    )
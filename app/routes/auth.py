@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app.models.user import User, Role
 from app.models.branch import Sede # modelo Sede
 from app import db
+from app.utils.principal import cache_principales, incrementar_version_sesion # Usuario autenticado en caché
 from werkzeug.security import generate_password_hash # hashear contraseñas
 
 
@@ -222,8 +223,10 @@ def edit_user(user_id):
 
             if contrasena:
                 user.set_password(contrasena)
+            incrementar_version_sesion(user) # Los demás procesos dejan de usar el usuario en caché
 
             db.session.commit()
+            cache_principales.invalidar(user_id) # El rol, la sede o el nombre pudieron cambiar
             flash('Usuario actualizado exitosamente.', 'success')
             return redirect(url_for('auth.manage_users'))
         except Exception as e:
@@ -249,6 +252,7 @@ def delete_user(user_id):
     try:
         db.session.delete(user_to_delete)
         db.session.commit()
+        cache_principales.invalidar(user_id)
         flash('Usuario eliminado exitosamente.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -278,7 +282,9 @@ def change_password():
             flash('Por favor, completa todos los campos.', 'danger')
             return redirect(get_user_dashboard_url()) # Redirige al dashboard específico
 
-        if not current_user.check_password(old_password):
+        # current_user es el principal en caché; la contraseña está en el modelo completo
+        usuario = current_user.usuario()
+        if not usuario.check_password(old_password):
             flash('La contraseña actual es incorrecta.', 'danger')
             return redirect(get_user_dashboard_url()) # Redirige al dashboard específico
 
@@ -290,9 +296,11 @@ def change_password():
             flash('La nueva contraseña debe tener al menos 6 caracteres.', 'danger')
             return redirect(get_user_dashboard_url()) # Redirige al dashboard específico
 
-        current_user.set_password(new_password)
+        usuario.set_password(new_password)
+        incrementar_version_sesion(usuario)
         try:
             db.session.commit()
+            cache_principales.invalidar(usuario.id_usuario)
             flash('Tu contraseña ha sido cambiada exitosamente.', 'success')
             return redirect(get_user_dashboard_url()) # Redirige al dashboard específico
         except Exception as e:
@@ -361,7 +369,9 @@ def reset_password_challenge(user_id):
 
         # Cambiar contraseña
         user.set_password(new_password)
+        incrementar_version_sesion(user)
         db.session.commit()
+        cache_principales.invalidar(user.id_usuario)
         
         flash('¡Contraseña restablecida exitosamente! Ya puedes iniciar sesión.', 'success')
         return redirect(url_for('auth.login'))
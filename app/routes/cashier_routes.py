@@ -1,17 +1,30 @@
 # app/routes/cashier_routes.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models.order import Pedido, DetallePedido # Pedido y DetallePedido
 from app.models.branch import Mesa #  Mesa
 from app.models.payment import Pago #  El modelo Pago
 from app.models.user import User # Para current_user.id_usuario y roles
 from app.utils.algorithms import calcular_devuelta_optima # Voraz
+from app.utils.payments import (registrar_pago, pago_registrado, consulta_mesas_ocupadas, consulta_pedido_abierto,
+                                PedidoNoCobrableError, MontoInsuficienteError, PagoEnProcesoError) # Cobro sin pagos dobles
+from app.utils.inventory import ejecutar_con_reintentos # Reintentos ante deadlocks
+from app.utils.cash_drawer import turno_abierto, abrir_turno, cerrar_turno, conteo_turno, sugerir_devuelta # Caja por turno
+from app.utils.algorithms import DENOMINACIONES_COP
+from app.utils.query_budget import presupuesto_consultas # Consultas SQL fijas por pantalla
+from app.utils.events import publicar_mesa, publicar_pedido, respuesta_sse, version_pedidos, TODAS_LAS_SEDES # Eventos en vivo
 
 
 cashier_bp = Blueprint('cashier', __name__, template_folder='../templates/cashier')
 
+
 # Puente para asegurar que solo los cajeros (o admins para pruebas) accedan a estas rutas
 @cashier_bp.before_request
 @login_required
@@ -22,22 +35,94 @@ def require_cashier_for_payments():
 
 
 @cashier_bp.route('/')
+@presupuesto_consultas(6)
 def cashier_dashboard():
     # Asegúrarse de que current_user tenga una sede asignada si es cajero
     if current_user.role.nombre_rol == 'Cajero' and not current_user.id_sede:
         flash('Tu usuario de cajero no tiene una sede asignada. Contacta al administrador.', 'danger')
         return redirect(url_for('auth.dashboard'))
 
-    # Mostrar mesas ocupadas (con pedidos pendientes de pago) para la sede del cajero
-    if current_user.role.nombre_rol == 'Cajero':
-        mesas_ocupadas = Mesa.query.filter_by(id_sede=current_user.id_sede, estado='ocupada').all()
-    else: # Admin (para pruebas)
-        mesas_ocupadas = Mesa.query.filter_by(estado='ocupada').all()
+    # Mesas ocupadas con su sede y el id, total y antigüedad de su pedido abierto, en una sola consulta
+    # Admin (para pruebas): todas las sedes
+    id_sede = current_user.id_sede if current_user.role.nombre_rol == 'Cajero' else None
+    # El sello se lee antes que el panel: si cambia mientras tanto, el próximo sondeo lo detecta
+    version = version_pedidos(id_sede) # None = TODAS_LAS_SEDES
+    mesas_ocupadas = consulta_mesas_ocupadas(id_sede).all()
 
-    return render_template('cashier_dashboard.html', mesas_ocupadas=mesas_ocupadas, user=current_user)
+    return render_template('cashier_dashboard.html', mesas_ocupadas=mesas_ocupadas, user=current_user,
+                           ahora=datetime.utcnow(), version_pedidos=version)
+
+
+# Caja del turno: abrir con el conteo inicial, ver existencias por denominación y cerrar
+@cashier_bp.route('/drawer', methods=['GET', 'POST'])
+def cash_drawer():
+    turno = turno_abierto(current_user.id_usuario)
+
+    if request.method == 'POST':
+        accion = request.form.get('accion')
+        try:
+            if accion == 'abrir':
+                conteo = {valor: request.form.get(f'cantidad_{valor}', type=int) or 0 for valor in DENOMINACIONES_COP}
+                if any(cantidad < 0 for cantidad in conteo.values()):
+                    flash('Las cantidades no pueden ser negativas.', 'danger')
+                    return redirect(url_for('cashier.cash_drawer'))
+                abrir_turno(current_user.id_usuario, current_user.id_sede, conteo)
+                db.session.commit()
+                flash('Turno de caja abierto.', 'success')
+            elif accion == 'cerrar' and turno:
+                cerrar_turno(turno)
+                db.session.commit()
+                flash('Turno de caja cerrado.', 'success')
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'warning')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar la caja: {e}', 'danger')
+        return redirect(url_for('cashier.cash_drawer'))
+
+    conteo = conteo_turno(turno.id_turno) if turno else {}
+    total = sum(valor * cantidad for valor, cantidad in conteo.items())
+    return render_template('cash_drawer.html', turno=turno, conteo=conteo, total=total, denominaciones=DENOMINACIONES_COP)
+
+
+# Sugerencia de devuelta con lo que hay en la caja (el formulario de pago la consulta mientras se digita)
+@cashier_bp.route('/drawer/change')
+def suggest_change():
+    cambio = request.args.get('cambio', type=float)
+    if cambio is None or cambio < 0:
+        return jsonify({'error': 'Cambio no válido.'}), 400
+    turno = turno_abierto(current_user.id_usuario)
+    if turno:
+        desglose, faltante = sugerir_devuelta(turno.id_turno, cambio)
+    else:
+        desglose, faltante = calcular_devuelta_optima(cambio), int(cambio) % 50
+    return jsonify({'desglose': desglose, 'faltante': faltante, 'con_caja': turno is not None})
+
+
+# Eventos en vivo de mesas y pedidos de la sede del cajero
+@cashier_bp.route('/events')
+def cashier_events():
+    if current_user.role.nombre_rol == 'Administrador':
+        return respuesta_sse(TODAS_LAS_SEDES)
+    if not current_user.id_sede:
+        return jsonify({'error': 'Usuario sin sede asignada.'}), 403
+    return respuesta_sse(current_user.id_sede)
+
+
+# Sello de mesas y pedidos de la sede del cajero (el dashboard solo pide su panel si cambió)
+@cashier_bp.route('/version')
+@presupuesto_consultas(2)
+def cashier_version():
+    if current_user.role.nombre_rol == 'Administrador':
+        return jsonify({'version': version_pedidos(TODAS_LAS_SEDES)})
+    if not current_user.id_sede:
+        return jsonify({'error': 'Usuario sin sede asignada.'}), 403
+    return jsonify({'version': version_pedidos(current_user.id_sede)})
 
 
 @cashier_bp.route('/table/<int:mesa_id>/order_details')
+@presupuesto_consultas(6)
 def view_order_for_payment(mesa_id):
     mesa = Mesa.query.get_or_404(mesa_id)
 
@@ -52,25 +137,67 @@ def view_order_for_payment(mesa_id):
 
     # Buscar el pedido ACTIVO (pendiente) para esta mesa
     # Asumimos que solo hay un pedido "activo" por mesa en un momento dado para simplificar
-    pedido = Pedido.query.filter_by(id_mesa=mesa.id_mesa).filter(
-        Pedido.estado.in_(['pendiente', 'en_preparacion', 'servido']) # Estados donde el pedido está abierto
-    ).order_by(Pedido.fecha_creacion.desc()).first() # El más reciente
+    # Con su sede y su mesero en la misma consulta (la plantilla los muestra)
+    pedido = consulta_pedido_abierto(mesa.id_mesa).options(
+        joinedload(Pedido.mesa).joinedload(Mesa.sede),
+        joinedload(Pedido.mesero)
+    ).first() # El más reciente
 
     if not pedido:
         flash(f'No se encontró un pedido activo para la mesa {mesa.id_mesa}.', 'warning')
         return redirect(url_for('cashier.cashier_dashboard'))
 
-    detalles = DetallePedido.query.filter_by(id_pedido=pedido.id_pedido).all()
+    # Líneas con su producto en una sola consulta (sin una consulta por línea)
+    detalles = DetallePedido.query.options(joinedload(DetallePedido.producto))\
+        .filter_by(id_pedido=pedido.id_pedido).all()
 
     return render_template('view_order_for_payment.html', mesa=mesa, pedido=pedido, detalles=detalles)
 
 
+def mostrar_pago(pago, monto_recibido, devuelta=None):
+    """
+    Comprobante del pago, con el cambio y su desglose en billetes y monedas si fue en efectivo.
+    devuelta: (desglose, faltante) calculado con la caja del turno; sin turno se usa el voraz.
+    """
+    pedido = pago.pedido
+    cambio = float(monto_recibido - pedido.total_pedido)
+    faltante = 0
+#--------------------------------------------------------------------------------------------------------------------------        
+   # 3. APLICACIÓN DEL ALGORITMO VORAZ (o de la devuelta acotada por la caja del turno)
+    desglose_devuelta = {} # Inicia vacío
+
+    # SOLO ejecutamos el algoritmo si es efectivo Y sobra dinero
+    if pago.metodo_pago == 'efectivo' and cambio > 0 and devuelta is not None:
+        desglose_devuelta, faltante = devuelta
+    elif pago.metodo_pago == 'efectivo' and cambio > 0:
+        desglose_devuelta = calcular_devuelta_optima(cambio)
+    elif pago.metodo_pago != 'efectivo':
+        # Si es tarjeta/nequi, aunque hayan digitado de más, el cambio real es 0
+        # o simplemente no se entrega físico.
+        cambio = 0
+
+    # 4. Enviar respuesta a la plantilla
+    return render_template(
+        'payment_success.html',
+        pedido=pedido,
+        pago=pago, # objeto pago creado
+        cambio=cambio,
+        desglose=desglose_devuelta, # Pasamos el resultado (o vacío si no fue efectivo)
+        faltante=faltante # Lo que la caja no alcanza a cubrir con sus billetes y monedas
+    )
+#-----------------------------------------------------------------------------------------------------------------------------
+
+
 @cashier_bp.route('/order/<int:pedido_id>/register_payment', methods=['GET', 'POST'])
 def register_payment(pedido_id):
     pedido = Pedido.query.get_or_404(pedido_id)
 
     # Validaciones antes de permitir el pago
     if pedido.estado == 'pagado' or pedido.estado == 'cancelado':
+        # Reenvío de un formulario ya cobrado (doble clic, recarga): se muestra el mismo comprobante
+        pago_previo = pago_registrado(request.form.get('token_pago')) if request.method == 'POST' else None
+        if pago_previo is not None:
+            return mostrar_pago(*pago_previo)
         flash(f'El pedido {pedido.id_pedido} ya ha sido {pedido.estado}. No se puede registrar un nuevo pago.', 'warning')
         return redirect(url_for('cashier.view_order_for_payment', mesa_id=pedido.id_mesa))
     
@@ -82,67 +209,45 @@ def register_payment(pedido_id):
     if request.method == 'POST':
         metodo_pago = request.form.get('metodo_pago')
         monto_recibido_str = request.form.get('monto_recibido')
+        token = request.form.get('token_pago') or None # Generado al mostrar el formulario
 
         if not metodo_pago:
             flash('Debes seleccionar un método de pago.', 'danger')
             return redirect(url_for('cashier.register_payment', pedido_id=pedido.id_pedido))
 
         try:
-            monto_recibido = float(monto_recibido_str)
-            # validar si el monto_recibido es suficiente
-            if monto_recibido < float(pedido.total_pedido):
-                flash('El monto recibido es menor al total del pedido.', 'warning')
-                return redirect(url_for('cashier.register_payment', pedido_id=pedido.id_pedido))
-            
-            # Crear el registro de pago
-            new_pago = Pago(
-                monto_pago=pedido.total_pedido, # Registramos el total del pedido como monto pagado
-                metodo_pago=metodo_pago,
-                id_pedido=pedido.id_pedido,
-                id_usuario_cajero=current_user.id_usuario
-            )
-            db.session.add(new_pago)
-
-            # Actualizar el estado del pedido
-            pedido.estado = 'pagado'
-            db.session.add(pedido)
-
-            # Liberar la mesa
-            mesa = pedido.mesa
-            mesa.estado = 'libre'
-            db.session.add(mesa)
-
-            db.session.commit()
-            flash(f'Pago del pedido {pedido.id_pedido} registrado exitosamente. Mesa {mesa.id_mesa} liberada.', 'success')
-            
-            # Calcular el cambio 
-            cambio = monto_recibido - float(pedido.total_pedido)
-#--------------------------------------------------------------------------------------------------------------------------        
-           # 3. APLICACIÓN DEL ALGORITMO VORAZ
-            desglose_devuelta = {} # Inicia vacío
-
-            # SOLO ejecutamos el algoritmo si es efectivo Y sobra dinero
-            if metodo_pago == 'efectivo' and cambio > 0:
-                desglose_devuelta = calcular_devuelta_optima(cambio)
-            elif metodo_pago != 'efectivo':
-                # Si es tarjeta/nequi, aunque hayan digitado de más, el cambio real es 0
-                # o simplemente no se entrega físico.
-                cambio = 0 
-            
-            # 4. Enviar respuesta a la plantilla
-            return render_template(
-                'payment_success.html', 
-                pedido=pedido, 
-                pago=new_pago, # objeto pago creado
-                cambio=cambio, 
-                desglose=desglose_devuelta # Pasamos el resultado (o vacío si no fue efectivo)
-            )
-#-----------------------------------------------------------------------------------------------------------------------------            
-        except ValueError:
+            monto_recibido = Decimal(monto_recibido_str)
+        except (InvalidOperation, TypeError):
             flash('El monto recibido debe ser un número válido.', 'danger')
-            db.session.rollback()
+            return redirect(url_for('cashier.register_payment', pedido_id=pedido.id_pedido))
+
+        id_cajero = current_user.id_usuario
+        turno = turno_abierto(id_cajero) # Caja del cajero; sin turno la devuelta no descuenta billetes
+        id_turno = turno.id_turno if turno else None
+        try:
+            # Transición de estado condicional + pago + mesa libre + resumen + caja, en una transacción corta
+            new_pago, devuelta = ejecutar_con_reintentos(
+                lambda: registrar_pago(pedido.id_pedido, metodo_pago, monto_recibido, id_cajero, token, id_turno)
+            )
+        except MontoInsuficienteError:
+            flash('El monto recibido es menor al total del pedido.', 'warning')
+            return redirect(url_for('cashier.register_payment', pedido_id=pedido.id_pedido))
+        except (PedidoNoCobrableError, PagoEnProcesoError):
+            # Doble clic o reenvío del mismo formulario: mostramos el pago que ya quedó registrado
+            pago_previo = pago_registrado(token)
+            if pago_previo is not None:
+                return mostrar_pago(*pago_previo)
+            flash(f'El pedido {pedido.id_pedido} ya fue cobrado o cancelado por otro usuario.', 'warning')
+            return redirect(url_for('cashier.cashier_dashboard'))
         except Exception as e:
-            db.session.rollback()
             flash(f'Error al registrar el pago: {e}', 'danger')
+            return redirect(url_for('cashier.register_payment', pedido_id=pedido.id_pedido))
+
+        pedido = db.session.get(Pedido, pedido.id_pedido)
+        mesa = pedido.mesa
+        publicar_pedido(pedido, mesa.id_sede)
+        publicar_mesa(mesa)
+        flash(f'Pago del pedido {pedido.id_pedido} registrado exitosamente. Mesa {mesa.id_mesa} liberada.', 'success')
+        return mostrar_pago(new_pago, monto_recibido, devuelta)
 
-    return render_template('register_payment.html', pedido=pedido, mesa=pedido.mesa)
\ No newline at end of file
+    return render_template('register_payment.html', pedido=pedido, mesa=pedido.mesa, token_pago=uuid.uuid4().hex)
\ No newline at end of file
@@ -0,0 +1,204 @@
+# app/routes/waiter_api.py
+# API JSON (v1) para el cliente móvil del mesero: las mismas operaciones que las páginas de
+# waiter_orders con respuestas compactas, ETag/304 y gzip.
+
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.order import Pedido, DetallePedido
+from app.models.branch import Mesa
+from app.utils.api import respuesta_json, respuesta_304, no_modificado, comprimir_gzip
+from app.utils.menu_cache import cache_menu, version_menu
+from app.utils.inventory import ejecutar_con_reintentos, StockInsuficienteError
+from app.utils.orders import agregar_lineas_pedido, abrir_pedido, MesaNoDisponibleError, PedidoNoEditableError, ESTADOS_EDITABLES
+from app.utils.events import publicar_mesa, publicar_pedido, version_pedidos, TODAS_LAS_SEDES
+from app.utils.query_budget import presupuesto_consultas
+from app.utils.sync import validar_lote, aplicar_lote, publicar_resultados, OperacionInvalidaError
+
+waiter_api_bp = Blueprint('waiter_api', __name__)
+
+
+def error(mensaje, codigo):
+    return jsonify({'error': mensaje}), codigo
+
+
+@waiter_api_bp.before_request
+def require_waiter_for_api():
+    # Como require_waiter_for_orders, pero respondiendo JSON en vez de redirigir al login
+    if not current_user.is_authenticated:
+        return error('Autenticación requerida.', 401)
+    if current_user.role.nombre_rol not in ['Mesero', 'Administrador']:
+        return error('Acceso denegado. Solo meseros pueden usar esta API.', 403)
+
+
+waiter_api_bp.after_request(comprimir_gzip)
+
+
+def sede_actual():
+    """Sede del mesero; un administrador la indica con ?sede=<id>."""
+    if current_user.role.nombre_rol == 'Administrador':
+        return request.args.get('sede', type=int)
+    return current_user.id_sede
+
+
+def pedido_accesible(pedido_id):
+    """Pedido con su mesa si pertenece a la sede del usuario; None si no existe o es de otra sede."""
+    pedido = Pedido.query.options(joinedload(Pedido.mesa)).get(pedido_id)
+    if pedido is None:
+        return None
+    if current_user.role.nombre_rol == 'Mesero' and pedido.mesa.id_sede != current_user.id_sede:
+        return None
+    return pedido
+
+
+def resumen_pedido(pedido):
+    return {'id': pedido.id_pedido, 'mesa': pedido.id_mesa, 'estado': pedido.estado, 'total': float(pedido.total_pedido)}
+
+
+@waiter_api_bp.route('/tables')
+@presupuesto_consultas(4)
+def free_tables():
+    id_sede = sede_actual()
+    if not id_sede:
+        return error('Sede no indicada o usuario sin sede asignada.', 400)
+    # El ETag es el sello de pedidos de la sede (cambia al ocuparse o liberarse una mesa)
+    etag = f'mesas-{id_sede}-{version_pedidos(id_sede)}'
+    if no_modificado(etag):
+        return respuesta_304(etag)
+    ids = [fila.id_mesa for fila in db.session.query(Mesa.id_mesa)
+           .filter_by(id_sede=id_sede, estado='libre').order_by(Mesa.id_mesa)]
+    return respuesta_json({'sede': id_sede, 'mesas': ids}, etag=etag)
+
+
+@waiter_api_bp.route('/menu')
+@presupuesto_consultas(5)
+def menu():
+    id_sede = sede_actual()
+    if not id_sede:
+        return error('Sede no indicada o usuario sin sede asignada.', 400)
+    # El ETag es el sello de versión del menú: un 304 cuesta una búsqueda por llave primaria
+    etag = f'menu-{id_sede}-{version_menu(id_sede)}'
+    if no_modificado(etag):
+        return respuesta_304(etag)
+    productos = [
+        {'id': item.id_producto, 'nombre': item.nombre, 'precio': float(item.precio_venta), 'cantidad': item.cantidad}
+        for item in cache_menu.obtener(id_sede)
+    ]
+    return respuesta_json({'sede': id_sede, 'productos': productos}, etag=etag)
+
+
+@waiter_api_bp.route('/orders')
+@presupuesto_consultas(4)
+def open_orders():
+    # El ETag es el sello de pedidos de la sede del mesero (todas las sedes para un administrador):
+    # cambia con cada pedido abierto, línea añadida o cobro
+    es_mesero = current_user.role.nombre_rol == 'Mesero'
+    id_sede = current_user.id_sede if es_mesero else TODAS_LAS_SEDES
+    etag = f'pedidos-{current_user.id_usuario}-{id_sede or 0}-{version_pedidos(id_sede)}'
+    if no_modificado(etag):
+        return respuesta_304(etag)
+    query = Pedido.query.filter(Pedido.estado.in_(ESTADOS_EDITABLES))
+    if es_mesero:
+        query = query.filter(Pedido.id_usuario_mesero == current_user.id_usuario)
+    pedidos = query.order_by(Pedido.fecha_creacion).all()
+    return respuesta_json({'pedidos': [resumen_pedido(p) for p in pedidos]}, etag=etag)
+
+
+@waiter_api_bp.route('/tables/<int:mesa_id>/orders', methods=['POST'])
+def create_order(mesa_id):
+    id_sede = current_user.id_sede if current_user.role.nombre_rol == 'Mesero' else None
+    try:
+        pedido = ejecutar_con_reintentos(lambda: abrir_pedido(mesa_id, current_user.id_usuario, id_sede))
+    except MesaNoDisponibleError as e:
+        return error(str(e), 409)
+    except Exception as e:
+        return error(f'Error al crear el pedido: {e}', 500)
+
+    mesa = Mesa.query.get(mesa_id)
+    publicar_mesa(mesa)
+    publicar_pedido(pedido, mesa.id_sede)
+    return respuesta_json(resumen_pedido(pedido), status=201)
+
+
+@waiter_api_bp.route('/orders/<int:pedido_id>')
+@presupuesto_consultas(4)
+def order_details(pedido_id):
+    pedido = pedido_accesible(pedido_id)
+    if pedido is None:
+        return error('Pedido no encontrado.', 404)
+    # El ETag es la versión de fila del pedido (aumenta al añadir líneas y al cobrar): un 304
+    # cuesta solo la búsqueda del pedido por llave primaria, sin leer sus líneas
+    etag = f'pedido-{pedido.id_pedido}-{pedido.version}'
+    if no_modificado(etag):
+        return respuesta_304(etag)
+    detalles = DetallePedido.query.options(joinedload(DetallePedido.producto))\
+        .filter_by(id_pedido=pedido_id).order_by(DetallePedido.id_detalle_pedido).all()
+    datos = resumen_pedido(pedido)
+    datos['lineas'] = [{
+        'producto': d.id_producto,
+        'nombre': d.producto.nombre,
+        'cantidad': d.cantidad,
+        'precio': float(d.precio_unitario),
+        'subtotal': float(d.subtotal),
+    } for d in detalles]
+    return respuesta_json(datos, etag=etag)
+
+
+@waiter_api_bp.route('/sync', methods=['POST'])
+def sync():
+    """
+    Cola offline del cliente. Cuerpo:
+        {"operaciones": [
+            {"clave": "<uuid>", "tipo": "crear_pedido", "id_mesa": 3},
+            {"clave": "<uuid>", "tipo": "agregar_lineas", "pedido_clave": "<uuid del crear_pedido>",
+             "lineas": [{"id_producto": 1, "cantidad": 2}]}
+        ]}
+    agregar_lineas acepta "id_pedido" para pedidos que ya existían. Todo el lote va en una
+    transacción; la respuesta trae un resultado por operación, en el mismo orden.
+    """
+    operaciones = (request.get_json(silent=True) or {}).get('operaciones')
+    try:
+        validar_lote(operaciones)
+    except OperacionInvalidaError as e:
+        return error(str(e), 400)
+
+    id_usuario = current_user.id_usuario
+    id_sede = current_user.id_sede if current_user.role.nombre_rol == 'Mesero' else None
+    try:
+        resultados = ejecutar_con_reintentos(lambda: aplicar_lote(operaciones, id_usuario, id_sede))
+    except Exception as e:
+        return error(f'Error al sincronizar: {e}', 500)
+
+    publicar_resultados(operaciones, resultados)
+    return respuesta_json({'resultados': resultados})
+
+
+@waiter_api_bp.route('/orders/<int:pedido_id>/lines', methods=['POST'])
+def add_lines(pedido_id):
+    """Cuerpo: {"lineas": [{"id_producto": 1, "cantidad": 2}, ...]}; se aplican todas o ninguna."""
+    pedido = pedido_accesible(pedido_id)
+    if pedido is None:
+        return error('Pedido no encontrado.', 404)
+    if pedido.estado not in ESTADOS_EDITABLES:
+        return error(f'No se pueden añadir productos a un pedido en estado "{pedido.estado}".', 409)
+
+    datos = request.get_json(silent=True) or {}
+    try:
+        lineas = [(int(l['id_producto']), int(l['cantidad'])) for l in datos.get('lineas', [])]
+    except (KeyError, TypeError, ValueError):
+        return error('Las líneas del pedido no son válidas.', 400)
+
+    try:
+        ejecutar_con_reintentos(lambda: agregar_lineas_pedido(pedido, lineas))
+    except PedidoNoEditableError as e:
+        return error(str(e), 409)
+    except ValueError as e:
+        return error(str(e), 400)
+    except StockInsuficienteError as e:
+        return jsonify({'error': 'Stock insuficiente.', 'producto': e.id_producto, 'disponible': e.disponible}), 409
+    except Exception as e:
+        return error(f'Error al añadir productos al pedido: {e}', 500)
+
+    publicar_pedido(pedido, pedido.mesa.id_sede)
+    return respuesta_json(resumen_pedido(pedido))
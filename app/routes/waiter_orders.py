@@ -1,13 +1,19 @@
 # app/routes/waiter_orders.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models.order import Pedido, DetallePedido
 from app.models.branch import Sede, Mesa
 from app.models.product import Producto
 from app.models.inventory import Inventario
 from app.models.user import User # modelo User para current_user.id_usuario
+from app.utils.inventory import ejecutar_con_reintentos, StockInsuficienteError # Reserva de stock
+from app.utils.orders import agregar_lineas_pedido, abrir_pedido, PedidoNoEditableError, MesaNoDisponibleError # Pedidos en una sola transacción
+from app.utils.menu_cache import cache_menu # Menú disponible por sede
+from app.utils.query_budget import presupuesto_consultas # Consultas SQL fijas por pantalla
+from app.utils.events import publicar_mesa, publicar_pedido, respuesta_sse, version_pedidos, TODAS_LAS_SEDES # Eventos en vivo
 
 waiter_orders_bp = Blueprint('waiter_orders', __name__, template_folder='../templates/waiter')
 
@@ -22,12 +28,34 @@ def require_waiter_for_orders():
 
 # --- Rutas para la aplicación web móvil del Mesero ---
 
+# Eventos en vivo de mesas y pedidos de la sede del mesero (el dashboard se actualiza sin recargar en bucle)
+@waiter_orders_bp.route('/events')
+def waiter_events():
+    if current_user.role.nombre_rol == 'Administrador':
+        return respuesta_sse(TODAS_LAS_SEDES)
+    if not current_user.id_sede:
+        return jsonify({'error': 'Usuario sin sede asignada.'}), 403
+    return respuesta_sse(current_user.id_sede)
+
+# Sello de mesas y pedidos de la sede: el dashboard lo consulta cada DASHBOARD_POLL_SECONDS y
+# solo pide de nuevo su panel si cambió (también por cambios hechos en otros procesos)
+@waiter_orders_bp.route('/version')
+@presupuesto_consultas(2)
+def waiter_version():
+    if current_user.role.nombre_rol == 'Administrador':
+        return jsonify({'version': version_pedidos(TODAS_LAS_SEDES)})
+    if not current_user.id_sede:
+        return jsonify({'error': 'Usuario sin sede asignada.'}), 403
+    return jsonify({'version': version_pedidos(current_user.id_sede)})
+
 # Página principal del mesero para ver sus mesas y pedidos
 @waiter_orders_bp.route('/')
+@presupuesto_consultas(7)
 def waiter_dashboard():
     # Inicializa las listas vacías
     mesas_disponibles = []
     pedidos_abiertos = []
+    version = 0 # Sello de pedidos de lo que se muestra (se lee antes que el panel)
     
     # Validar que el mesero tenga una sede asignada
     if current_user.role.nombre_rol == 'Mesero':
@@ -35,23 +63,27 @@ def waiter_dashboard():
             flash('Tu usuario de mesero no tiene una sede asignada. Contacta al administrador.', 'danger')
             # Las listas quedan vacías, el template mostrará "No hay mesas/pedidos"
         else:
+            version = version_pedidos(current_user.id_sede)
             # Filtra mesas por la sede del mesero actual y estado 'libre'
             mesas_disponibles = Mesa.query.filter_by(id_sede=current_user.id_sede, estado='libre').all()
             
             # Pedidos abiertos del mesero actual, asociados a su sede 
             # Aunque la consulta de Pedido ya filtra por id_usuario_mesero, lo cual ya implica la sede
-            pedidos_abiertos = Pedido.query.filter_by(id_usuario_mesero=current_user.id_usuario, estado='pendiente').all()
+            pedidos_abiertos = Pedido.query.options(joinedload(Pedido.mesa))\
+                .filter_by(id_usuario_mesero=current_user.id_usuario, estado='pendiente').all()
     elif current_user.role.nombre_rol == 'Administrador':
         # Para administradores que acceden a este dashboard 
+        version = version_pedidos(TODAS_LAS_SEDES)
         mesas_disponibles = Mesa.query.filter_by(estado='libre').all()
-        pedidos_abiertos = Pedido.query.filter_by(estado='pendiente').all() # O filtrar por algún admin si tuviera pedidos
+        pedidos_abiertos = Pedido.query.options(joinedload(Pedido.mesa)).filter_by(estado='pendiente').all() # O filtrar por algún admin si tuviera pedidos
     
     # Renderiza la plantilla y pasa todas las variables necesarias
     return render_template(
         'waiter_dashboard.html',
         user=current_user,
         mesas_disponibles=mesas_disponibles,
-        pedidos_abiertos=pedidos_abiertos
+        pedidos_abiertos=pedidos_abiertos,
+        version_pedidos=version
     )
 
 
@@ -64,33 +96,26 @@ def create_order(mesa_id):
         flash(f'La mesa {mesa.id_mesa} ya está ocupada o tiene un pedido abierto. No se puede crear un nuevo pedido.', 'danger')
         return redirect(url_for('waiter_orders.waiter_dashboard'))
 
-    # Productos disponibles en el inventario de la sede de la mesa
-    # Filtramos por productos que no estén bloqueados y con cantidad > 0
-    productos_en_inventario = Inventario.query.filter_by(id_sede=mesa.id_sede, esta_bloqueado=False).filter(Inventario.cantidad > 0).all()
+    # Menú disponible de la sede (no bloqueados y con cantidad > 0), desde la caché por sede
+    productos_en_inventario = cache_menu.obtener(mesa.id_sede)
     
     if request.method == 'POST':
-        # Crear el pedido
-        new_pedido = Pedido(
-            estado='pendiente',
-            total_pedido=0.00, # Se actualizará al añadir productos
-            id_usuario_mesero=current_user.id_usuario,
-            id_mesa=mesa.id_mesa
-        )
-        db.session.add(new_pedido)
-        
-        # Ocupar la mesa
-        mesa.estado = 'ocupada'
-        db.session.add(mesa) # Añadir la mesa modificada a la sesión
-
+        # La comprobación de arriba es solo para la pantalla: la mesa se ocupa con un UPDATE
+        # condicional, así dos meseros que envían a la vez no abren dos pedidos en la misma mesa
+        id_sede = current_user.id_sede if current_user.role.nombre_rol == 'Mesero' else None
         try:
-            db.session.commit()
-            flash(f'Pedido para la mesa {mesa.id_mesa} creado exitosamente. Ahora puedes añadir productos.', 'success')
-            return redirect(url_for('waiter_orders.add_products_to_order', pedido_id=new_pedido.id_pedido))
+            new_pedido = ejecutar_con_reintentos(lambda: abrir_pedido(mesa.id_mesa, current_user.id_usuario, id_sede))
+        except MesaNoDisponibleError:
+            flash(f'La mesa {mesa.id_mesa} ya está ocupada o tiene un pedido abierto. No se puede crear un nuevo pedido.', 'danger')
+            return redirect(url_for('waiter_orders.waiter_dashboard'))
         except Exception as e:
-            db.session.rollback()
-            mesa.estado = 'libre' # Revertir estado de la mesa si falla la creación del pedido
             flash(f'Error al crear el pedido: {e}', 'danger')
             return redirect(url_for('waiter_orders.waiter_dashboard'))
+
+        publicar_mesa(mesa) # Tras el commit la mesa se recarga ya ocupada
+        publicar_pedido(new_pedido, mesa.id_sede)
+        flash(f'Pedido para la mesa {mesa.id_mesa} creado exitosamente. Ahora puedes añadir productos.', 'success')
+        return redirect(url_for('waiter_orders.add_products_to_order', pedido_id=new_pedido.id_pedido))
     
     # Si es GET, simplemente mostramos el formulario para crear el pedido (que en este caso es más una confirmación)
     return render_template('create_order.html', mesa=mesa, productos_en_inventario=productos_en_inventario)
@@ -105,13 +130,8 @@ def add_products_to_order(pedido_id):
         flash(f'No se pueden añadir productos a un pedido en estado "{pedido.estado}".', 'danger')
         return redirect(url_for('waiter_orders.view_order_details', pedido_id=pedido.id_pedido))
     
-    # Productos disponibles en el inventario de la sede de la mesa del pedido
-    # Filtramos por productos que no estén bloqueados y con cantidad > 0
-    # Obtenemos solo los productos, no los objetos Inventario directamente para el select
-    productos_disponibles_inv = Inventario.query.filter_by(id_sede=pedido.mesa.id_sede, esta_bloqueado=False).filter(Inventario.cantidad > 0).all()
-    productos_para_seleccion = []
-    for inv_item in productos_disponibles_inv:
-        productos_para_seleccion.append(inv_item.producto) # Añadir el objeto Producto
+    # Menú disponible de la sede de la mesa del pedido (id, nombre, precio y cantidad), desde la caché por sede
+    productos_para_seleccion = cache_menu.obtener(pedido.mesa.id_sede)
 
     if request.method == 'POST':
         id_producto = request.form.get('id_producto', type=int)
@@ -121,67 +141,74 @@ def add_products_to_order(pedido_id):
             flash('Debes seleccionar un producto y especificar una cantidad válida.', 'danger')
             return render_template('add_products_to_order.html', pedido=pedido, productos_para_seleccion=productos_para_seleccion)
 
-        # Buscar el inventario del producto en la sede de la mesa
-        inventario_item = Inventario.query.filter_by(
-            id_producto=id_producto,
-            id_sede=pedido.mesa.id_sede
-        ).first()
-
-        if not inventario_item or inventario_item.esta_bloqueado or inventario_item.cantidad < cantidad_solicitada:
-            flash(f'No hay suficiente stock disponible para el producto seleccionado o está bloqueado. Stock actual: {inventario_item.cantidad if inventario_item else 0}', 'danger')
-            return render_template('add_products_to_order.html', pedido=pedido, productos_para_seleccion=productos_para_seleccion)
-
-        # Obtener el producto para sus precios
-        producto = Producto.query.get(id_producto)
-        if not producto:
-            flash('Producto no encontrado.', 'danger')
-            return render_template('add_products_to_order.html', pedido=pedido, productos_para_seleccion=productos_para_seleccion)
-
         try:
-            # Crear o actualizar DetallePedido
-            detalle = DetallePedido.query.filter_by(id_pedido=pedido.id_pedido, id_producto=id_producto).first()
-            if detalle:
-                # Si el producto ya está en el pedido, actualizar cantidad y subtotal
-                detalle.cantidad += cantidad_solicitada
-                detalle.subtotal = detalle.cantidad * detalle.precio_unitario
-                db.session.add(detalle)
-            else:
-                # Si es un nuevo producto en el pedido, crear un nuevo DetallePedido
-                subtotal = cantidad_solicitada * producto.precio_venta
-                new_detalle = DetallePedido(
-                    cantidad=cantidad_solicitada,
-                    precio_unitario=producto.precio_venta,
-                    costo_unitario=producto.costo_compra,
-                    subtotal=subtotal,
-                    id_pedido=pedido.id_pedido,
-                    id_producto=id_producto
-                )
-                db.session.add(new_detalle)
-            
-            # Actualizar el total del pedido
-            pedido.total_pedido += (cantidad_solicitada * producto.precio_venta)
-            db.session.add(pedido)
-
-            # Reducir la cantidad en el inventario
-            inventario_item.cantidad -= cantidad_solicitada
-            if inventario_item.cantidad == 0:
-                inventario_item.esta_bloqueado = True # Bloquear si el stock llega a cero
-            db.session.add(inventario_item)
-
-            db.session.commit()
+            # Una transacción corta; se repite sola si MySQL la aborta por un deadlock
+            ejecutar_con_reintentos(lambda: agregar_lineas_pedido(pedido, [(id_producto, cantidad_solicitada)]))
+            publicar_pedido(pedido, pedido.mesa.id_sede)
             flash('Productos añadidos al pedido exitosamente.', 'success')
             return redirect(url_for('waiter_orders.view_order_details', pedido_id=pedido.id_pedido))
-
+        except StockInsuficienteError as e:
+            flash(f'No hay suficiente stock disponible para el producto seleccionado o está bloqueado. Stock actual: {e.disponible}', 'danger')
+        except PedidoNoEditableError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('waiter_orders.view_order_details', pedido_id=pedido.id_pedido))
         except Exception as e:
-            db.session.rollback()
             flash(f'Error al añadir productos al pedido: {e}', 'danger')
 
     return render_template('add_products_to_order.html', pedido=pedido, productos_para_seleccion=productos_para_seleccion)
 
 
+@waiter_orders_bp.route('/order/<int:pedido_id>/cart', methods=['POST'])
+def add_cart_to_order(pedido_id):
+    """
+    Recibe varias líneas en una sola petición y las aplica en una sola transacción (todo o nada).
+    Acepta el formulario de la página (listas 'id_producto' y 'cantidad', se ignoran cantidades en 0)
+    o JSON: {"lineas": [{"id_producto": 1, "cantidad": 2}, ...]}.
+    """
+    pedido = Pedido.query.get_or_404(pedido_id)
+    es_json = request.is_json
+
+    def responder(mensaje, categoria, codigo):
+        if es_json:
+            return jsonify({'ok': categoria == 'success', 'mensaje': mensaje}), codigo
+        flash(mensaje, categoria)
+        if categoria == 'success':
+            return redirect(url_for('waiter_orders.view_order_details', pedido_id=pedido.id_pedido))
+        return redirect(url_for('waiter_orders.add_products_to_order', pedido_id=pedido.id_pedido))
+
+    if pedido.estado not in ['pendiente', 'en_preparacion']:
+        return responder(f'No se pueden añadir productos a un pedido en estado "{pedido.estado}".', 'danger', 409)
+
+    try:
+        if es_json:
+            lineas = [(int(l['id_producto']), int(l['cantidad'])) for l in request.get_json().get('lineas', [])]
+        else:
+            pares = zip(request.form.getlist('id_producto', type=int), request.form.getlist('cantidad', type=int))
+            lineas = [(id_producto, cantidad) for id_producto, cantidad in pares if cantidad]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return responder('Las líneas del pedido no son válidas.', 'danger', 400)
+
+    try:
+        total = ejecutar_con_reintentos(lambda: agregar_lineas_pedido(pedido, lineas))
+    except PedidoNoEditableError as e:
+        return responder(str(e), 'danger', 409)
+    except ValueError as e:
+        return responder(str(e), 'danger', 400)
+    except StockInsuficienteError as e:
+        producto = Producto.query.get(e.id_producto)
+        nombre = producto.nombre if producto else f'#{e.id_producto}'
+        return responder(f'No hay suficiente stock de "{nombre}" (disponible: {e.disponible}). No se añadió ninguna línea.', 'danger', 409)
+    except Exception as e:
+        return responder(f'Error al añadir productos al pedido: {e}', 'danger', 500)
+
+    publicar_pedido(pedido, pedido.mesa.id_sede)
+    return responder(f'{len(lineas)} línea(s) añadidas al pedido (+${total:,.0f}).', 'success', 200)
+
+
 @waiter_orders_bp.route('/order/<int:pedido_id>/details')
+@presupuesto_consultas(5)
 def view_order_details(pedido_id):
-    pedido = Pedido.query.get_or_404(pedido_id)
-    # Cargar los detalles del pedido con sus productos
-    detalles = DetallePedido.query.filter_by(id_pedido=pedido_id).all()
+    pedido = Pedido.query.options(joinedload(Pedido.mesa)).get_or_404(pedido_id)
+    # Cargar los detalles del pedido con sus productos en una sola consulta
+    detalles = DetallePedido.query.options(joinedload(DetallePedido.producto)).filter_by(id_pedido=pedido_id).all()
     return render_template('view_order_details.html', pedido=pedido, detalles=detalles)
\ No newline at end of file
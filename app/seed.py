@@ -0,0 +1,46 @@
+# app/seed.py
+# Datos iniciales (roles y usuario administrador). Se ejecuta con "flask init-db", nunca al
+# arrancar la aplicación: create_app no hace DDL ni escrituras, así cada worker arranca sin
+# tocar la base de datos.
+
+from app import db
+from app.models.user import Role, User
+
+ROLES = ['Administrador', 'Cajero', 'Mesero']
+
+# Datos correctos de seguridad del administrador
+PREGUNTA_ADMIN = '¿Cual es el nombre del proyecto?'
+RESPUESTA_ADMIN = 'bars' # La respuesta será "bars"
+
+
+def sembrar_datos_iniciales(eco=print):
+    """Crea los roles y el usuario admin si faltan; es idempotente y solo escribe lo que cambia."""
+    existentes = {rol.nombre_rol for rol in Role.query.all()}
+    for nombre in ROLES:
+        if nombre not in existentes:
+            eco(f'>>> Creando rol {nombre}...')
+            db.session.add(Role(nombre_rol=nombre))
+    db.session.flush()
+
+    admin_role = Role.query.filter_by(nombre_rol='Administrador').first()
+    admin_user = User.query.filter_by(nombre_usuario='admin').first()
+    if not admin_user:
+        # El admin no existe, lo creamos desde cero
+        eco('>>> Creando usuario Admin por primera vez...')
+        new_admin = User(
+            nombre_usuario='admin',
+            nombre_completo='Administrador Principal',
+            id_rol=admin_role.id_rol,
+            id_sede=None,
+            pregunta_seguridad=PREGUNTA_ADMIN
+        )
+        new_admin.set_password('admin123')
+        new_admin.set_security_answer(RESPUESTA_ADMIN) # Python genera el hash aquí
+        db.session.add(new_admin)
+    elif admin_user.pregunta_seguridad != PREGUNTA_ADMIN or not admin_user.check_security_answer(RESPUESTA_ADMIN):
+        # El admin YA existe con datos de seguridad distintos: los corregimos
+        eco('>>> Corrigiendo datos de seguridad del Admin existente...')
+        admin_user.pregunta_seguridad = PREGUNTA_ADMIN
+        admin_user.set_security_answer(RESPUESTA_ADMIN) # Regenera el hash válido
+
+    db.session.commit()
@@ -1,17 +1,23 @@
+import functools
+import math
+
 # ---------------------------------------------------------
 # 1. ALGORITMO VORAZ  - Calculadora de Devuelta
 # ---------------------------------------------------------
+# Billetes y monedas en circulación (COP), de mayor a menor
+DENOMINACIONES_COP = [100000, 50000, 20000, 10000, 5000, 2000, 1000, 500, 200, 100, 50]
+
 def calcular_devuelta_optima(cambio):
     """
     Determina la cantidad mínima de billetes y monedas para dar un cambio.
-    Contexto: Colombia (COP).
+    Contexto: Colombia (COP). Supone existencias ilimitadas de cada denominación;
+    con una caja real usar calcular_devuelta_acotada.
     """
-    denominaciones = [100000, 50000, 20000, 10000, 5000, 2000, 1000, 500, 200, 100, 50]
     resultado = {}
     
     monto_restante = int(cambio)
     
-    for valor in denominaciones:
+    for valor in DENOMINACIONES_COP:
         if monto_restante >= valor:
             cantidad = monto_restante // valor
             monto_restante = monto_restante % valor
@@ -20,85 +26,278 @@ def calcular_devuelta_optima(cambio):
     return resultado
 
 # ---------------------------------------------------------
-# 2. ALGORITMO ITERATIVO - Bubble Sort (Ordenamiento Burbuja)
+# 2. PROBLEMA DE LA MOCHILA (KNAPSACK 0/1) - Dinámico
 # ---------------------------------------------------------
-def ordenar_inventario_por_stock(lista_inventario):
+# Límite de celdas (items x capacidad) para la solución exacta. Por encima se usa una aproximación.
+MAX_CELDAS_DP = 50_000_000
+# Error relativo máximo aceptado por el FPTAS (0.05 = la ganancia es al menos el 95% de la óptima)
+EPSILON_FPTAS = 0.05
+# Límite de celdas del FPTAS (solo guarda bits por celda: 200M celdas son unos 25 MB)
+MAX_CELDAS_FPTAS = 200_000_000
+
+
+def _mochila_exacta(wt, val, W):
     """
-    Ordena una lista de objetos Inventario de MENOR a MAYOR cantidad.
-    Útil para resaltar productos con bajo stock.
+    Programación dinámica con un solo arreglo de capacidades (1-D) actualizado con NumPy.
+    Para reconstruir la solución se guarda, por item, un bitset empaquetado con las
+    capacidades en las que conviene tomarlo: n * (W + 1) / 8 bytes en lugar de una tabla de enteros.
     """
-    n = len(lista_inventario)
-    # Convertimos la query de SQLAlchemy a lista si no lo es
-    lista = list(lista_inventario) 
-    
-    for i in range(n):
-        for j in range(0, n - i - 1):
-            # Comparamos la propiedad .cantidad del objeto Inventario
-            if lista[j].cantidad > lista[j + 1].cantidad:
-                # Intercambio (Swap)
-                lista[j], lista[j + 1] = lista[j + 1], lista[j]
-                
-    return lista
+    import numpy as np # Solo se carga al optimizar
 
-# ---------------------------------------------------------
-# 3. ALGORITMO RECURSIVO - Suma Total Valor Inventario
-# ---------------------------------------------------------
-def calcular_valor_inventario_recursivo(lista_inventario, n):
+    dp = np.zeros(W + 1, dtype=np.int64)
+    tomas = [] # bitsets empaquetados (np.packbits) o None si el item no cabe
+
+    for peso, valor in zip(wt, val):
+        if peso > W:
+            tomas.append(None)
+            continue
+        # Tomar el item en la capacidad w vale dp[w - peso] + valor (con los valores de la fila anterior)
+        candidato = dp[:W + 1 - peso] + valor
+        toma = np.zeros(W + 1, dtype=bool)
+        toma[peso:] = candidato > dp[peso:] # Solo si mejora estrictamente, igual que la tabla 2-D
+        dp[peso:] = np.maximum(dp[peso:], candidato)
+        tomas.append(np.packbits(toma))
+
+    # Recuperar los items seleccionados, del último al primero
+    seleccion = []
+    w = W
+    for i in range(len(wt) - 1, -1, -1):
+        if tomas[i] is not None and (tomas[i][w >> 3] >> (7 - (w & 7))) & 1:
+            seleccion.append(i)
+            w -= wt[i]
+    return seleccion, int(dp[W])
+
+
+def _mochila_fptas(wt, val, W, epsilon):
     """
-    Calcula el costo total del inventario (cantidad * costo_compra) de forma recursiva.
-    n: longitud de la lista (inicialmente)
+    Esquema de aproximación (FPTAS): escala las ganancias y hace la DP sobre el valor
+    (peso mínimo para lograr cada ganancia escalada). Garantiza al menos (1 - epsilon) del óptimo.
+    Devuelve None si la tabla tampoco cabe en MAX_CELDAS_FPTAS.
     """
-    if n <= 0:
-        return 0
-    
-    item = lista_inventario[n - 1]
-    valor_actual = item.cantidad * float(item.producto.costo_compra)
-    
-    return valor_actual + calcular_valor_inventario_recursivo(lista_inventario, n - 1)
+    import numpy as np
 
-# ---------------------------------------------------------
-# 4. PROBLEMA DE LA MOCHILA (KNAPSACK 0/1) - Dinámico
-# ---------------------------------------------------------
-def recomendar_reabastecimiento(presupuesto, productos_candidatos):
+    indices = [i for i in range(len(wt)) if wt[i] <= W and val[i] > 0]
+    if not indices:
+        return [], 0
+    n = len(indices)
+    k = epsilon * max(val[i] for i in indices) / n
+    escalados = [int(val[i] // k) if k > 0 else val[i] for i in indices]
+    V = sum(escalados)
+    if n * (V + 1) > MAX_CELDAS_FPTAS:
+        return None
+
+    infinito = np.iinfo(np.int64).max // 2
+    peso_min = np.full(V + 1, infinito, dtype=np.int64)
+    peso_min[0] = 0
+    tomas = []
+    for i, v in zip(indices, escalados):
+        candidato = peso_min[:V + 1 - v] + wt[i]
+        toma = np.zeros(V + 1, dtype=bool)
+        toma[v:] = candidato < peso_min[v:]
+        peso_min[v:] = np.minimum(peso_min[v:], candidato)
+        tomas.append(np.packbits(toma))
+
+    mejor = int(np.nonzero(peso_min <= W)[0].max())
+    seleccion = []
+    v = mejor
+    for pos in range(n - 1, -1, -1):
+        if (tomas[pos][v >> 3] >> (7 - (v & 7))) & 1:
+            seleccion.append(indices[pos])
+            v -= escalados[pos]
+    return seleccion, sum(val[i] for i in seleccion)
+
+
+def _mochila_voraz(wt, val, W):
+    """
+    Voraz por ganancia/costo, comparado con el mejor item suelto: garantiza al menos la
+    mitad del óptimo y corre en O(n log n) sin importar el presupuesto.
+    """
+    indices = [i for i in range(len(wt)) if wt[i] <= W and val[i] > 0]
+    if not indices:
+        return [], 0
+    orden = sorted(indices, key=lambda i: val[i] / wt[i] if wt[i] else float('inf'), reverse=True)
+    seleccion, usado = [], 0
+    for i in orden:
+        if usado + wt[i] <= W:
+            seleccion.append(i)
+            usado += wt[i]
+    total = sum(val[i] for i in seleccion)
+    mejor_suelto = max(indices, key=lambda i: val[i])
+    if val[mejor_suelto] > total:
+        return [mejor_suelto], val[mejor_suelto]
+    return seleccion, total
+
+
+def recomendar_reabastecimiento(presupuesto, productos_candidatos, granularidad=None):
     """
     Dada una lista de productos candidatos (con costo y ganancia potencial)
     y un presupuesto límite, decide qué productos comprar para MAXIMIZAR la ganancia.
     
     productos_candidatos: Lista de dicts {'id': x, 'nombre': x, 'costo': x, 'ganancia': x}
+    granularidad: si se indica (p. ej. 100 pesos), los costos se redondean hacia arriba a ese
+        múltiplo antes de optimizar. Sin granularidad solo se divide por el MCD de los costos,
+        que no cambia el resultado.
+
+    Con tablas de hasta MAX_CELDAS_DP celdas la respuesta es exacta (la misma que la DP clásica);
+    por encima se usa un FPTAS y, si tampoco cabe, el voraz con cota.
     """
     n = len(productos_candidatos)
     W = int(presupuesto)
+    if n == 0 or W <= 0:
+        return [], 0
     
     # Costos (pesos) y Ganancias (valores)
     wt = [int(p['costo']) for p in productos_candidatos]
     val = [int(p['ganancia']) for p in productos_candidatos]
-    
-    # Tabla DP
-    K = [[0 for x in range(W + 1)] for x in range(n + 1)]
-  
-    # Construir la tabla K[][] de abajo hacia arriba
-    for i in range(n + 1):
-        for w in range(W + 1):
-            if i == 0 or w == 0:
-                K[i][w] = 0
-            elif wt[i-1] <= w:
-                K[i][w] = max(val[i-1] + K[i-1][w-wt[i-1]],  K[i-1][w])
-            else:
-                K[i][w] = K[i-1][w]
-  
-    # Recuperar los items seleccionados
-    res = K[n][W]
-    w = W
-    items_seleccionados = []
-    
-    for i in range(n, 0, -1):
-        if res <= 0:
-            break
-        if res == K[i-1][w]:
-            continue
-        else:
-            items_seleccionados.append(productos_candidatos[i-1])
-            res = res - val[i-1]
-            w = w - wt[i-1]
-            
-    return items_seleccionados, K[n][W]
\ No newline at end of file
+
+    # Reducir la escala de los pesos: cuanto menor es W, menor es la tabla
+    if granularidad and granularidad > 1:
+        wt = [-(-w // granularidad) for w in wt] # División con redondeo hacia arriba
+        W = W // granularidad
+    else:
+        divisor = 0
+        for w in wt:
+            divisor = math.gcd(divisor, w)
+        if divisor > 1:
+            wt = [w // divisor for w in wt]
+            W = W // divisor
+
+    if n * (W + 1) <= MAX_CELDAS_DP:
+        seleccion, ganancia = _mochila_exacta(wt, val, W)
+    else:
+        resultado = _mochila_fptas(wt, val, W, EPSILON_FPTAS)
+        seleccion, ganancia = resultado if resultado is not None else _mochila_voraz(wt, val, W)
+
+    items_seleccionados = [productos_candidatos[i] for i in seleccion]
+    return items_seleccionados, ganancia
+
+
+# ---------------------------------------------------------
+# 3. MOCHILA ACOTADA - Varias unidades por producto
+# ---------------------------------------------------------
+def dividir_binario(cantidad_maxima):
+    """
+    Parte una cantidad en paquetes 1, 2, 4, ..., resto. Cualquier cantidad entre 0 y
+    cantidad_maxima se arma con un subconjunto de los paquetes, así que la mochila acotada
+    se resuelve como 0/1 con O(log q) items por producto en lugar de q.
+    """
+    paquetes = []
+    tamano = 1
+    restante = cantidad_maxima
+    while restante > 0:
+        paquete = min(tamano, restante)
+        paquetes.append(paquete)
+        restante -= paquete
+        tamano *= 2
+    return paquetes
+
+
+def recomendar_reabastecimiento_acotado(presupuesto, productos_candidatos, granularidad=None):
+    """
+    Igual que recomendar_reabastecimiento, pero cada producto puede comprarse varias veces
+    hasta su 'cantidad_max'. Devuelve (lista de candidatos con 'cantidad', 'costo_total'
+    y 'ganancia_total', ganancia total).
+
+    productos_candidatos: Lista de dicts {'id': x, 'nombre': x, 'costo': x, 'ganancia': x, 'cantidad_max': x}
+    """
+    paquetes = []
+    for indice, p in enumerate(productos_candidatos):
+        for unidades in dividir_binario(int(p['cantidad_max'])):
+            paquetes.append({
+                'indice': indice,
+                'unidades': unidades,
+                'costo': unidades * int(p['costo']),
+                'ganancia': unidades * int(p['ganancia']),
+            })
+
+    elegidos, ganancia = recomendar_reabastecimiento(presupuesto, paquetes, granularidad)
+
+    # Juntar los paquetes elegidos de cada producto
+    unidades_por_producto = {}
+    for paquete in elegidos:
+        unidades_por_producto[paquete['indice']] = unidades_por_producto.get(paquete['indice'], 0) + paquete['unidades']
+
+    plan = []
+    for indice in sorted(unidades_por_producto):
+        p = productos_candidatos[indice]
+        cantidad = unidades_por_producto[indice]
+        plan.append(dict(p, cantidad=cantidad,
+                         costo_total=cantidad * int(p['costo']),
+                         ganancia_total=cantidad * int(p['ganancia'])))
+    return plan, ganancia
+
+
+# ---------------------------------------------------------
+# 4. DEVUELTA CON EXISTENCIAS LIMITADAS - Dinámico acotado
+# ---------------------------------------------------------
+# Moneda más pequeña: todos los montos de las tablas van en múltiplos de 50
+UNIDAD_COP = 50
+# Devuelta máxima que cubren las tablas precalculadas
+MAX_DEVUELTA = 500_000
+
+
+@functools.lru_cache(maxsize=64)
+def _tabla_devuelta(disponibles):
+    """
+    Resuelve una vez, para todos los montos hasta min(valor de la caja, MAX_DEVUELTA), el
+    mínimo de piezas con las existencias dadas: mochila 0/1 de mínimo sobre los paquetes
+    binarios de cada denominación, vectorizada con NumPy como _mochila_exacta.
+
+    disponibles: tupla ((valor, cantidad), ...) para que sirva de llave de la caché; mientras
+    la caja no cambie, cada sugerencia solo reconstruye sobre la tabla ya calculada.
+    Devuelve (paquetes, tomas, alcanzable): alcanzable[a] es el mayor monto <= a que se puede
+    dar exacto.
+    """
+    import numpy as np
+
+    A = min(sum(valor * cantidad for valor, cantidad in disponibles), MAX_DEVUELTA) // UNIDAD_COP
+    infinito = np.iinfo(np.int32).max // 2
+    piezas = np.full(A + 1, infinito, dtype=np.int32)
+    piezas[0] = 0
+    paquetes = [] # (valor, cantidad de piezas, peso en unidades)
+    tomas = []    # bitsets empaquetados: el paquete mejora el monto a
+    for valor, cantidad in disponibles:
+        for n in dividir_binario(cantidad):
+            peso = n * valor // UNIDAD_COP
+            if peso > A:
+                continue
+            candidato = piezas[:A + 1 - peso] + n # Se calcula con la fila anterior (0/1)
+            toma = np.zeros(A + 1, dtype=bool)
+            toma[peso:] = candidato < piezas[peso:]
+            piezas[peso:] = np.minimum(piezas[peso:], candidato)
+            paquetes.append((valor, n, peso))
+            tomas.append(np.packbits(toma))
+
+    montos = np.arange(A + 1)
+    alcanzable = np.maximum.accumulate(np.where(piezas < infinito, montos, 0))
+    for tabla in tomas + [alcanzable]:
+        tabla.flags.writeable = False # Compartidas entre hilos a través de la caché
+    return paquetes, tomas, alcanzable
+
+
+def calcular_devuelta_acotada(cambio, disponibles):
+    """
+    Mínimo de billetes y monedas para dar 'cambio' sin usar más piezas de las que hay.
+
+    disponibles: dict {valor: cantidad} con las existencias de la caja.
+    Devuelve (desglose {valor: cantidad}, faltante): si el monto exacto no se puede armar se
+    sugiere el mayor monto alcanzable y 'faltante' es lo que queda por entregar (incluye los
+    pesos por debajo de la moneda más pequeña).
+    """
+    clave = tuple(sorted(
+        (int(valor), int(cantidad)) for valor, cantidad in disponibles.items()
+        if cantidad > 0 and int(valor) % UNIDAD_COP == 0
+    ))
+    paquetes, tomas, alcanzable = _tabla_devuelta(clave)
+
+    cambio = int(cambio)
+    monto = int(alcanzable[min(cambio // UNIDAD_COP, len(alcanzable) - 1)])
+    faltante = cambio - monto * UNIDAD_COP
+
+    # Reconstrucción: de atrás hacia adelante, el paquete se usó si mejoró el monto restante
+    desglose = {}
+    for (valor, n, peso), toma in zip(reversed(paquetes), reversed(tomas)):
+        if monto and (toma[monto >> 3] >> (7 - (monto & 7))) & 1:
+            desglose[valor] = desglose.get(valor, 0) + n
+            monto -= peso
+    return dict(sorted(desglose.items(), reverse=True)), faltante
@@ -0,0 +1,58 @@
+# app/utils/api.py
+# Respuestas de la API JSON: cuerpo compacto, ETag débil con GET condicional (304) y gzip.
+#
+# Los ETags salen de sellos de versión en la base de datos (menú, pedidos de la sede, versión
+# de fila del pedido), no de un hash del cuerpo: la vista lee el sello, llama a no_modificado()
+# y solo si el cliente no tiene esa versión ejecuta las consultas y arma el cuerpo.
+
+import gzip
+import json
+
+from flask import request, current_app
+
+# Por debajo de este tamaño gzip no compensa
+GZIP_MIN_BYTES = 500
+
+
+def _cuerpo_json(datos):
+    return json.dumps(datos, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+
+def respuesta_json(datos, etag=None, status=200):
+    """
+    Respuesta JSON con ETag débil si se da uno (derivado de un sello de versión). Sin ETag (las
+    respuestas de escritura) no hay GET condicional.
+    """
+    respuesta = current_app.response_class(_cuerpo_json(datos), status=status, mimetype='application/json')
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    if etag is None:
+        return respuesta
+    respuesta.set_etag(etag, weak=True)
+    return respuesta.make_conditional(request)
+
+
+def no_modificado(etag):
+    """True si el cliente envió If-None-Match con este ETag (permite responder 304 sin armar el cuerpo)."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def respuesta_304(etag):
+    respuesta = current_app.response_class(status=304)
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def comprimir_gzip(respuesta):
+    """after_request: comprime con gzip las respuestas JSON si el cliente lo acepta."""
+    respuesta.vary.add('Accept-Encoding')
+    if (respuesta.status_code != 200 or respuesta.direct_passthrough
+            or 'Content-Encoding' in respuesta.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return respuesta
+    cuerpo = respuesta.get_data()
+    if len(cuerpo) < GZIP_MIN_BYTES:
+        return respuesta
+    respuesta.set_data(gzip.compress(cuerpo, compresslevel=6))
+    respuesta.headers['Content-Encoding'] = 'gzip'
+    return respuesta
@@ -0,0 +1,67 @@
+# app/utils/cash_drawer.py
+# Caja de efectivo por turno de cajero: existencias por denominación y devuelta acotada.
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.cash_drawer import TurnoCaja, DenominacionCaja
+from app.utils.algorithms import DENOMINACIONES_COP, calcular_devuelta_optima, calcular_devuelta_acotada
+
+
+def turno_abierto(id_usuario_cajero):
+    return TurnoCaja.query.filter_by(id_usuario_cajero=id_usuario_cajero, estado='abierto').first()
+
+
+def abrir_turno(id_usuario_cajero, id_sede, conteo):
+    """Abre un turno con el conteo inicial {valor: cantidad} (no hace commit)."""
+    if turno_abierto(id_usuario_cajero) is not None:
+        raise ValueError('Ya tienes un turno de caja abierto.')
+    turno = TurnoCaja(id_usuario_cajero=id_usuario_cajero, id_sede=id_sede)
+    db.session.add(turno)
+    db.session.flush()
+    db.session.add_all(
+        DenominacionCaja(id_turno=turno.id_turno, valor=valor, cantidad=conteo.get(valor, 0))
+        for valor in DENOMINACIONES_COP
+    )
+    return turno
+
+
+def cerrar_turno(turno):
+    turno.estado = 'cerrado'
+    turno.fecha_cierre = db.func.now()
+
+
+def conteo_turno(id_turno, bloquear=False):
+    """Existencias {valor: cantidad} de la caja. Con bloquear=True las filas quedan bloqueadas hasta el commit."""
+    query = db.session.query(DenominacionCaja.valor, DenominacionCaja.cantidad).filter_by(id_turno=id_turno)
+    if bloquear:
+        query = query.with_for_update()
+    return {valor: cantidad for valor, cantidad in query}
+
+
+def sugerir_devuelta(id_turno, cambio):
+    """(desglose, faltante) para 'cambio' con lo que hay en la caja; la tabla de la caja queda en caché."""
+    return calcular_devuelta_acotada(cambio, conteo_turno(id_turno))
+
+
+def registrar_efectivo(id_turno, monto_recibido, cambio):
+    """
+    Pago en efectivo dentro de la transacción del pago (no hace commit). Suma a la caja lo
+    recibido, calcula la devuelta con esas existencias y la descuenta. El monto recibido se
+    cuenta con la combinación de menos billetes (el formulario no pide el desglose).
+    Devuelve (desglose, faltante).
+    """
+    conteo = conteo_turno(id_turno, bloquear=True) # Dos pagos del mismo turno no usan los mismos billetes
+    recibido = calcular_devuelta_optima(monto_recibido)
+    for valor, cantidad in recibido.items():
+        conteo[valor] = conteo.get(valor, 0) + cantidad
+    desglose, faltante = calcular_devuelta_acotada(cambio, conteo)
+
+    deltas = dict(recibido)
+    for valor, cantidad in desglose.items():
+        deltas[valor] = deltas.get(valor, 0) - cantidad
+    filas = [{'id_turno': id_turno, 'valor': valor, 'cantidad': delta} for valor, delta in deltas.items() if delta]
+    if filas:
+        stmt = mysql_insert(DenominacionCaja).values(filas)
+        db.session.execute(stmt.on_duplicate_key_update(cantidad=DenominacionCaja.cantidad + stmt.inserted.cantidad))
+    return desglose, faltante
@@ -0,0 +1,167 @@
+# app/utils/db_routing.py
+# Lecturas de reportes en la réplica de MySQL y métricas de los pools de conexiones.
+#
+# Si MYSQL_REPLICA_URI está configurada (bind 'replica'), los reportes se leen con una sesión
+# propia por contexto de aplicación conectada a la réplica, y no compiten con las escrituras de
+# pedidos y pagos en la principal. Si la réplica no responde al abrir la sesión, la lectura usa
+# la principal y la réplica no se vuelve a intentar hasta pasados REPLICA_RETRY_SECONDS.
+# Las pantallas de meseros y cajeros siguen leyendo de la principal: la réplica puede ir unos
+# segundos atrasada y esas pantallas deben ver el pedido o pago que se acaba de registrar.
+
+import threading
+import time
+
+from flask import g, current_app
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import db
+
+BIND_REPLICA = 'replica'
+
+
+class EnrutadorLecturas:
+    def __init__(self):
+        self._caida_hasta = 0.0
+        self._lock = threading.Lock()
+        self.lecturas_replica = 0
+        self.lecturas_principal = 0
+        self.fallos_replica = 0
+
+    def disponible(self):
+        return time.monotonic() >= self._caida_hasta
+
+    def marcar_caida(self, segundos):
+        with self._lock:
+            self._caida_hasta = time.monotonic() + segundos
+            self.fallos_replica += 1
+
+    def contar(self, replica):
+        with self._lock:
+            if replica:
+                self.lecturas_replica += 1
+            else:
+                self.lecturas_principal += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'replica_disponible': time.monotonic() >= self._caida_hasta,
+                'lecturas_replica': self.lecturas_replica,
+                'lecturas_principal': self.lecturas_principal,
+                'fallos_replica': self.fallos_replica,
+            }
+
+
+enrutador_lecturas = EnrutadorLecturas()
+
+
+def _abrir_sesion_replica():
+    """Sesión sobre una conexión a la réplica, o None si no hay réplica o no responde."""
+    engine = db.engines.get(BIND_REPLICA)
+    if engine is None or not enrutador_lecturas.disponible():
+        return None
+    try:
+        conexion = engine.connect() # Con pool_pre_ping, falla aquí si la réplica no responde
+    except DBAPIError as e:
+        current_app.logger.warning(f'Réplica no disponible, se lee de la base principal: {e}')
+        enrutador_lecturas.marcar_caida(current_app.config['REPLICA_RETRY_SECONDS'])
+        return None
+    return Session(bind=conexion)
+
+
+def sesion_lectura():
+    """Sesión para consultas de solo lectura: la de la réplica si está disponible, si no db.session."""
+    if '_sesion_lectura' not in g:
+        sesion = _abrir_sesion_replica()
+        enrutador_lecturas.contar(replica=sesion is not None)
+        g._sesion_lectura = sesion or db.session
+    return g._sesion_lectura
+
+
+def en_lectura(query):
+    """La misma consulta (armada con db.session) ejecutada en la sesión de lectura."""
+    return query.with_session(sesion_lectura())
+
+
+def _cerrar_sesion_lectura(exc):
+    sesion = g.pop('_sesion_lectura', None)
+    if sesion is None or sesion is db.session:
+        return
+    conexion = sesion.bind
+    sesion.close()
+    conexion.close() # Devuelve la conexión al pool de la réplica
+
+
+# --- Métricas de los pools ---
+
+class MetricasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {} # nombre del bind -> contadores
+
+    def _sumar(self, nombre, **valores):
+        with self._lock:
+            contadores = self._contadores.setdefault(nombre, {
+                'checkouts': 0, 'conexiones_nuevas': 0, 'invalidadas': 0,
+                'uso_total_ms': 0.0, 'uso_max_ms': 0.0,
+            })
+            for campo, valor in valores.items():
+                if campo == 'uso_max_ms':
+                    contadores[campo] = max(contadores[campo], valor)
+                else:
+                    contadores[campo] += valor
+
+    def escuchar(self, nombre, engine):
+        def al_conectar(dbapi_con, registro):
+            self._sumar(nombre, conexiones_nuevas=1)
+
+        def al_prestar(dbapi_con, registro, proxy):
+            registro.info['prestada_desde'] = time.perf_counter()
+            self._sumar(nombre, checkouts=1)
+
+        def al_devolver(dbapi_con, registro):
+            desde = registro.info.pop('prestada_desde', None)
+            if desde is not None:
+                uso = (time.perf_counter() - desde) * 1000
+                self._sumar(nombre, uso_total_ms=uso, uso_max_ms=uso)
+
+        def al_invalidar(dbapi_con, registro, excepcion):
+            self._sumar(nombre, invalidadas=1)
+
+        event.listen(engine, 'connect', al_conectar)
+        event.listen(engine, 'checkout', al_prestar)
+        event.listen(engine, 'checkin', al_devolver)
+        event.listen(engine, 'invalidate', al_invalidar)
+
+    def estadisticas(self, engines):
+        resultado = {}
+        for bind, engine in engines.items():
+            nombre = bind or 'principal'
+            pool = engine.pool
+            with self._lock:
+                contadores = dict(self._contadores.get(nombre, {}))
+            checkouts = contadores.get('checkouts', 0)
+            contadores['uso_promedio_ms'] = round(contadores.get('uso_total_ms', 0.0) / checkouts, 2) if checkouts else 0.0
+            # size/checkedout/overflow solo existen en QueuePool (el pool por defecto con MySQL)
+            for campo in ('size', 'checkedin', 'checkedout', 'overflow'):
+                if hasattr(pool, campo):
+                    contadores[campo] = getattr(pool, campo)()
+            resultado[nombre] = contadores
+        return resultado
+
+
+metricas_pool = MetricasPool()
+
+
+def registrar_enrutamiento(app):
+    """Métricas en los pools de todos los binds y cierre de la sesión de lectura con el contexto."""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            metricas_pool.escuchar(bind or 'principal', engine)
+    app.teardown_appcontext(_cerrar_sesion_lectura)
+
+
+def estadisticas_conexiones():
+    return {'pools': metricas_pool.estadisticas(db.engines), 'lecturas': enrutador_lecturas.estadisticas()}
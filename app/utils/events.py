@@ -0,0 +1,152 @@
+# app/utils/events.py
+# Eventos en vivo (Server-Sent Events) de mesas y pedidos por sede.
+#
+# Las rutas que cambian el estado de una mesa o de un pedido publican un evento corto después
+# del commit; cada dashboard abierto tiene una cola en memoria suscrita a su sede y recibe los
+# eventos sin consultar la base de datos. El reparto es dentro del proceso: un cliente solo
+# recibe los eventos publicados por el proceso al que está conectado. Con varios workers de
+# gunicorn los eventos son un atajo, no la fuente de verdad: Version_Pedidos_Sede guarda un
+# sello por sede que aumenta, en la misma transacción, al abrir un pedido, añadirle líneas,
+# cobrarlo o cambiar las mesas de la sede. Cada DASHBOARD_POLL_SECONDS los dashboards leen solo
+# el sello (una búsqueda por llave primaria) y piden de nuevo su panel únicamente si cambió.
+
+import json
+import queue
+import threading
+
+from flask import Response, current_app
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.order import VersionPedidosSede
+
+# Canal que reciben los suscriptores sin sede (administradores): todos los eventos
+TODAS_LAS_SEDES = None
+
+
+class LimiteConexionesError(Exception):
+    """Se alcanzó el máximo de conexiones SSE abiertas en este proceso."""
+
+
+class BusEventos:
+    def __init__(self, max_conexiones=100, tamano_cola=50):
+        self.max_conexiones = max_conexiones
+        self.tamano_cola = tamano_cola
+        self._suscriptores = {} # id_sede (o TODAS_LAS_SEDES) -> set de colas
+        self._conexiones = 0
+        self._lock = threading.Lock()
+        self.publicados = 0
+        self.descartados = 0
+
+    def suscribir(self, id_sede):
+        """Abre una cola para la sede; lanza LimiteConexionesError si no quedan conexiones."""
+        with self._lock:
+            if self._conexiones >= self.max_conexiones:
+                raise LimiteConexionesError()
+            cola = queue.Queue(maxsize=self.tamano_cola)
+            self._suscriptores.setdefault(id_sede, set()).add(cola)
+            self._conexiones += 1
+            return cola
+
+    def cancelar(self, id_sede, cola):
+        with self._lock:
+            colas = self._suscriptores.get(id_sede)
+            if colas and cola in colas:
+                colas.discard(cola)
+                self._conexiones -= 1
+                if not colas:
+                    del self._suscriptores[id_sede]
+
+    def publicar(self, id_sede, evento):
+        """Entrega el evento a los suscriptores de la sede y a los de todas las sedes, sin bloquear."""
+        with self._lock:
+            colas = list(self._suscriptores.get(id_sede, ())) + list(self._suscriptores.get(TODAS_LAS_SEDES, ()))
+            self.publicados += 1
+        for cola in colas:
+            try:
+                cola.put_nowait(evento)
+            except queue.Full:
+                # Cliente lento: se pierde el evento; el dashboard se pone al día con su siguiente sondeo
+                self.descartados += 1
+
+    def configurar(self, max_conexiones):
+        with self._lock:
+            self.max_conexiones = max_conexiones
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'conexiones': self._conexiones,
+                'max_conexiones': self.max_conexiones,
+                'sedes': len(self._suscriptores),
+                'publicados': self.publicados,
+                'descartados': self.descartados,
+            }
+
+
+bus_eventos = BusEventos()
+
+
+def version_pedidos(id_sede):
+    """
+    Sello de mesas y pedidos de la sede (0 si aún no tiene fila). Con TODAS_LAS_SEDES
+    (administradores) es la suma de los sellos de todas las sedes: una fila por sede.
+    """
+    if id_sede is TODAS_LAS_SEDES:
+        return int(db.session.query(func.coalesce(func.sum(VersionPedidosSede.version), 0)).scalar())
+    version = db.session.query(VersionPedidosSede.version).filter_by(id_sede=id_sede).scalar()
+    return version or 0
+
+
+def incrementar_version_pedidos(id_sede):
+    """Aumenta el sello de la sede dentro de la transacción actual (no hace commit)."""
+    stmt = mysql_insert(VersionPedidosSede).values(id_sede=id_sede, version=1)
+    db.session.execute(stmt.on_duplicate_key_update(version=VersionPedidosSede.version + 1))
+
+
+def publicar_mesa(mesa):
+    bus_eventos.publicar(mesa.id_sede, {'tipo': 'mesa', 'id_mesa': mesa.id_mesa, 'estado': mesa.estado})
+
+
+def publicar_pedido(pedido, id_sede):
+    bus_eventos.publicar(id_sede, {
+        'tipo': 'pedido',
+        'id_pedido': pedido.id_pedido,
+        'id_mesa': pedido.id_mesa,
+        'id_mesero': pedido.id_usuario_mesero,
+        'estado': pedido.estado,
+        'total': float(pedido.total_pedido),
+    })
+
+
+def flujo_sse(cola, keepalive=15):
+    """Generador del cuerpo text/event-stream."""
+    yield 'retry: 5000\n\n'
+    while True:
+        try:
+            evento = cola.get(timeout=keepalive)
+        except queue.Empty:
+            yield ': ping\n\n' # Mantiene viva la conexión a través de proxies
+            continue
+        yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, separators=(',', ':'))}\n\n"
+
+
+def respuesta_sse(id_sede):
+    """
+    Respuesta SSE suscrita a la sede (TODAS_LAS_SEDES para administradores), o 503 si el
+    proceso ya tiene el máximo de conexiones abiertas.
+    """
+    try:
+        cola = bus_eventos.suscribir(id_sede)
+    except LimiteConexionesError:
+        return Response('Demasiadas conexiones de eventos abiertas.', status=503, headers={'Retry-After': '30'})
+
+    # La conexión puede durar horas: devolvemos la conexión a MySQL que usó el login al pool
+    db.session.remove()
+
+    respuesta = Response(flujo_sse(cola, current_app.config['SSE_KEEPALIVE_SECONDS']), mimetype='text/event-stream',
+                         headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Se libera la suscripción al cerrarse la respuesta (cliente desconectado)
+    respuesta.call_on_close(lambda: bus_eventos.cancelar(id_sede, cola))
+    return respuesta
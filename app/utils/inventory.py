@@ -0,0 +1,201 @@
+# app/utils/inventory.py
+# Reserva atómica de stock y valor del inventario por sede. El valor se mantiene como un
+# acumulado en Valor_Inventario_Sede que se ajusta con cada cambio de stock o de costo;
+# la suma en SQL queda para verificar y reconstruir.
+
+import threading
+import time
+from decimal import Decimal
+
+from sqlalchemy import func, update, case
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.inventory import Inventario, ValorInventarioSede
+from app.models.product import Producto
+
+
+def valor_inventario_sql(id_sede):
+    """Costo total del inventario de una sede (SUM(cantidad * costo_compra)) calculado en MySQL."""
+    valor = db.session.query(
+        func.coalesce(func.sum(Inventario.cantidad * Producto.costo_compra), 0)
+    ).join(Producto, Inventario.id_producto == Producto.id_producto)\
+     .filter(Inventario.id_sede == id_sede).scalar()
+    return Decimal(valor)
+
+
+def ajustar_valor_inventario(id_sede, delta):
+    """
+    Suma delta (positivo o negativo) al valor de la sede con un UPDATE atómico, dentro de la
+    transacción actual. Si la sede aún no tiene fila no hace nada: obtener_valor_inventario
+    la creará con la suma en SQL, que ya incluye este cambio.
+    """
+    if not delta:
+        return
+    ValorInventarioSede.query.filter_by(id_sede=id_sede).update(
+        {ValorInventarioSede.valor: ValorInventarioSede.valor + Decimal(delta)},
+        synchronize_session=False
+    )
+
+
+def ajustar_valor_por_stock(id_sede, producto, cantidad_anterior, cantidad_nueva):
+    """Ajuste por un cambio de cantidad de un producto en una sede."""
+    ajustar_valor_inventario(id_sede, (cantidad_nueva - cantidad_anterior) * Decimal(producto.costo_compra))
+
+
+def bloquear_item_inventario(id_inventario):
+    """
+    Relee la fila de inventario con SELECT ... FOR UPDATE (lectura actual, no la del inicio de
+    la petición) y la deja bloqueada hasta el commit: ningún pedido cambia su cantidad mientras
+    se calcula el ajuste del valor. None si la fila ya no existe.
+    """
+    return Inventario.query.filter_by(id_inventario=id_inventario)\
+        .with_for_update().populate_existing().first()
+
+
+def ajustar_valor_por_costo(id_producto, costo_anterior, costo_nuevo):
+    """Ajusta todas las sedes que tienen stock de un producto cuyo costo de compra cambió."""
+    diferencia = Decimal(str(costo_nuevo)) - Decimal(str(costo_anterior))
+    if not diferencia:
+        return
+    stock_por_sede = db.session.query(Inventario.id_sede, Inventario.cantidad)\
+        .filter(Inventario.id_producto == id_producto, Inventario.cantidad > 0).all()
+    for id_sede, cantidad in stock_por_sede:
+        ajustar_valor_inventario(id_sede, cantidad * diferencia)
+
+
+def recalcular_valor_inventario(id_sede):
+    """Reemplaza el acumulado de la sede por la suma en SQL (no hace commit). Devuelve (anterior, nuevo)."""
+    nuevo = valor_inventario_sql(id_sede)
+    registro = ValorInventarioSede.query.get(id_sede)
+    anterior = registro.valor if registro else None
+    if registro:
+        registro.valor = nuevo
+    else:
+        db.session.add(ValorInventarioSede(id_sede=id_sede, valor=nuevo))
+    return anterior, nuevo
+
+
+def obtener_valor_inventario(id_sede):
+    """Valor acumulado de la sede; la primera vez se calcula con la suma en SQL y se guarda."""
+    registro = ValorInventarioSede.query.get(id_sede)
+    if registro:
+        return registro.valor
+    nuevo = valor_inventario_sql(id_sede)
+    # Dos primeras lecturas simultáneas insertan la misma fila: la segunda deja la que ya existe
+    # (que puede tener ajustes posteriores) en lugar de fallar con IntegrityError
+    stmt = mysql_insert(ValorInventarioSede).values(id_sede=id_sede, valor=nuevo)
+    db.session.execute(stmt.on_duplicate_key_update(valor=ValorInventarioSede.valor))
+    db.session.commit()
+    return nuevo
+
+
+def consulta_menor_stock(id_sede, k):
+    """Los k productos disponibles (no bloqueados) con menos stock de la sede, de menor a mayor."""
+    return db.session.query(
+        Inventario.id_inventario, Inventario.cantidad, Producto.nombre
+    ).join(Producto, Inventario.id_producto == Producto.id_producto)\
+     .filter(Inventario.id_sede == id_sede, Inventario.esta_bloqueado == False)\
+     .order_by(Inventario.cantidad, Inventario.id_inventario).limit(k)
+
+
+# --- Reserva de stock ---
+
+# Códigos de MySQL por los que vale la pena repetir la transacción: deadlock y espera de bloqueo agotada
+ERRORES_REINTENTABLES = (1213, 1205)
+
+
+class ContadorReintentos:
+    """Transacciones repetidas por ejecutar_con_reintentos en este proceso, por código de MySQL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reintentos = {codigo: 0 for codigo in ERRORES_REINTENTABLES}
+        self.agotados = 0 # Transacciones que fallaron también en el último intento
+
+    def registrar(self, codigo, agotado=False):
+        with self._lock:
+            if agotado:
+                self.agotados += 1
+            else:
+                self.reintentos[codigo] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'deadlocks_1213': self.reintentos[1213],
+                'esperas_bloqueo_1205': self.reintentos[1205],
+                'agotados': self.agotados,
+            }
+
+
+contador_reintentos = ContadorReintentos()
+
+
+class StockInsuficienteError(Exception):
+    """No hay stock suficiente (o el producto está bloqueado) en la sede."""
+
+    def __init__(self, id_producto, disponible):
+        super().__init__(f'Stock insuficiente para el producto {id_producto}. Stock actual: {disponible}')
+        self.id_producto = id_producto
+        self.disponible = disponible
+
+
+def stock_disponible(id_sede, id_producto):
+    """Cantidad vendible del producto en la sede (0 si no existe o está bloqueado)."""
+    item = db.session.query(Inventario.cantidad, Inventario.esta_bloqueado)\
+        .filter_by(id_sede=id_sede, id_producto=id_producto).first()
+    return 0 if not item or item.esta_bloqueado else item.cantidad
+
+
+def reservar_stock(id_sede, id_producto, cantidad):
+    """
+    Descuenta stock con un único UPDATE condicional, sin leer la cantidad antes en Python:
+
+        UPDATE Inventario SET esta_bloqueado = (cantidad = :n), cantidad = cantidad - :n
+        WHERE id_sede = :s AND id_producto = :p AND cantidad >= :n AND NOT esta_bloqueado
+
+    La fila queda bloqueada solo lo que dura la sentencia, dos meseros no pueden vender la
+    misma última unidad y el producto se bloquea solo al llegar a cero. Si no se actualizó
+    ninguna fila lanza StockInsuficienteError.
+    """
+    # MySQL asigna de izquierda a derecha: esta_bloqueado se calcula con la cantidad anterior
+    stmt = update(Inventario).where(
+        Inventario.id_sede == id_sede,
+        Inventario.id_producto == id_producto,
+        Inventario.cantidad >= cantidad,
+        Inventario.esta_bloqueado == False
+    ).ordered_values(
+        (Inventario.esta_bloqueado, case((Inventario.cantidad == cantidad, True), else_=False)),
+        (Inventario.cantidad, Inventario.cantidad - cantidad),
+    ).execution_options(synchronize_session=False)
+
+    if db.session.execute(stmt).rowcount != 1:
+        raise StockInsuficienteError(id_producto, stock_disponible(id_sede, id_producto))
+
+
+def ejecutar_con_reintentos(operacion, intentos=3, espera=0.05):
+    """
+    Ejecuta operacion() y hace commit. Si MySQL aborta la transacción por un deadlock o una
+    espera de bloqueo, hace rollback y repite la operación completa (hasta 'intentos' veces);
+    cada repetición se cuenta en contador_reintentos. Cualquier otro error hace rollback y se
+    propaga.
+    """
+    for intento in range(1, intentos + 1):
+        try:
+            resultado = operacion()
+            db.session.commit()
+            return resultado
+        except OperationalError as e:
+            db.session.rollback()
+            codigo = e.orig.args[0] if e.orig is not None and e.orig.args else None
+            if codigo not in ERRORES_REINTENTABLES:
+                raise
+            contador_reintentos.registrar(codigo, agotado=intento == intentos)
+            if intento == intentos:
+                raise
+            time.sleep(espera * intento)
+        except Exception:
+            db.session.rollback()
+            raise
@@ -0,0 +1,93 @@
+# app/utils/menu_cache.py
+# Caché en memoria del menú disponible de cada sede (productos no bloqueados con stock).
+#
+# Cada proceso del servidor tiene su propia caché, así que la validez no se decide en memoria:
+# Version_Menu_Sede guarda un sello por sede que aumenta, en la misma transacción, con cada
+# cambio de stock o de precio. Antes de servir una entrada se lee el sello (una búsqueda por
+# llave primaria) y si no coincide se reconstruye el menú. Un agotado confirmado en cualquier
+# proceso cambia el sello, y ningún proceso vuelve a servir el menú anterior.
+
+import threading
+from collections import namedtuple
+
+from sqlalchemy import literal
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.inventory import Inventario, VersionMenuSede
+from app.models.product import Producto
+
+ItemMenu = namedtuple('ItemMenu', ['id_producto', 'nombre', 'precio_venta', 'cantidad'])
+
+
+def version_menu(id_sede):
+    """Sello actual del menú de la sede (0 si aún no tiene fila)."""
+    version = db.session.query(VersionMenuSede.version).filter_by(id_sede=id_sede).scalar()
+    return version or 0
+
+
+def incrementar_version_menu(id_sede):
+    """Aumenta el sello de la sede dentro de la transacción actual (no hace commit)."""
+    stmt = mysql_insert(VersionMenuSede).values(id_sede=id_sede, version=1)
+    db.session.execute(stmt.on_duplicate_key_update(version=VersionMenuSede.version + 1))
+
+
+def incrementar_version_menu_producto(id_producto):
+    """Aumenta el sello de todas las sedes que tienen el producto en su inventario (cambio de precio o nombre)."""
+    sedes = db.session.query(Inventario.id_sede, literal(1)).filter(Inventario.id_producto == id_producto)
+    stmt = mysql_insert(VersionMenuSede).from_select(['id_sede', 'version'], sedes)
+    db.session.execute(stmt.on_duplicate_key_update(version=VersionMenuSede.version + 1))
+
+
+def consulta_menu(id_sede):
+    """Productos vendibles de la sede con nombre, precio y cantidad (usa idx_Inventario_sede_bloqueado_cantidad)."""
+    return db.session.query(
+        Producto.id_producto, Producto.nombre, Producto.precio_venta, Inventario.cantidad
+    ).join(Producto, Inventario.id_producto == Producto.id_producto)\
+     .filter(Inventario.id_sede == id_sede, Inventario.esta_bloqueado == False, Inventario.cantidad > 0)\
+     .order_by(Producto.nombre)
+
+
+def construir_menu(id_sede):
+    """Menú de la sede en una sola consulta."""
+    return tuple(ItemMenu(*fila) for fila in consulta_menu(id_sede).all())
+
+
+class CacheMenu:
+    def __init__(self):
+        self._entradas = {} # id_sede -> (version, items)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, id_sede):
+        """Menú disponible de la sede; se reconstruye si el sello en la base de datos cambió."""
+        version = version_menu(id_sede)
+        with self._lock:
+            entrada = self._entradas.get(id_sede)
+            if entrada is not None and entrada[0] == version:
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+
+        # El sello se leyó antes que el menú: si cambia mientras tanto, la próxima lectura
+        # verá un sello distinto y reconstruirá
+        items = construir_menu(id_sede)
+        with self._lock:
+            actual = self._entradas.get(id_sede)
+            if actual is None or actual[0] <= version:
+                self._entradas[id_sede] = (version, items)
+        return items
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'sedes': len(self._entradas),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+cache_menu = CacheMenu()
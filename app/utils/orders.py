@@ -0,0 +1,147 @@
+# app/utils/orders.py
+# Operaciones sobre pedidos compartidas por las vistas del mesero.
+
+from app import db
+from app.models.order import Pedido, DetallePedido
+from app.models.branch import Mesa
+from app.models.inventory import Inventario
+from app.models.product import Producto
+from app.utils.inventory import reservar_stock, ajustar_valor_inventario, StockInsuficienteError
+from app.utils.menu_cache import incrementar_version_menu
+from app.utils.events import incrementar_version_pedidos
+
+ESTADOS_EDITABLES = ['pendiente', 'en_preparacion'] # Estados en los que se pueden añadir productos
+
+
+class MesaNoDisponibleError(Exception):
+    """La mesa no existe, ya está ocupada o pertenece a otra sede."""
+
+    def __init__(self, id_mesa):
+        super().__init__(f'La mesa {id_mesa} no está libre o no pertenece a tu sede.')
+        self.id_mesa = id_mesa
+
+
+class PedidoNoEditableError(ValueError):
+    """El pedido ya no admite productos (lo cobraron o cambió de estado mientras se añadían)."""
+
+    def __init__(self, id_pedido):
+        super().__init__(f'El pedido {id_pedido} ya no admite productos; no se añadió ninguna línea.')
+        self.id_pedido = id_pedido
+
+
+def abrir_pedido(id_mesa, id_usuario_mesero, id_sede=None):
+    """
+    Ocupa la mesa solo si sigue libre (UPDATE condicional, dos meseros no abren la misma mesa)
+    y crea su pedido, dentro de la transacción actual (no hace commit). Si se da id_sede, la
+    mesa debe pertenecer a esa sede. Aumenta el sello de pedidos de la sede. Lanza
+    MesaNoDisponibleError si no se pudo ocupar.
+    """
+    filtro = Mesa.query.filter_by(id_mesa=id_mesa, estado='libre')
+    if id_sede is not None:
+        filtro = filtro.filter(Mesa.id_sede == id_sede)
+    if filtro.update({Mesa.estado: 'ocupada'}, synchronize_session=False) != 1:
+        raise MesaNoDisponibleError(id_mesa)
+    if id_sede is None:
+        id_sede = db.session.query(Mesa.id_sede).filter_by(id_mesa=id_mesa).scalar()
+    incrementar_version_pedidos(id_sede) # Los dashboards de la sede deben pedir de nuevo su panel
+    pedido = Pedido(estado='pendiente', total_pedido=0.00, id_usuario_mesero=id_usuario_mesero, id_mesa=id_mesa)
+    db.session.add(pedido)
+    db.session.flush() # Asigna id_pedido
+    return pedido
+
+
+def normalizar_lineas(lineas):
+    """
+    Convierte pares (id_producto, cantidad) en un dict {id_producto: cantidad}, sumando los
+    productos repetidos. Lanza ValueError si alguna línea no es válida.
+    """
+    cantidades = {}
+    for id_producto, cantidad in lineas:
+        if not id_producto or not cantidad or cantidad <= 0:
+            raise ValueError('Cada línea debe tener un producto y una cantidad mayor que cero.')
+        cantidades[id_producto] = cantidades.get(id_producto, 0) + cantidad
+    if not cantidades:
+        raise ValueError('El pedido no tiene líneas.')
+    return cantidades
+
+
+def agregar_lineas_pedido(pedido, lineas):
+    """
+    Añade varias líneas a un pedido dentro de la transacción actual (no hace commit).
+
+    - Valida el stock de todas las líneas con una sola consulta.
+    - Reserva cada línea con el UPDATE condicional de reservar_stock.
+    - Suma a los DetallePedido existentes (cargados en una sola consulta) o crea los nuevos.
+    - Suma a total_pedido (y a su versión) con un UPDATE condicional al estado: si el pedido se cobró o cambió de
+      estado mientras tanto, lanza PedidoNoEditableError.
+    - Actualiza el valor del inventario, el sello del menú y el de pedidos una sola vez.
+
+    Si alguna línea falla lanza StockInsuficienteError y quien llama hace rollback de todo,
+    incluido el stock ya reservado (ejecutar_con_reintentos lo hace solo). Devuelve el valor
+    añadido al total del pedido.
+    """
+    cantidades = normalizar_lineas(lineas)
+    id_sede = pedido.mesa.id_sede
+    ids = list(cantidades)
+
+    # Stock y precios de todos los productos en una consulta
+    filas = db.session.query(Inventario.cantidad, Inventario.esta_bloqueado, Producto)\
+        .join(Producto, Inventario.id_producto == Producto.id_producto)\
+        .filter(Inventario.id_sede == id_sede, Inventario.id_producto.in_(ids)).all()
+    productos = {}
+    for disponible, bloqueado, producto in filas:
+        if bloqueado or disponible < cantidades[producto.id_producto]:
+            raise StockInsuficienteError(producto.id_producto, 0 if bloqueado else disponible)
+        productos[producto.id_producto] = producto
+    for id_producto in ids:
+        if id_producto not in productos:
+            raise StockInsuficienteError(id_producto, 0) # No está en el inventario de la sede
+
+    # Líneas que ya existen en el pedido, en una consulta
+    existentes = {
+        d.id_producto: d for d in DetallePedido.query.filter(
+            DetallePedido.id_pedido == pedido.id_pedido,
+            DetallePedido.id_producto.in_(ids)
+        ).all()
+    }
+
+    total_agregado = 0
+    costo_agregado = 0
+    nuevos = []
+    for id_producto in ids:
+        cantidad = cantidades[id_producto]
+        producto = productos[id_producto]
+        # La validación de arriba es para fallar rápido; la garantía la da el UPDATE condicional
+        reservar_stock(id_sede, id_producto, cantidad)
+
+        detalle = existentes.get(id_producto)
+        if detalle:
+            detalle.cantidad = DetallePedido.cantidad + cantidad
+            detalle.subtotal = DetallePedido.subtotal + cantidad * detalle.precio_unitario
+            total_agregado += cantidad * detalle.precio_unitario
+        else:
+            nuevos.append(DetallePedido(
+                cantidad=cantidad,
+                precio_unitario=producto.precio_venta,
+                costo_unitario=producto.costo_compra,
+                subtotal=cantidad * producto.precio_venta,
+                id_pedido=pedido.id_pedido,
+                id_producto=id_producto
+            ))
+            total_agregado += cantidad * producto.precio_venta
+        costo_agregado += cantidad * producto.costo_compra
+
+    # La comprobación de estado de quien llama no basta: un pago puede cerrar el pedido entre medio
+    actualizados = Pedido.query.filter(
+        Pedido.id_pedido == pedido.id_pedido,
+        Pedido.estado.in_(ESTADOS_EDITABLES)
+    ).update({Pedido.total_pedido: Pedido.total_pedido + total_agregado, Pedido.version: Pedido.version + 1},
+             synchronize_session=False)
+    if actualizados != 1:
+        raise PedidoNoEditableError(pedido.id_pedido)
+
+    db.session.add_all(nuevos)
+    ajustar_valor_inventario(id_sede, -costo_agregado)
+    incrementar_version_menu(id_sede) # Las cantidades del menú de la sede cambiaron
+    incrementar_version_pedidos(id_sede) # El total del pedido cambió
+    return total_agregado
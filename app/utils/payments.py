@@ -0,0 +1,143 @@
+# app/utils/payments.py
+# Registro de pagos sin cobros dobles entre cajeros simultáneos o envíos repetidos.
+
+import json
+from decimal import Decimal
+
+from sqlalchemy import update, and_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.order import Pedido
+from app.models.branch import Mesa
+from app.models.payment import Pago
+from app.models.idempotency import ClaveIdempotencia
+from app.utils.sales_summary import registrar_pedido_en_resumen
+from app.utils.cash_drawer import registrar_efectivo
+from app.utils.report_cache import incrementar_version_ventas
+from app.utils.events import incrementar_version_pedidos
+
+# Estados en los que un pedido sigue abierto (pendiente de cobro)
+ESTADOS_PEDIDO_ABIERTO = ['pendiente', 'en_preparacion', 'servido']
+
+
+def consulta_mesas_ocupadas(id_sede=None):
+    """
+    Mesas ocupadas con el id, total y hora de creación de su pedido abierto, en una consulta.
+    El join usa idx_Pedidos_mesa_estado_fecha, que incluye las tres columnas (no lee la fila).
+    """
+    query = db.session.query(Mesa, Pedido.id_pedido, Pedido.total_pedido, Pedido.fecha_creacion).outerjoin(
+        Pedido, and_(Pedido.id_mesa == Mesa.id_mesa, Pedido.estado.in_(ESTADOS_PEDIDO_ABIERTO))
+    ).options(joinedload(Mesa.sede)).filter(Mesa.estado == 'ocupada')
+    if id_sede is not None:
+        query = query.filter(Mesa.id_sede == id_sede)
+    return query.order_by(Mesa.id_mesa)
+
+
+def consulta_pedido_abierto(id_mesa):
+    """Pedido abierto más reciente de la mesa (recorre solo las entradas del índice para esa mesa)."""
+    return Pedido.query.filter(
+        Pedido.id_mesa == id_mesa, Pedido.estado.in_(ESTADOS_PEDIDO_ABIERTO)
+    ).order_by(Pedido.fecha_creacion.desc())
+
+
+class PedidoNoCobrableError(Exception):
+    """El pedido ya fue pagado o cancelado (por ejemplo, otro cajero lo cobró primero)."""
+
+
+class MontoInsuficienteError(Exception):
+    """El monto recibido es menor que el total del pedido."""
+
+    def __init__(self, total):
+        super().__init__(f'El monto recibido es menor al total del pedido (${total:,.2f}).')
+        self.total = total
+
+
+class PagoEnProcesoError(Exception):
+    """Otra petición con el mismo token de pago se está registrando en este momento."""
+
+
+def _devuelta_desde_json(devuelta):
+    if devuelta is None:
+        return None
+    desglose, faltante = devuelta
+    return {int(valor): cantidad for valor, cantidad in desglose.items()}, faltante
+
+
+def pago_registrado(token):
+    """(pago, monto_recibido, devuelta) ya registrados con este token (reenvío o doble clic), o None."""
+    if not token:
+        return None
+    previa = db.session.get(ClaveIdempotencia, token)
+    if previa is None or previa.tipo != 'pago' or not previa.resultado:
+        return None
+    resultado = json.loads(previa.resultado)
+    return (db.session.get(Pago, resultado['id_pago']), Decimal(resultado['monto_recibido']),
+            _devuelta_desde_json(resultado.get('devuelta')))
+
+
+def registrar_pago(id_pedido, metodo_pago, monto_recibido, id_usuario_cajero, token=None, id_turno=None):
+    """
+    Cobra el pedido dentro de la transacción actual (no hace commit; usar con
+    ejecutar_con_reintentos). La sección crítica es la transición de estado:
+
+        UPDATE Pedidos SET estado = 'pagado' WHERE id_pedido = :id AND estado IN (abiertos)
+
+    Solo una petición puede cambiar la fila; las demás ven rowcount 0 y no insertan un Pago.
+    El token se reserva antes en Claves_Idempotencia, así que un doble envío del mismo
+    formulario espera por el bloqueo de la clave y luego ve el pago del primero.
+
+    Si el pago es en efectivo y se da el turno de caja del cajero, la caja se actualiza en la
+    misma transacción. Devuelve (pago, devuelta) donde devuelta es (desglose, faltante)
+    calculado con las existencias de la caja, o None sin turno.
+    """
+    if token:
+        try:
+            with db.session.begin_nested():
+                db.session.add(ClaveIdempotencia(clave=token, tipo='pago', id_usuario=id_usuario_cajero))
+        except IntegrityError:
+            raise PagoEnProcesoError()
+
+    cobrado = db.session.execute(
+        update(Pedido).where(Pedido.id_pedido == id_pedido, Pedido.estado.in_(ESTADOS_PEDIDO_ABIERTO))
+        .values(estado='pagado', version=Pedido.version + 1).execution_options(synchronize_session=False)
+    ).rowcount
+    if cobrado != 1:
+        raise PedidoNoCobrableError()
+
+    # La fila queda bloqueada hasta el commit: el total ya no puede cambiar
+    pedido = db.session.get(Pedido, id_pedido, populate_existing=True)
+    if monto_recibido < pedido.total_pedido:
+        raise MontoInsuficienteError(pedido.total_pedido)
+
+    db.session.execute(
+        update(Mesa).where(Mesa.id_mesa == pedido.id_mesa).values(estado='libre')
+        .execution_options(synchronize_session=False)
+    )
+    pago = Pago(
+        monto_pago=pedido.total_pedido, # Registramos el total del pedido como monto pagado
+        metodo_pago=metodo_pago,
+        id_pedido=id_pedido,
+        id_usuario_cajero=id_usuario_cajero
+    )
+    db.session.add(pago)
+
+    # Acumular las ventas del pedido en el resumen diario (misma transacción)
+    registrar_pedido_en_resumen(pedido)
+    # Los reportes en caché de este día y sede dejan de ser válidos en todos los procesos
+    incrementar_version_ventas(pedido.mesa.id_sede, pedido.fecha_creacion.date())
+    # La mesa quedó libre y el pedido cerrado: los dashboards de la sede deben pedir su panel
+    incrementar_version_pedidos(pedido.mesa.id_sede)
+
+    devuelta = None
+    if metodo_pago == 'efectivo' and id_turno is not None:
+        devuelta = registrar_efectivo(id_turno, monto_recibido, monto_recibido - pedido.total_pedido)
+
+    db.session.flush()
+    if token:
+        db.session.get(ClaveIdempotencia, token).resultado = json.dumps({
+            'id_pago': pago.id_pago, 'id_pedido': id_pedido, 'monto_recibido': str(monto_recibido),
+            'devuelta': devuelta
+        })
+    return pago, devuelta
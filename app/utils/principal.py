@@ -0,0 +1,144 @@
+# app/utils/principal.py
+# Usuario autenticado compacto (principal) para Flask-Login, en caché por proceso con TTL.
+#
+# load_user corre en cada petición; antes eran dos consultas (el usuario con su sede y luego
+# el rol, cargado de forma perezosa por los guardias before_request). El principal guarda solo
+# lo que leen las rutas y plantillas (id, rol, sede, nombre) y no está ligado a la sesión de
+# SQLAlchemy.
+#
+# La caché es por proceso, pero el rol y el permiso de entrar no pueden esperar al TTL en los
+# demás workers: un acierto compara Usuarios.version_sesion (una lectura por clave primaria)
+# con el sello guardado junto al principal. edit_user y los cambios de contraseña aumentan el
+# sello en la misma transacción; un usuario eliminado ya no tiene fila y deja de autenticarse.
+# Para no pagar esa lectura en cada petición, un principal verificado hace menos de
+# PRINCIPAL_CHECK_SECONDS se sirve sin consultar: un cambio hecho en otro proceso tarda como
+# mucho esa ventana en verse (en el mismo proceso, invalidar() lo aplica de inmediato).
+# El TTL (PRINCIPAL_TTL_SECONDS) solo acota cuánto se conserva el nombre de la sede.
+
+import threading
+import time
+from collections import namedtuple
+
+from flask_login import UserMixin
+
+from app import db
+from app.models.user import User, Role
+from app.models.branch import Sede
+
+RolPrincipal = namedtuple('RolPrincipal', ['id_rol', 'nombre_rol'])
+SedePrincipal = namedtuple('SedePrincipal', ['id_sede', 'nombre_sede'])
+
+
+class Principal(UserMixin, namedtuple('Principal', [
+        'id_usuario', 'nombre_usuario', 'nombre_completo', 'id_rol', 'nombre_rol', 'id_sede', 'nombre_sede'])):
+    """Inmutable; expone role y sede con los mismos nombres que el modelo User."""
+    __slots__ = ()
+
+    @property
+    def role(self):
+        return RolPrincipal(self.id_rol, self.nombre_rol)
+
+    @property
+    def sede(self):
+        return SedePrincipal(self.id_sede, self.nombre_sede) if self.id_sede is not None else None
+
+    def get_id(self):
+        return str(self.id_usuario) # Flask-Login requiere que retorne una cadena
+
+    def usuario(self):
+        """Modelo User completo (por ejemplo para verificar o cambiar la contraseña)."""
+        return db.session.get(User, self.id_usuario)
+
+
+def cargar_principal(id_usuario):
+    """
+    (principal, version_sesion) del usuario en una sola consulta (usuario, rol y sede), o
+    (None, None) si no existe.
+    """
+    fila = db.session.query(
+        User.id_usuario, User.nombre_usuario, User.nombre_completo,
+        Role.id_rol, Role.nombre_rol, User.id_sede, Sede.nombre_sede, User.version_sesion
+    ).join(Role, User.id_rol == Role.id_rol)\
+     .outerjoin(Sede, User.id_sede == Sede.id_sede)\
+     .filter(User.id_usuario == id_usuario).first()
+    if fila is None:
+        return None, None
+    return Principal(*fila[:-1]), fila[-1]
+
+
+def version_sesion(id_usuario):
+    """Sello actual del usuario, o None si ya no existe."""
+    return db.session.query(User.version_sesion).filter(User.id_usuario == id_usuario).scalar()
+
+
+def incrementar_version_sesion(usuario):
+    """Invalida el principal del usuario en todos los procesos (se aplica con el commit de quien llama)."""
+    usuario.version_sesion = User.version_sesion + 1
+
+
+class CachePrincipales:
+    def __init__(self, ttl=60, ventana_verificacion=5):
+        self.ttl = ttl
+        self.ventana_verificacion = ventana_verificacion
+        self._entradas = {} # id_usuario -> (vence, verificado, version_sesion, principal)
+        self._lock = threading.Lock()
+        # Aumenta con cada invalidación: un principal leído antes no se guarda al terminar
+        self.generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def configurar(self, ttl, ventana_verificacion=0):
+        with self._lock:
+            self.ttl = ttl
+            self.ventana_verificacion = ventana_verificacion
+            self._entradas.clear()
+
+    def obtener(self, id_usuario):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(id_usuario)
+            generacion = self.generacion
+
+        if entrada is not None and entrada[0] > ahora:
+            vence, verificado, version, principal = entrada
+            if ahora - verificado < self.ventana_verificacion:
+                with self._lock:
+                    self.aciertos += 1
+                return principal
+            # El sello en la base decide: otro proceso pudo cambiar el rol o eliminar al usuario
+            if version_sesion(id_usuario) == version:
+                with self._lock:
+                    self.aciertos += 1
+                    if self._entradas.get(id_usuario) is entrada: # No se invalidó mientras tanto
+                        self._entradas[id_usuario] = (vence, ahora, version, principal)
+                return principal
+
+        with self._lock:
+            self.fallos += 1
+        principal, version = cargar_principal(id_usuario)
+        with self._lock:
+            if principal is None:
+                self._entradas.pop(id_usuario, None)
+            elif self.ttl > 0 and generacion == self.generacion:
+                self._entradas[id_usuario] = (ahora + self.ttl, ahora, version, principal)
+        return principal
+
+    def invalidar(self, id_usuario):
+        with self._lock:
+            self.generacion += 1
+            self._entradas.pop(id_usuario, None)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'usuarios': len(self._entradas),
+                'ttl': self.ttl,
+                'ventana_verificacion': self.ventana_verificacion,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+cache_principales = CachePrincipales()
@@ -0,0 +1,56 @@
+# app/utils/query_budget.py
+# Conteo de sentencias SQL por petición y presupuesto por vista.
+#
+# Las pantallas de meseros y cajeros deben ejecutar un número fijo de consultas sin importar
+# cuántas mesas o líneas haya (sin N+1). Cada vista declara su presupuesto con
+# @presupuesto_consultas(n); si una petición lo supera se registra una advertencia, y con
+# SQL_QUERY_BUDGET_STRICT=1 la petición falla, para detectarlo en desarrollo.
+#
+# scripts/check_query_budget.py lo hace cumplir: muestra cada pantalla con pocas y con muchas
+# mesas y líneas, en modo estricto, y falla si el número de sentencias cambia.
+
+from functools import wraps
+
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class PresupuestoConsultasExcedido(Exception):
+    """Una vista ejecutó más sentencias SQL de las que declaró."""
+
+
+def _contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.consultas_sql = g.get('consultas_sql', 0) + 1
+
+
+def presupuesto_consultas(maximo):
+    """Declara el máximo de sentencias SQL que puede ejecutar la vista (incluye cargar el usuario)."""
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            g.presupuesto_sql = maximo
+            return vista(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _revisar_presupuesto(response):
+    consultas = g.get('consultas_sql', 0)
+    if current_app.debug or current_app.testing:
+        response.headers['X-SQL-Queries'] = str(consultas)
+    maximo = g.get('presupuesto_sql')
+    if maximo is not None and consultas > maximo:
+        mensaje = f'{consultas} sentencias SQL en {request.endpoint} (presupuesto: {maximo})'
+        current_app.logger.warning(mensaje)
+        if current_app.config.get('SQL_QUERY_BUDGET_STRICT'):
+            raise PresupuestoConsultasExcedido(mensaje)
+    return response
+
+
+def registrar_presupuesto_consultas(app):
+    """Activa el conteo de sentencias (todas las conexiones) y la revisión al final de cada petición."""
+    if not event.contains(Engine, 'before_cursor_execute', _contar_sentencia):
+        event.listen(Engine, 'before_cursor_execute', _contar_sentencia)
+    app.after_request(_revisar_presupuesto)
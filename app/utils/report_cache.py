@@ -0,0 +1,132 @@
+# app/utils/report_cache.py
+# Caché en memoria de los reportes ya generados, con expulsión LRU limitada por tamaño.
+#
+# Cada proceso del servidor tiene su propia caché, así que la validez no se decide en memoria:
+# Version_Ventas_Dia guarda un sello por día y sede que aumenta, en la misma transacción, con
+# cada pago. Cada entrada guarda la suma de los sellos de su rango (y sede) al empezar a
+# generarse; antes de servirla se vuelve a leer esa suma y si cambió la entrada se descarta.
+# Un pago registrado en cualquier proceso invalida los reportes que lo incluyen en todos.
+
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.sales_summary import VersionVentasDia
+from app.utils.db_routing import sesion_lectura
+
+
+def version_ventas(fecha_inicio, fecha_fin, id_sede):
+    """
+    Sello de las ventas del rango y la sede (todas si id_sede es None): la suma de los sellos
+    diarios, que solo crece. Una búsqueda por rango en la llave primaria. Se lee en la misma
+    sesión (y transacción) que el reporte, así el sello corresponde a los datos leídos aunque
+    vengan de una réplica atrasada.
+    """
+    query = sesion_lectura().query(func.coalesce(func.sum(VersionVentasDia.version), 0))
+    if fecha_inicio:
+        query = query.filter(VersionVentasDia.fecha >= fecha_inicio.date())
+    if fecha_fin:
+        query = query.filter(VersionVentasDia.fecha <= fecha_fin.date())
+    if id_sede:
+        query = query.filter(VersionVentasDia.id_sede == id_sede)
+    return int(query.scalar())
+
+
+def incrementar_version_ventas(id_sede, fecha):
+    """Aumenta el sello del día y la sede dentro de la transacción actual (no hace commit)."""
+    stmt = mysql_insert(VersionVentasDia).values(fecha=fecha, id_sede=id_sede, version=1)
+    db.session.execute(stmt.on_duplicate_key_update(version=VersionVentasDia.version + 1))
+
+
+class CacheReportes:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_bytes_entrada=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_bytes_entrada = max_bytes_entrada
+        self._entradas = OrderedDict() # clave -> (version, contenido en bytes); el final es lo más reciente
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def clave(tipo_reporte, export_format, fecha_inicio, fecha_fin, id_sede):
+        return (tipo_reporte, export_format, fecha_inicio, fecha_fin, id_sede or None)
+
+    def obtener(self, clave, version):
+        """Contenido guardado con este sello de ventas, o None (y se descarta si el sello cambió)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            if entrada[0] != version:
+                # Hubo pagos en el rango desde que se generó (en este u otro proceso)
+                self._bytes -= len(self._entradas.pop(clave)[1])
+                self.invalidaciones += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, contenido, version):
+        """Guarda el reporte con el sello leído antes de generarlo; si hubo pagos mientras tanto, no se servirá."""
+        if len(contenido) > self.max_bytes_entrada:
+            return False
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[1])
+            self._entradas[clave] = (version, contenido)
+            self._bytes += len(contenido)
+            while self._bytes > self.max_bytes:
+                _, (_, expulsado) = self._entradas.popitem(last=False)
+                self._bytes -= len(expulsado)
+                self.expulsiones += 1
+            return True
+
+    def configurar(self, max_bytes, max_bytes_entrada):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.max_bytes_entrada = max_bytes_entrada
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'expulsiones': self.expulsiones,
+                'invalidaciones': self.invalidaciones,
+            }
+
+
+cache_reportes = CacheReportes()
+
+
+def guardar_mientras_envia(bloques, clave, version, cache=cache_reportes):
+    """
+    Deja pasar los bloques del reporte hacia la respuesta y, si el reporte completo
+    cabe en una entrada de la caché, lo guarda al terminar con el sello leído antes de generarlo.
+    """
+    partes = []
+    tamano = 0
+    for bloque in bloques:
+        if partes is not None:
+            tamano += len(bloque)
+            if tamano <= cache.max_bytes_entrada:
+                partes.append(bloque)
+            else:
+                partes = None # Demasiado grande para la caché; solo lo enviamos
+        yield bloque
+    if partes is not None:
+        cache.guardar(clave, b''.join(partes), version)
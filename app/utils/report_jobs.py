@@ -0,0 +1,282 @@
+# app/utils/report_jobs.py
+# Cola de reportes pesados: se ejecutan en un pool de procesos local, fuera del ciclo de la petición HTTP.
+#
+# El estado de cada trabajo vive en un archivo JSON dentro de REPORTS_DIR, así cualquier proceso
+# (el worker web que lo encoló, otro worker o el proceso del pool) puede consultarlo y actualizarlo.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.utils.reports import TIPOS_REPORTE, TAMANO_LOTE_REPORTE, filas_en_lotes, generar_csv, escribir_excel
+from app.utils.db_routing import en_lectura
+
+EXTENSIONES = {'csv': 'csv', 'excel': 'xlsx'}
+MIMETYPES = {
+    'csv': 'text/csv',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# App de Flask propia de cada proceso del pool (se crea en _inicializar_worker)
+_app_worker = None
+
+
+# --- Archivos de estado ---
+
+def _ruta_estado(directorio, id_trabajo):
+    return os.path.join(directorio, f'{id_trabajo}.json')
+
+
+def _ruta_activo(directorio, clave):
+    return os.path.join(directorio, f'activo-{clave}')
+
+
+def _leer_estado(directorio, id_trabajo):
+    try:
+        with open(_ruta_estado(directorio, id_trabajo), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _escribir_estado(directorio, estado):
+    # Escribimos en un temporal y lo renombramos para que nunca se lea un JSON a medias
+    ruta = _ruta_estado(directorio, estado['id'])
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+
+
+def _actualizar_estado(directorio, id_trabajo, **campos):
+    estado = _leer_estado(directorio, id_trabajo)
+    if estado is None:
+        return None
+    estado.update(campos)
+    estado['actualizado'] = time.time() # Señal de vida para detectar trabajos huérfanos
+    _escribir_estado(directorio, estado)
+    return estado
+
+
+def _liberar_clave(directorio, estado):
+    # Solo si la marca sigue siendo de este trabajo: un trabajo dado por huérfano pudo ser reemplazado
+    ruta = _ruta_activo(directorio, estado['clave'])
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            if f.read().strip() != estado['id']:
+                return
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def es_huerfano(estado, limite_segundos):
+    """
+    Un trabajo sin terminar cuyo proceso del pool ya no existe (servidor reiniciado, proceso
+    muerto a mitad del reporte) o que no avanza hace más de limite_segundos.
+    """
+    if estado['estado'] not in ('pendiente', 'en_proceso'):
+        return False
+    if estado.get('pid') and not _proceso_vivo(estado['pid']):
+        return True
+    ultima_senal = estado.get('actualizado') or estado.get('creado') or 0
+    return time.time() - ultima_senal > limite_segundos
+
+
+def _marcar_interrumpido(directorio, estado):
+    estado = _actualizar_estado(directorio, estado['id'], estado='error', terminado=time.time(),
+                                error='El trabajo se interrumpió (el proceso del reporte terminó antes de tiempo).')
+    if estado:
+        _liberar_clave(directorio, estado)
+    return estado
+
+
+def clave_parametros(parametros):
+    """Huella de los parámetros normalizados; dos solicitudes iguales producen la misma clave."""
+    normalizado = json.dumps(parametros, sort_keys=True, default=str)
+    return hashlib.sha1(normalizado.encode('utf-8')).hexdigest()
+
+
+# --- Ejecución dentro del pool ---
+
+def _inicializar_worker():
+    global _app_worker
+    from app import create_app
+    _app_worker = create_app()
+
+
+def _contar_progreso(filas, directorio, id_trabajo):
+    """
+    Deja pasar las filas y anota las procesadas en el archivo de estado cada TAMANO_LOTE_REPORTE
+    filas. El total no se calcula: contarlo ejecutaría la consulta pesada dos veces.
+    """
+    procesadas = 0
+    for procesadas, fila in enumerate(filas, start=1):
+        if procesadas % TAMANO_LOTE_REPORTE == 0:
+            _actualizar_estado(directorio, id_trabajo, procesadas=procesadas)
+        yield fila
+    _actualizar_estado(directorio, id_trabajo, procesadas=procesadas)
+
+
+def _ejecutar_trabajo(directorio, id_trabajo, parametros):
+    # El estado pudo borrarse (expirado o interrumpido) mientras el trabajo esperaba en la cola
+    estado = _actualizar_estado(directorio, id_trabajo, estado='en_proceso', pid=os.getpid())
+    if estado is None:
+        return
+    with _app_worker.app_context():
+        try:
+            encabezados, consulta, fila = TIPOS_REPORTE[parametros['tipo_reporte']]
+            fecha_inicio = datetime.fromisoformat(parametros['fecha_inicio']) if parametros['fecha_inicio'] else None
+            fecha_fin = datetime.fromisoformat(parametros['fecha_fin']) if parametros['fecha_fin'] else None
+            query = en_lectura(consulta(fecha_inicio, fecha_fin, parametros['id_sede'])) # Réplica si está configurada
+
+            filas = _contar_progreso(filas_en_lotes(query, fila), directorio, id_trabajo)
+
+            if parametros['export_format'] == 'excel':
+                escribir_excel(filas, estado['ruta'], encabezados)
+            else:
+                with open(estado['ruta'], 'wb') as f:
+                    for bloque in generar_csv(filas, encabezados):
+                        f.write(bloque)
+
+            _actualizar_estado(directorio, id_trabajo, estado='listo', terminado=time.time())
+        except Exception as e:
+            _actualizar_estado(directorio, id_trabajo, estado='error', error=str(e), terminado=time.time())
+        finally:
+            _liberar_clave(directorio, estado)
+
+
+def _obtener_pool(app):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' para que los procesos del pool no hereden conexiones abiertas del worker web
+            _pool = ProcessPoolExecutor(
+                max_workers=app.config['REPORT_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker
+            )
+        return _pool
+
+
+def _al_terminar(directorio, id_trabajo):
+    def callback(futuro):
+        # Si el proceso del pool murió, el trabajo nunca llegó a marcarse como terminado
+        if futuro.exception() is not None:
+            estado = _actualizar_estado(directorio, id_trabajo, estado='error',
+                                        error=str(futuro.exception()), terminado=time.time())
+            if estado:
+                _liberar_clave(directorio, estado)
+    return callback
+
+
+# --- API usada por las rutas ---
+
+def limpiar_expirados(app):
+    """
+    Marca como interrumpidos los trabajos huérfanos y borra los archivos y el estado de los
+    trabajos terminados hace más de REPORT_TTL_SECONDS.
+    """
+    directorio = app.config['REPORTS_DIR']
+    if not os.path.isdir(directorio):
+        return
+    limite = time.time() - app.config['REPORT_TTL_SECONDS']
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith('.json'):
+            continue
+        estado = _leer_estado(directorio, nombre[:-5])
+        if estado and es_huerfano(estado, app.config['REPORT_STALE_SECONDS']):
+            estado = _marcar_interrumpido(directorio, estado)
+        if estado and estado.get('terminado') and estado['terminado'] < limite:
+            for ruta in (estado['ruta'], _ruta_estado(directorio, estado['id'])):
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+
+
+def encolar_reporte(app, tipo_reporte, export_format, fecha_inicio, fecha_fin, id_sede):
+    """
+    Encola un reporte y devuelve el id del trabajo. Si ya hay un trabajo en curso con
+    exactamente los mismos parámetros, devuelve el id de ese trabajo en lugar de crear otro.
+    """
+    directorio = app.config['REPORTS_DIR']
+    os.makedirs(directorio, exist_ok=True)
+    limpiar_expirados(app)
+
+    parametros = {
+        'tipo_reporte': tipo_reporte,
+        'export_format': export_format,
+        'fecha_inicio': fecha_inicio.isoformat() if fecha_inicio else None,
+        'fecha_fin': fecha_fin.isoformat() if fecha_fin else None,
+        'id_sede': id_sede,
+    }
+    clave = clave_parametros(parametros)
+    id_trabajo = uuid.uuid4().hex
+
+    # El archivo 'activo-<clave>' se crea de forma exclusiva: si ya existe, hay un trabajo igual en curso
+    try:
+        fd = os.open(_ruta_activo(directorio, clave), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        with open(_ruta_activo(directorio, clave), encoding='utf-8') as f:
+            id_existente = f.read().strip()
+        existente = _leer_estado(directorio, id_existente) if id_existente else None
+        if existente and not es_huerfano(existente, app.config['REPORT_STALE_SECONDS']):
+            return id_existente
+        if existente:
+            _marcar_interrumpido(directorio, existente)
+        # Marca huérfana (p. ej. el servidor se reinició a mitad del trabajo): la reemplazamos
+        fd = os.open(_ruta_activo(directorio, clave), os.O_CREAT | os.O_TRUNC | os.O_WRONLY)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(id_trabajo)
+
+    extension = EXTENSIONES[export_format]
+    _escribir_estado(directorio, {
+        'id': id_trabajo,
+        'clave': clave,
+        'estado': 'pendiente',
+        'export_format': export_format,
+        'ruta': os.path.join(directorio, f'{id_trabajo}.{extension}'),
+        'nombre_archivo': f'reporte_ventas_{datetime.now().strftime("%Y%m%d%H%M%S")}.{extension}',
+        'procesadas': 0,
+        'error': None,
+        'creado': time.time(),
+        'actualizado': time.time(),
+        'pid': None,
+        'terminado': None,
+    })
+
+    futuro = _obtener_pool(app).submit(_ejecutar_trabajo, directorio, id_trabajo, parametros)
+    futuro.add_done_callback(_al_terminar(directorio, id_trabajo))
+    return id_trabajo
+
+
+def obtener_trabajo(app, id_trabajo):
+    """Devuelve el estado del trabajo (con las filas procesadas) o None si no existe o ya expiró."""
+    # El id viene de la URL: solo aceptamos hexadecimales para no salirnos de REPORTS_DIR
+    if not all(c in '0123456789abcdef' for c in id_trabajo):
+        return None
+    estado = _leer_estado(app.config['REPORTS_DIR'], id_trabajo)
+    if estado is None:
+        return None
+    estado['mimetype'] = MIMETYPES[estado['export_format']]
+    return estado
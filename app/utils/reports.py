@@ -0,0 +1,229 @@
+# app/utils/reports.py
+# Consultas y escritores de archivos para los reportes de ventas.
+
+import csv
+import io
+
+from sqlalchemy import func, cast, Date
+
+from app import db
+from app.models.order import Pedido, DetallePedido
+from app.models.product import Producto, CategoriaProducto
+from app.models.branch import Sede, Mesa
+from app.models.sales_summary import ResumenVentaDiaria
+
+# Filas que se piden al servidor MySQL en cada lote al exportar
+TAMANO_LOTE_REPORTE = 1000
+
+ENCABEZADOS_REPORTE = [
+    'Fecha Pedido', 'Código Producto', 'Nombre Producto', 'Cantidad',
+    'Costo de lo Vendido', 'Ventas', 'Ganancia', 'Sede'
+]
+
+ENCABEZADOS_RESUMEN = [
+    'Fecha', 'Sede', 'Código Producto', 'Nombre Producto', 'Cantidad',
+    'Costo de lo Vendido', 'Ventas', 'Ganancia'
+]
+
+
+def consulta_detalle_ventas(fecha_inicio, fecha_fin, id_sede):
+    """Construye la consulta de detalle de ventas (solo pedidos pagados) con los filtros del formulario."""
+    query = db.session.query(
+        Pedido.fecha_creacion,
+        Producto.codigo.label('codigo_producto'),
+        Producto.nombre.label('nombre_producto'),
+        DetallePedido.cantidad,
+        DetallePedido.costo_unitario,
+        DetallePedido.precio_unitario,
+        DetallePedido.subtotal,
+        Sede.nombre_sede
+    ).join(DetallePedido, Pedido.id_pedido == DetallePedido.id_pedido)\
+     .join(Producto, DetallePedido.id_producto == Producto.id_producto)\
+     .join(Mesa, Pedido.id_mesa == Mesa.id_mesa)\
+     .join(Sede, Mesa.id_sede == Sede.id_sede)\
+     .filter(Pedido.estado == 'pagado') # Solo reportes de pedidos pagados
+
+    # Filtrar por fecha de creación del pedido
+    if fecha_inicio:
+        query = query.filter(Pedido.fecha_creacion >= fecha_inicio)
+    if fecha_fin:
+        query = query.filter(Pedido.fecha_creacion <= fecha_fin)
+
+    # Filtrar por sede
+    if id_sede:
+        query = query.filter(Sede.id_sede == id_sede)
+
+    return query
+
+
+def fila_reporte(row):
+    """Convierte una fila de la consulta en la lista de valores del reporte (mismo orden que ENCABEZADOS_REPORTE)."""
+    costo_vendido = row.cantidad * row.costo_unitario
+    ventas = row.subtotal # Subtotal ya es cantidad * precio_unitario
+    ganancia = ventas - costo_vendido
+    return [
+        row.fecha_creacion.strftime('%Y-%m-%d %H:%M'),
+        row.codigo_producto,
+        row.nombre_producto,
+        row.cantidad,
+        f"{costo_vendido:.2f}",
+        f"{ventas:.2f}",
+        f"{ganancia:.2f}",
+        row.nombre_sede
+    ]
+
+
+def consulta_resumen_diario(fecha_inicio, fecha_fin, id_sede):
+    """Consulta Resumen_Ventas_Diarias: una fila por día, sede y producto en lugar de una por línea de pedido."""
+    query = db.session.query(
+        ResumenVentaDiaria.fecha,
+        Sede.nombre_sede,
+        Producto.codigo.label('codigo_producto'),
+        Producto.nombre.label('nombre_producto'),
+        ResumenVentaDiaria.cantidad,
+        ResumenVentaDiaria.costo,
+        ResumenVentaDiaria.ventas,
+        ResumenVentaDiaria.ganancia
+    ).join(Sede, ResumenVentaDiaria.id_sede == Sede.id_sede)\
+     .join(Producto, ResumenVentaDiaria.id_producto == Producto.id_producto)
+
+    # El resumen guarda días completos, así que comparamos solo la fecha
+    if fecha_inicio:
+        query = query.filter(ResumenVentaDiaria.fecha >= fecha_inicio.date())
+    if fecha_fin:
+        query = query.filter(ResumenVentaDiaria.fecha <= fecha_fin.date())
+    if id_sede:
+        query = query.filter(ResumenVentaDiaria.id_sede == id_sede)
+
+    return query.order_by(ResumenVentaDiaria.fecha, Sede.nombre_sede, Producto.nombre)
+
+
+def fila_resumen(row):
+    """Convierte una fila del resumen diario en la lista de valores de ENCABEZADOS_RESUMEN."""
+    return [
+        row.fecha.strftime('%Y-%m-%d'),
+        row.nombre_sede,
+        row.codigo_producto,
+        row.nombre_producto,
+        row.cantidad,
+        f"{row.costo:.2f}",
+        f"{row.ventas:.2f}",
+        f"{row.ganancia:.2f}"
+    ]
+
+
+# --- Reportes agrupados: la suma se hace en MySQL y a Python solo llegan las filas ya agregadas ---
+
+COLUMNAS_TOTALES = ['Cantidad', 'Costo de lo Vendido', 'Ventas', 'Ganancia']
+
+# agrupación: (encabezados de las columnas clave, función que devuelve las expresiones clave)
+AGRUPACIONES = {
+    'producto': (['Código Producto', 'Nombre Producto'], lambda: [Producto.codigo, Producto.nombre]),
+    'dia': (['Fecha'], lambda: [cast(Pedido.fecha_creacion, Date)]),
+    'sede': (['Sede'], lambda: [Sede.nombre_sede]),
+    'categoria': (['Categoría'], lambda: [CategoriaProducto.nombre]),
+}
+
+
+def _consulta_agrupada(agrupacion):
+    """Devuelve una función con la misma firma que consulta_detalle_ventas, pero agrupada en SQL."""
+    def consulta(fecha_inicio, fecha_fin, id_sede):
+        claves = AGRUPACIONES[agrupacion][1]()
+        costo = func.sum(DetallePedido.cantidad * DetallePedido.costo_unitario)
+        ventas = func.sum(DetallePedido.subtotal)
+        query = db.session.query(
+            *claves,
+            func.sum(DetallePedido.cantidad),
+            costo,
+            ventas,
+            ventas - costo
+        ).select_from(Pedido)\
+         .join(DetallePedido, Pedido.id_pedido == DetallePedido.id_pedido)\
+         .join(Producto, DetallePedido.id_producto == Producto.id_producto)\
+         .join(Mesa, Pedido.id_mesa == Mesa.id_mesa)\
+         .join(Sede, Mesa.id_sede == Sede.id_sede)\
+         .filter(Pedido.estado == 'pagado')
+
+        if agrupacion == 'categoria':
+            query = query.join(CategoriaProducto, Producto.id_categoria == CategoriaProducto.id_categoria)
+        if fecha_inicio:
+            query = query.filter(Pedido.fecha_creacion >= fecha_inicio)
+        if fecha_fin:
+            query = query.filter(Pedido.fecha_creacion <= fecha_fin)
+        if id_sede:
+            query = query.filter(Mesa.id_sede == id_sede)
+
+        # En producto agrupamos por id para no mezclar dos productos con el mismo nombre
+        agrupar = [Producto.id_producto, *claves] if agrupacion == 'producto' else claves
+        return query.group_by(*agrupar).order_by(*claves)
+    return consulta
+
+
+def fila_agrupada(row):
+    """Columnas clave tal cual y luego las cuatro sumas (cantidad, costo, ventas, ganancia)."""
+    *claves, cantidad, costo, ventas, ganancia = row
+    return [
+        *[str(c) if c is not None else '' for c in claves],
+        int(cantidad),
+        f"{costo:.2f}",
+        f"{ventas:.2f}",
+        f"{ganancia:.2f}"
+    ]
+
+
+# Tipos de reporte disponibles: (encabezados, función que arma la consulta, función que arma cada fila)
+TIPOS_REPORTE = {
+    'detalle': (ENCABEZADOS_REPORTE, consulta_detalle_ventas, fila_reporte),
+    'diario': (ENCABEZADOS_RESUMEN, consulta_resumen_diario, fila_resumen),
+    'por_producto': (AGRUPACIONES['producto'][0] + COLUMNAS_TOTALES, _consulta_agrupada('producto'), fila_agrupada),
+    'por_dia': (AGRUPACIONES['dia'][0] + COLUMNAS_TOTALES, _consulta_agrupada('dia'), fila_agrupada),
+    'por_sede': (AGRUPACIONES['sede'][0] + COLUMNAS_TOTALES, _consulta_agrupada('sede'), fila_agrupada),
+    'por_categoria': (AGRUPACIONES['categoria'][0] + COLUMNAS_TOTALES, _consulta_agrupada('categoria'), fila_agrupada),
+}
+
+
+def filas_en_lotes(query, fila=fila_reporte):
+    """Recorre la consulta con un cursor sin buffer, trayendo TAMANO_LOTE_REPORTE filas por lote."""
+    for row in query.yield_per(TAMANO_LOTE_REPORTE):
+        yield fila(row)
+
+
+def generar_csv(filas, encabezados=ENCABEZADOS_REPORTE):
+    """
+    Genera el CSV por bloques de bytes. Si las filas vienen de filas_en_lotes, la
+    memoria no crece con el rango de fechas y el primer bloque sale antes de que
+    termine la consulta.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(encabezados)
+
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if i % TAMANO_LOTE_REPORTE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def escribir_excel(filas, ruta, encabezados=ENCABEZADOS_REPORTE, hoja='Reporte de Ventas'):
+    """
+    Escribe el reporte en un archivo XLSX usando el modo constant_memory de xlsxwriter:
+    cada fila se vuelca a disco al pasar a la siguiente, así que el consumo de memoria
+    es el de una sola fila sin importar cuántas lleguen. Recibe cualquier iterable de
+    filas (consulta o datos sintéticos) y devuelve cuántas filas escribió.
+    """
+    import xlsxwriter # Solo se necesita al generar Excel
+
+    workbook = xlsxwriter.Workbook(ruta, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet(hoja)
+        worksheet.write_row(0, 0, encabezados)
+        total = 0
+        for total, fila in enumerate(filas, start=1):
+            worksheet.write_row(total, 0, fila)
+    finally:
+        workbook.close()
+    return total
@@ -0,0 +1,102 @@
+# app/utils/restock.py
+# Planeación de reabastecimiento por sede: cuánto comprar de cada producto según su
+# velocidad de venta reciente y el stock actual, dentro de un presupuesto.
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import db
+from app.models.order import Pedido, DetallePedido
+from app.models.branch import Mesa
+from app.models.inventory import Inventario
+from app.models.product import Producto
+from app.utils.algorithms import recomendar_reabastecimiento_acotado
+
+# Por debajo de este total de candidatos (todas las sedes) la DP tarda menos que arrancar el pool
+MIN_CANDIDATOS_PARALELO = 200
+
+# Pool compartido por todas las peticiones del proceso; se crea la primera vez que hace falta
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def candidatos_sede(id_sede, dias_historial=30, dias_cobertura=7):
+    """
+    Productos de la sede que conviene reponer. En una sola consulta se trae, por producto
+    del inventario, el stock actual y lo vendido (pedidos pagados) en los últimos dias_historial días.
+    La cantidad máxima a comprar es la demanda esperada para dias_cobertura días menos el stock.
+    """
+    desde = datetime.utcnow() - timedelta(days=dias_historial)
+    vendido = db.session.query(
+        DetallePedido.id_producto.label('id_producto'),
+        func.sum(DetallePedido.cantidad).label('vendido')
+    ).join(Pedido, DetallePedido.id_pedido == Pedido.id_pedido)\
+     .join(Mesa, Pedido.id_mesa == Mesa.id_mesa)\
+     .filter(Mesa.id_sede == id_sede, Pedido.estado == 'pagado', Pedido.fecha_creacion >= desde)\
+     .group_by(DetallePedido.id_producto).subquery()
+
+    filas = db.session.query(
+        Producto.id_producto, Producto.nombre, Producto.costo_compra, Producto.precio_venta,
+        Inventario.cantidad, func.coalesce(vendido.c.vendido, 0)
+    ).join(Inventario, Inventario.id_producto == Producto.id_producto)\
+     .outerjoin(vendido, vendido.c.id_producto == Producto.id_producto)\
+     .filter(Inventario.id_sede == id_sede).all()
+
+    candidatos = []
+    for id_producto, nombre, costo, precio, stock, cantidad_vendida in filas:
+        ganancia = float(precio) - float(costo)
+        velocidad = float(cantidad_vendida) / dias_historial # unidades por día
+        faltante = math.ceil(velocidad * dias_cobertura) - stock
+        if ganancia > 0 and faltante > 0: # Solo productos rentables que se van a agotar
+            candidatos.append({
+                'id': id_producto,
+                'nombre': nombre,
+                'costo': int(costo),
+                'ganancia': int(ganancia),
+                'cantidad_max': faltante,
+                'stock': stock,
+                'velocidad': round(velocidad, 2),
+            })
+    return candidatos
+
+
+def planificar_sede(presupuesto, candidatos, granularidad=None):
+    """Plan de compra de una sede. Solo usa datos en memoria, así que puede correr en otro proceso."""
+    return recomendar_reabastecimiento_acotado(presupuesto, candidatos, granularidad)
+
+
+def _obtener_pool(max_workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' para que los procesos no hereden conexiones abiertas del worker web; los
+            # procesos quedan vivos (con NumPy ya importado) para las siguientes peticiones
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def planificar_todas(presupuesto, candidatos_por_sede, granularidad=None, max_workers=2):
+    """
+    Planea todas las sedes (la DP es CPU pura). Con pocos candidatos se resuelve en este proceso;
+    si no, en un pool de procesos compartido de hasta max_workers procesos (RESTOCK_WORKERS).
+    candidatos_por_sede: {id_sede: candidatos}. Devuelve {id_sede: (plan, ganancia)}.
+    """
+    ids = list(candidatos_por_sede)
+    total = sum(len(c) for c in candidatos_por_sede.values())
+    if len(ids) <= 1 or total < MIN_CANDIDATOS_PARALELO:
+        return {id_sede: planificar_sede(presupuesto, candidatos_por_sede[id_sede], granularidad) for id_sede in ids}
+
+    pool = _obtener_pool(max(1, min(max_workers, os.cpu_count() or 1)))
+    resultados = pool.map(
+        planificar_sede,
+        [presupuesto] * len(ids),
+        [candidatos_por_sede[id_sede] for id_sede in ids],
+        [granularidad] * len(ids)
+    )
+    return dict(zip(ids, resultados))
@@ -0,0 +1,95 @@
+# app/utils/sales_summary.py
+# Mantenimiento de la tabla Resumen_Ventas_Diarias.
+
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, cast, Date
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import db
+from app.models.order import Pedido, DetallePedido
+from app.models.branch import Mesa
+from app.models.sales_summary import ResumenVentaDiaria
+
+
+def registrar_pedido_en_resumen(pedido):
+    """
+    Suma los productos de un pedido recién pagado al resumen diario.
+    Usa la sesión actual, así que queda en la misma transacción que marca el pedido como 'pagado'.
+    """
+    totales = db.session.query(
+        DetallePedido.id_producto,
+        func.sum(DetallePedido.cantidad).label('cantidad'),
+        func.sum(DetallePedido.subtotal).label('ventas'),
+        func.sum(DetallePedido.cantidad * DetallePedido.costo_unitario).label('costo')
+    ).filter(DetallePedido.id_pedido == pedido.id_pedido)\
+     .group_by(DetallePedido.id_producto).all()
+
+    if not totales:
+        return
+
+    filas = [{
+        'fecha': pedido.fecha_creacion.date(),
+        'id_sede': pedido.mesa.id_sede,
+        'id_producto': t.id_producto,
+        'cantidad': t.cantidad,
+        'ventas': t.ventas,
+        'costo': t.costo,
+        'ganancia': t.ventas - t.costo,
+    } for t in totales]
+
+    # INSERT ... ON DUPLICATE KEY UPDATE: una sola sentencia para todas las líneas del pedido
+    stmt = mysql_insert(ResumenVentaDiaria).values(filas)
+    stmt = stmt.on_duplicate_key_update(
+        cantidad=ResumenVentaDiaria.cantidad + stmt.inserted.cantidad,
+        ventas=ResumenVentaDiaria.ventas + stmt.inserted.ventas,
+        costo=ResumenVentaDiaria.costo + stmt.inserted.costo,
+        ganancia=ResumenVentaDiaria.ganancia + stmt.inserted.ganancia,
+    )
+    db.session.execute(stmt)
+
+
+def reconstruir_resumen(fecha_inicio=None, fecha_fin=None):
+    """
+    Vuelve a calcular el resumen desde Detalle_Pedido para el rango de días dado
+    (o para todo el histórico). Borra e inserta en una sola transacción.
+    Devuelve el número de filas del resumen insertadas.
+    """
+    # La fecha del pedido solo se agrupa; el rango se filtra sobre la columna sin funciones
+    # (fecha_creacion >= inicio AND < fin + 1 día) para que use idx_Pedidos_estado_fecha
+    fecha_pedido = cast(Pedido.fecha_creacion, Date)
+
+    borrar = ResumenVentaDiaria.query
+    if fecha_inicio:
+        borrar = borrar.filter(ResumenVentaDiaria.fecha >= fecha_inicio)
+    if fecha_fin:
+        borrar = borrar.filter(ResumenVentaDiaria.fecha <= fecha_fin)
+    borrar.delete(synchronize_session=False)
+
+    costo = func.sum(DetallePedido.cantidad * DetallePedido.costo_unitario)
+    ventas = func.sum(DetallePedido.subtotal)
+    seleccion = db.session.query(
+        fecha_pedido,
+        Mesa.id_sede,
+        DetallePedido.id_producto,
+        func.sum(DetallePedido.cantidad),
+        ventas,
+        costo,
+        ventas - costo
+    ).join(DetallePedido, Pedido.id_pedido == DetallePedido.id_pedido)\
+     .join(Mesa, Pedido.id_mesa == Mesa.id_mesa)\
+     .filter(Pedido.estado == 'pagado')
+    if fecha_inicio:
+        seleccion = seleccion.filter(Pedido.fecha_creacion >= datetime.combine(fecha_inicio, time.min))
+    if fecha_fin:
+        seleccion = seleccion.filter(Pedido.fecha_creacion < datetime.combine(fecha_fin + timedelta(days=1), time.min))
+    seleccion = seleccion.group_by(fecha_pedido, Mesa.id_sede, DetallePedido.id_producto)
+
+    resultado = db.session.execute(
+        ResumenVentaDiaria.__table__.insert().from_select(
+            ['fecha', 'id_sede', 'id_producto', 'cantidad', 'ventas', 'costo', 'ganancia'],
+            seleccion.statement
+        )
+    )
+    db.session.commit()
+    return resultado.rowcount
@@ -0,0 +1,157 @@
+# app/utils/sync.py
+# Sincronización de la cola offline del mesero: un lote de operaciones con claves de
+# idempotencia generadas en el cliente, aplicado en orden dentro de una sola transacción.
+#
+# Cada operación corre en su propio SAVEPOINT: si falla (mesa ocupada, sin stock) se deshace
+# solo esa operación y el resto del lote se confirma. La clave se inserta en
+# Claves_Idempotencia junto con el efecto de la operación, así que reenviar el lote (o parte)
+# devuelve los resultados guardados sin repetir nada.
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.order import Pedido
+from app.models.idempotency import ClaveIdempotencia
+from app.utils.orders import abrir_pedido, agregar_lineas_pedido, MesaNoDisponibleError, ESTADOS_EDITABLES
+from app.utils.inventory import StockInsuficienteError
+from app.utils.events import publicar_mesa, publicar_pedido
+
+TIPOS_OPERACION = ('crear_pedido', 'agregar_lineas')
+MAX_OPERACIONES_LOTE = 200
+
+
+class OperacionInvalidaError(ValueError):
+    """El lote o una de sus operaciones no tiene el formato esperado."""
+
+
+def validar_lote(operaciones):
+    """Revisa el formato de todo el lote antes de tocar la base de datos."""
+    if not isinstance(operaciones, list) or not operaciones:
+        raise OperacionInvalidaError('El lote no tiene operaciones.')
+    if len(operaciones) > MAX_OPERACIONES_LOTE:
+        raise OperacionInvalidaError(f'El lote supera el máximo de {MAX_OPERACIONES_LOTE} operaciones.')
+    vistas = set()
+    for op in operaciones:
+        if not isinstance(op, dict):
+            raise OperacionInvalidaError('Cada operación debe ser un objeto.')
+        clave = op.get('clave')
+        if not isinstance(clave, str) or not 0 < len(clave) <= 64:
+            raise OperacionInvalidaError('Cada operación necesita una clave de 1 a 64 caracteres.')
+        if clave in vistas:
+            raise OperacionInvalidaError(f'La clave "{clave}" está repetida en el lote.')
+        if op.get('tipo') not in TIPOS_OPERACION:
+            raise OperacionInvalidaError(f'Tipo de operación no válido en "{clave}".')
+        vistas.add(clave)
+
+
+def _resolver_pedido(op, pedidos_por_clave, id_sede):
+    """Pedido destino: por id, o por la clave de la operación crear_pedido que lo abrió (offline no hay id)."""
+    if op.get('pedido_clave'):
+        id_pedido = pedidos_por_clave.get(op['pedido_clave'])
+        if id_pedido is None:
+            raise OperacionInvalidaError(f'El pedido "{op["pedido_clave"]}" no se creó.')
+    else:
+        try:
+            id_pedido = int(op['id_pedido'])
+        except (KeyError, TypeError, ValueError):
+            raise OperacionInvalidaError('Falta id_pedido o pedido_clave.')
+
+    pedido = Pedido.query.options(joinedload(Pedido.mesa)).get(id_pedido)
+    if pedido is None or (id_sede is not None and pedido.mesa.id_sede != id_sede):
+        raise OperacionInvalidaError(f'Pedido {id_pedido} no encontrado.')
+    if pedido.estado not in ESTADOS_EDITABLES:
+        raise OperacionInvalidaError(f'No se pueden añadir productos a un pedido en estado "{pedido.estado}".')
+    return pedido
+
+
+def _aplicar(op, id_usuario, id_sede, pedidos_por_clave):
+    if op['tipo'] == 'crear_pedido':
+        try:
+            id_mesa = int(op['id_mesa'])
+        except (KeyError, TypeError, ValueError):
+            raise OperacionInvalidaError('Falta id_mesa.')
+        pedido = abrir_pedido(id_mesa, id_usuario, id_sede)
+        pedidos_por_clave[op['clave']] = pedido.id_pedido
+        return {'id_pedido': pedido.id_pedido, 'id_mesa': id_mesa}
+
+    pedido = _resolver_pedido(op, pedidos_por_clave, id_sede)
+    try:
+        lineas = [(int(l['id_producto']), int(l['cantidad'])) for l in op.get('lineas') or []]
+    except (KeyError, TypeError, ValueError):
+        raise OperacionInvalidaError('Las líneas del pedido no son válidas.')
+    total = agregar_lineas_pedido(pedido, lineas)
+    return {'id_pedido': pedido.id_pedido, 'agregado': float(total)}
+
+
+def aplicar_lote(operaciones, id_usuario, id_sede=None):
+    """
+    Aplica las operaciones en orden dentro de la transacción actual (no hace commit) y devuelve
+    un resultado por operación con estado 'aplicada', 'repetida', 'error' o 'en_proceso' (la
+    misma clave se está aplicando en otra petición; el cliente debe reintentar).
+    Si se da id_sede, las mesas y pedidos deben ser de esa sede.
+    """
+    referidas = {op['pedido_clave'] for op in operaciones if op.get('pedido_clave')}
+    claves = [op['clave'] for op in operaciones]
+    existentes = {
+        c.clave: c for c in ClaveIdempotencia.query.filter(ClaveIdempotencia.clave.in_(set(claves) | referidas)).all()
+    }
+    # Pedidos creados por lotes anteriores, por si una operación nueva se refiere a ellos
+    pedidos_por_clave = {
+        c.clave: json.loads(c.resultado)['id_pedido'] for c in existentes.values()
+        if c.tipo == 'crear_pedido' and c.id_usuario == id_usuario and c.resultado
+    }
+
+    resultados = []
+    for op in operaciones:
+        clave = op['clave']
+        previa = existentes.get(clave)
+        if previa is not None:
+            if previa.id_usuario != id_usuario:
+                resultados.append({'clave': clave, 'estado': 'error', 'error': 'La clave pertenece a otro usuario.'})
+            else:
+                resultados.append({'clave': clave, 'estado': 'repetida', **json.loads(previa.resultado or '{}')})
+            continue
+
+        try:
+            with db.session.begin_nested():
+                registro = ClaveIdempotencia(clave=clave, tipo=op['tipo'], id_usuario=id_usuario)
+                db.session.add(registro)
+                db.session.flush() # Reserva la clave: un reenvío simultáneo espera aquí por el bloqueo
+                resultado = _aplicar(op, id_usuario, id_sede, pedidos_por_clave)
+                registro.resultado = json.dumps(resultado)
+        except IntegrityError:
+            resultados.append({'clave': clave, 'estado': 'en_proceso'})
+        except (MesaNoDisponibleError, StockInsuficienteError, ValueError) as e:
+            error = {'clave': clave, 'estado': 'error', 'error': str(e)}
+            if isinstance(e, StockInsuficienteError):
+                error.update(producto=e.id_producto, disponible=e.disponible)
+            resultados.append(error)
+        else:
+            resultados.append({'clave': clave, 'estado': 'aplicada', **resultado})
+    return resultados
+
+
+def publicar_resultados(operaciones, resultados):
+    """Después del commit: publica los eventos de las mesas ocupadas y los pedidos tocados por el lote."""
+    aplicadas = [(op, r) for op, r in zip(operaciones, resultados) if r['estado'] == 'aplicada']
+    if not aplicadas:
+        return
+    ids = {r['id_pedido'] for _, r in aplicadas}
+    pedidos = {p.id_pedido: p for p in Pedido.query.options(joinedload(Pedido.mesa)).filter(Pedido.id_pedido.in_(ids)).all()}
+    for op, r in aplicadas:
+        if op['tipo'] == 'crear_pedido':
+            publicar_mesa(pedidos[r['id_pedido']].mesa)
+    for pedido in pedidos.values():
+        publicar_pedido(pedido, pedido.mesa.id_sede)
+
+
+def purgar_claves(dias):
+    """Elimina las claves de más de 'dias' días (los clientes ya no reenviarán esas operaciones)."""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    borradas = ClaveIdempotencia.query.filter(ClaveIdempotencia.fecha < limite).delete(synchronize_session=False)
+    db.session.commit()
+    return borradas
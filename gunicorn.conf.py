@@ -0,0 +1,79 @@
+# gunicorn.conf.py
+# Servidor de producción: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Todos los valores se pueden cambiar con variables de entorno GUNICORN_*.
+#
+# Modelo de workers: procesos con hilos (gthread). Cada proceso atiende GUNICORN_THREADS
+# peticiones a la vez; los dashboards con eventos en vivo (SSE) ocupan un hilo mientras están
+# abiertos. SSE_MAX_CONNECTIONS (por defecto la mitad de los hilos) debe ser menor que
+# GUNICORN_THREADS para que siempre queden hilos para las peticiones normales.
+#
+# Cada proceso tiene su propio estado en memoria: el bus de eventos SSE, la caché del menú, la
+# de reportes y la de usuarios autenticados. Las cachés se validan contra sellos en la base de
+# datos, pero el bus no: un evento publicado en un worker solo llega a los dashboards
+# conectados a ese mismo worker. Por eso los dashboards además leen cada DASHBOARD_POLL_SECONDS
+# el sello de pedidos de su sede (Version_Pedidos_Sede, común a todos los workers) y vuelven a
+# pedir su panel solo cuando cambió: así ven los cambios hechos en los demás workers.
+#
+# Recarga sin cortar conexiones:
+#   kill -HUP <pid del maestro>   -> nuevos workers con la misma configuración; con preload_app
+#                                    el código NO se recarga (los workers salen del maestro).
+#   kill -USR2 <pid>, luego -WINCH y -QUIT al maestro anterior -> despliegue de código nuevo.
+
+import multiprocessing
+import os
+
+
+def _entero(nombre, defecto):
+    return int(os.environ.get(nombre, defecto))
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Conexiones a MySQL en el peor caso (max_connections de MySQL es 151 por defecto):
+#
+#   workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)     pools de los workers web
+#   + workers * REPORT_WORKERS                      procesos de reportes (una conexión cada uno)
+#
+# por la base principal, y lo mismo por la réplica si MYSQL_REPLICA_URI está configurada. Los
+# procesos del optimizador (RESTOCK_WORKERS) no abren conexiones. DB_POOL_SIZE sigue por
+# defecto a GUNICORN_THREADS: con 4 CPU son 9 * (8 + 2) + 9 * 2 = 108 conexiones.
+workers = _entero('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+worker_class = 'gthread'
+threads = _entero('GUNICORN_THREADS', 8)
+
+# Importa la app (y configura los mappers) una vez en el maestro antes de crear los workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Reciclado de workers para acotar la memoria; el jitter evita que todos se reinicien a la vez
+max_requests = _entero('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _entero('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# Segundos sin señales de vida antes de reiniciar un worker, y de espera al apagarlo
+timeout = _entero('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _entero('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Conexiones keep-alive: las tabletas de los meseros hacen peticiones seguidas. Debe ser
+# menor que el timeout de inactividad del proxy que esté delante.
+keepalive = _entero('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    sse = _entero('SSE_MAX_CONNECTIONS', max(1, threads // 2))
+    if sse >= threads:
+        server.log.warning(f'SSE_MAX_CONNECTIONS={sse} no es menor que GUNICORN_THREADS={threads}: '
+                           'los dashboards abiertos pueden ocupar todos los hilos de un worker.')
+
+
+def post_fork(server, worker):
+    # Las conexiones de los pools que haya abierto el maestro (principal y réplica) no se
+    # comparten entre procesos
+    from wsgi import app
+    from app import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -1,4 +1,6 @@
 -- init.sql
+-- Referencia del esquema para el contenedor de MySQL. La fuente del esquema son las migraciones
+-- de app/migrations ("flask init-db" / "flask migrate-db"); cualquier cambio va primero allí.
 -- Usar la base de datos bars_db
 USE bars_db;
 
@@ -31,6 +33,7 @@ CREATE TABLE IF NOT EXISTS `bars_db`.`Usuarios` (
   `id_sede` INT NULL,
   `pregunta_seguridad` VARCHAR(150) NULL,
   `respuesta_seguridad` VARCHAR(255) NULL,
+  `version_sesion` INT NOT NULL DEFAULT 0,
   -- -----------------------------------------
   PRIMARY KEY (`id_usuario`),
   UNIQUE INDEX `nombre_usuario_UNIQUE` (`nombre_usuario` ASC),
@@ -56,6 +59,7 @@ CREATE TABLE IF NOT EXISTS `bars_db`.`Mesas` (
   `id_sede` INT NOT NULL,
   PRIMARY KEY (`id_mesa`),
   INDEX `fk_Mesas_Sedes1_idx` (`id_sede` ASC),
+  INDEX `idx_Mesas_sede_estado` (`id_sede` ASC, `estado` ASC),
   CONSTRAINT `fk_Mesas_Sedes1`
     FOREIGN KEY (`id_sede`)
     REFERENCES `bars_db`.`Sedes` (`id_sede`)
@@ -105,6 +109,8 @@ CREATE TABLE IF NOT EXISTS `bars_db`.`Inventario` (
   UNIQUE INDEX `_producto_sede_uc` (`id_producto` ASC, `id_sede` ASC),
   INDEX `fk_Inventario_Productos1_idx` (`id_producto` ASC),
   INDEX `fk_Inventario_Sedes1_idx` (`id_sede` ASC),
+  INDEX `idx_Inventario_sede_cantidad` (`id_sede` ASC, `cantidad` ASC),
+  INDEX `idx_Inventario_sede_bloqueado_cantidad` (`id_sede` ASC, `esta_bloqueado` ASC, `cantidad` ASC),
   CONSTRAINT `fk_Inventario_Productos1`
     FOREIGN KEY (`id_producto`)
     REFERENCES `bars_db`.`Productos` (`id_producto`)
@@ -126,9 +132,13 @@ CREATE TABLE IF NOT EXISTS `bars_db`.`Pedidos` (
   `fecha_creacion` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `id_usuario_mesero` INT NOT NULL,
   `id_mesa` INT NOT NULL,
+  `version` INT NOT NULL DEFAULT 0,
   PRIMARY KEY (`id_pedido`),
   INDEX `fk_Pedidos_Usuarios1_idx` (`id_usuario_mesero` ASC),
   INDEX `fk_Pedidos_Mesas1_idx` (`id_mesa` ASC),
+  INDEX `idx_Pedidos_mesa_estado_fecha` (`id_mesa` ASC, `estado` ASC, `fecha_creacion` ASC, `total_pedido` ASC),
+  INDEX `idx_Pedidos_mesero_estado` (`id_usuario_mesero` ASC, `estado` ASC),
+  INDEX `idx_Pedidos_estado_fecha` (`estado` ASC, `fecha_creacion` ASC),
   CONSTRAINT `fk_Pedidos_Usuarios1`
     FOREIGN KEY (`id_usuario_mesero`)
     REFERENCES `bars_db`.`Usuarios` (`id_usuario`)
@@ -188,6 +198,151 @@ CREATE TABLE IF NOT EXISTS `bars_db`.`Pagos` (
     REFERENCES `bars_db`.`Usuarios` (`id_usuario`)
     ON DELETE NO ACTION
     ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Valor_Inventario_Sede`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Valor_Inventario_Sede` (
+  `id_sede` INT NOT NULL,
+  `valor` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (`id_sede`),
+  CONSTRAINT `fk_Valor_Inventario_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Version_Menu_Sede`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Version_Menu_Sede` (
+  `id_sede` INT NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id_sede`),
+  CONSTRAINT `fk_Version_Menu_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Version_Pedidos_Sede`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Version_Pedidos_Sede` (
+  `id_sede` INT NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id_sede`),
+  CONSTRAINT `fk_Version_Pedidos_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Resumen_Ventas_Diarias`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Resumen_Ventas_Diarias` (
+  `fecha` DATE NOT NULL,
+  `id_sede` INT NOT NULL,
+  `id_producto` INT NOT NULL,
+  `cantidad` INT NOT NULL DEFAULT 0,
+  `ventas` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `costo` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `ganancia` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (`fecha`, `id_sede`, `id_producto`),
+  INDEX `fk_Resumen_Ventas_Sedes1_idx` (`id_sede` ASC),
+  INDEX `fk_Resumen_Ventas_Productos1_idx` (`id_producto` ASC),
+  CONSTRAINT `fk_Resumen_Ventas_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION,
+  CONSTRAINT `fk_Resumen_Ventas_Productos1`
+    FOREIGN KEY (`id_producto`)
+    REFERENCES `bars_db`.`Productos` (`id_producto`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Version_Ventas_Dia`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Version_Ventas_Dia` (
+  `fecha` DATE NOT NULL,
+  `id_sede` INT NOT NULL,
+  `version` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`fecha`, `id_sede`),
+  INDEX `fk_Version_Ventas_Dia_Sedes1_idx` (`id_sede` ASC),
+  CONSTRAINT `fk_Version_Ventas_Dia_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Turnos_Caja`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Turnos_Caja` (
+  `id_turno` INT NOT NULL AUTO_INCREMENT,
+  `estado` VARCHAR(10) NOT NULL DEFAULT 'abierto',
+  `fecha_apertura` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `fecha_cierre` DATETIME NULL,
+  `id_usuario_cajero` INT NOT NULL,
+  `id_sede` INT NULL,
+  PRIMARY KEY (`id_turno`),
+  INDEX `idx_Turnos_Caja_cajero_estado` (`id_usuario_cajero` ASC, `estado` ASC),
+  INDEX `fk_Turnos_Caja_Sedes1_idx` (`id_sede` ASC),
+  CONSTRAINT `fk_Turnos_Caja_Usuarios1`
+    FOREIGN KEY (`id_usuario_cajero`)
+    REFERENCES `bars_db`.`Usuarios` (`id_usuario`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION,
+  CONSTRAINT `fk_Turnos_Caja_Sedes1`
+    FOREIGN KEY (`id_sede`)
+    REFERENCES `bars_db`.`Sedes` (`id_sede`)
+    ON DELETE SET NULL
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Caja_Denominaciones`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Caja_Denominaciones` (
+  `id_turno` INT NOT NULL,
+  `valor` INT NOT NULL,
+  `cantidad` INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id_turno`, `valor`),
+  CONSTRAINT `fk_Caja_Denominaciones_Turnos1`
+    FOREIGN KEY (`id_turno`)
+    REFERENCES `bars_db`.`Turnos_Caja` (`id_turno`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Migraciones_Esquema`
+-- (las migraciones de app/migrations son idempotentes: en una base nueva solo se registran)
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Migraciones_Esquema` (
+  `version` VARCHAR(10) NOT NULL,
+  `descripcion` VARCHAR(150) NOT NULL,
+  `fecha_aplicada` DATETIME NOT NULL,
+  PRIMARY KEY (`version`));
+
+-- -----------------------------------------------------
+-- Table `bars_db`.`Claves_Idempotencia`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `bars_db`.`Claves_Idempotencia` (
+  `clave` VARCHAR(64) NOT NULL,
+  `tipo` VARCHAR(30) NOT NULL,
+  `resultado` TEXT NULL,
+  `fecha` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `id_usuario` INT NOT NULL,
+  PRIMARY KEY (`clave`),
+  INDEX `idx_Claves_Idempotencia_fecha` (`fecha` ASC),
+  INDEX `fk_Claves_Idempotencia_Usuarios1_idx` (`id_usuario` ASC),
+  CONSTRAINT `fk_Claves_Idempotencia_Usuarios1`
+    FOREIGN KEY (`id_usuario`)
+    REFERENCES `bars_db`.`Usuarios` (`id_usuario`)
+    ON DELETE CASCADE
+    ON UPDATE NO ACTION);
     
 -- INSERTAR DATOS INICIALES
 INSERT INTO Roles (nombre_rol) VALUES ('Administrador'), ('Cajero'), ('Mesero');
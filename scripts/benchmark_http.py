@@ -0,0 +1,102 @@
+# scripts/benchmark_http.py
+# Peticiones por segundo contra un servidor en marcha (gunicorn o flask run), con sesión
+# iniciada y conexiones keep-alive, en las rutas del mesero y del cajero.
+#
+#   python scripts/benchmark_http.py --usuario mesero1 --clave 123456 --rol 3 \
+#       --rutas /waiter/orders/ /api/v1/waiter/menu
+#   python scripts/benchmark_http.py --usuario cajero1 --clave 123456 --rol 2 --rutas /cashier/
+#
+# Cada hilo abre su propia sesión y su propia conexión, y repite las rutas en orden durante
+# --segundos. Solo se cuentan respuestas 200/304; una redirección al login cuenta como error.
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+RUTAS_POR_DEFECTO = ['/waiter/orders/', '/api/v1/waiter/tables', '/api/v1/waiter/menu', '/cashier/']
+
+
+class Cliente:
+    def __init__(self, servidor):
+        partes = urlsplit(servidor)
+        self.conexion = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+        self.cookie = None
+
+    def pedir(self, metodo, ruta, cuerpo=None):
+        cabeceras = {'Connection': 'keep-alive', 'Accept-Encoding': 'gzip'}
+        if cuerpo is not None:
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            cabeceras['Cookie'] = self.cookie
+        self.conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+        respuesta = self.conexion.getresponse()
+        respuesta.read()
+        galleta = respuesta.getheader('Set-Cookie')
+        if galleta:
+            self.cookie = galleta.split(';', 1)[0]
+        return respuesta.status
+
+    def iniciar_sesion(self, usuario, clave, rol):
+        cuerpo = urlencode({'username': usuario, 'password': clave, 'role': rol})
+        if self.pedir('POST', '/auth/login', cuerpo) != 302 or not self.cookie:
+            raise SystemExit('No se pudo iniciar sesión; revisa usuario, clave y rol.')
+
+
+def trabajar(args, fin, resultados, lock):
+    cliente = Cliente(args.servidor)
+    cliente.iniciar_sesion(args.usuario, args.clave, args.rol)
+    latencias = {ruta: [] for ruta in args.rutas}
+    errores = 0
+    while time.perf_counter() < fin:
+        for ruta in args.rutas:
+            inicio = time.perf_counter()
+            status = cliente.pedir('GET', ruta)
+            if status in (200, 304):
+                latencias[ruta].append(time.perf_counter() - inicio)
+            else:
+                errores += 1
+    with lock:
+        for ruta, valores in latencias.items():
+            resultados['latencias'][ruta].extend(valores)
+        resultados['errores'] += errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peticiones por segundo en las rutas del mesero y del cajero.')
+    parser.add_argument('--servidor', default='http://127.0.0.1:5000')
+    parser.add_argument('--usuario', required=True)
+    parser.add_argument('--clave', required=True)
+    parser.add_argument('--rol', required=True, help='id_rol del usuario (2 = Cajero, 3 = Mesero).')
+    parser.add_argument('--rutas', nargs='+', default=RUTAS_POR_DEFECTO)
+    parser.add_argument('--hilos', type=int, default=16, help='Clientes concurrentes.')
+    parser.add_argument('--segundos', type=float, default=20)
+    args = parser.parse_args()
+
+    resultados = {'latencias': {ruta: [] for ruta in args.rutas}, 'errores': 0}
+    lock = threading.Lock()
+    fin = time.perf_counter() + args.segundos
+    hilos = [threading.Thread(target=trabajar, args=(args, fin, resultados, lock)) for _ in range(args.hilos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    total = sum(len(v) for v in resultados['latencias'].values())
+    print(f'{args.servidor}: {args.hilos} clientes, {args.segundos:.0f} s, {total / args.segundos:.1f} peticiones/s '
+          f'({resultados["errores"]} errores)')
+    print(f'{"ruta":<32}{"req/s":>9}{"p50":>9}{"p95":>9}')
+    for ruta, valores in resultados['latencias'].items():
+        if not valores:
+            print(f'{ruta:<32}{"-":>9}')
+            continue
+        valores.sort()
+        p50 = statistics.median(valores) * 1000
+        p95 = valores[int(len(valores) * 0.95) - 1 if len(valores) > 1 else 0] * 1000
+        print(f'{ruta:<32}{len(valores) / args.segundos:>9.1f}{p50:>7.1f}ms{p95:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
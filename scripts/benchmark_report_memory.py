@@ -0,0 +1,88 @@
+# scripts/benchmark_report_memory.py
+# Verifica el techo de memoria de los escritores de reportes: alimenta generar_csv y
+# escribir_excel con filas sintéticas (sin base de datos) y reporta el pico de memoria.
+#
+#   python scripts/benchmark_report_memory.py                 # 1.000.000 filas
+#   python scripts/benchmark_report_memory.py -n 200000 --max-mb 64
+#
+# El pico de Python (tracemalloc) debe quedar plano al cambiar -n; si crece con las filas,
+# algún escritor está acumulando el reporte en memoria. Termina con código 1 si algún pico
+# supera --max-mb.
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.reports import generar_csv, escribir_excel, ENCABEZADOS_REPORTE # noqa: E402
+
+
+def filas_sinteticas(n):
+    """Filas con el mismo formato que fila_reporte, generadas una a una."""
+    inicio = datetime(2025, 1, 1)
+    for i in range(n):
+        cantidad = i % 7 + 1
+        costo = 1500 + i % 300
+        venta = costo * 2
+        yield [
+            (inicio + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M'),
+            f'P{i % 5000:05d}',
+            f'Producto sintético {i % 5000}',
+            cantidad,
+            f'{cantidad * costo:.2f}',
+            f'{cantidad * venta:.2f}',
+            f'{cantidad * (venta - costo):.2f}',
+            f'Sede {i % 4 + 1}',
+        ]
+
+
+def medir(nombre, funcion):
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    tamano = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    pico_mb = pico / (1024 * 1024)
+    print(f'{nombre:<6} {segundos:7.1f} s  pico Python {pico_mb:7.1f} MB  archivo {tamano / (1024 * 1024):8.1f} MB')
+    return pico_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de memoria de los escritores CSV y Excel.')
+    parser.add_argument('-n', type=int, default=1_000_000, help='Filas sintéticas.')
+    parser.add_argument('--max-mb', type=float, default=64, help='Pico de memoria de Python permitido por escritor.')
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directorio:
+        def csv_a_disco():
+            ruta = os.path.join(directorio, 'reporte.csv')
+            with open(ruta, 'wb') as f:
+                for bloque in generar_csv(filas_sinteticas(args.n), ENCABEZADOS_REPORTE):
+                    f.write(bloque)
+            return os.path.getsize(ruta)
+
+        def excel_a_disco():
+            ruta = os.path.join(directorio, 'reporte.xlsx')
+            escribir_excel(filas_sinteticas(args.n), ruta, ENCABEZADOS_REPORTE)
+            return os.path.getsize(ruta)
+
+        print(f'{args.n:,} filas sintéticas')
+        picos = [medir('csv', csv_a_disco), medir('excel', excel_a_disco)]
+    tracemalloc.stop()
+
+    # ru_maxrss está en KB en Linux
+    print(f'RSS máximo del proceso: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB')
+    if max(picos) > args.max_mb:
+        print(f'FALLA: un escritor superó {args.max_mb} MB')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# scripts/benchmark_startup.py
+# Mide el arranque de un worker: tiempo de importar el paquete app, de create_app() y de la
+# primera petición. Cada repetición corre en un proceso nuevo (como un worker de gunicorn
+# recién creado), así los módulos nunca están ya importados.
+#
+#   python scripts/benchmark_startup.py                  # 5 arranques, primera petición a /auth/login
+#   python scripts/benchmark_startup.py -n 10 --ruta /
+#   python scripts/benchmark_startup.py --importtime     # módulos que más tardan en importar
+#
+# Necesita las mismas variables de entorno que la app (MYSQL_*); la primera petición abre la
+# conexión a MySQL si la ruta consulta la base de datos.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta dentro de cada proceso hijo; imprime una línea JSON con los tiempos en ms
+_MEDICION = '''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+aplicacion = app.create_app()
+t2 = time.perf_counter()
+respuesta = aplicacion.test_client().get(sys.argv[1])
+t3 = time.perf_counter()
+print(json.dumps({
+    "importar": (t1 - t0) * 1000,
+    "create_app": (t2 - t1) * 1000,
+    "primera_peticion": (t3 - t2) * 1000,
+    "total": (t3 - t0) * 1000,
+    "status": respuesta.status_code,
+    "modulos": len(sys.modules),
+}))
+'''
+
+
+def medir(ruta):
+    salida = subprocess.run([sys.executable, '-c', _MEDICION, ruta], cwd=RAIZ,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def importaciones_lentas(limite):
+    """Módulos con mayor tiempo acumulado según python -X importtime."""
+    salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+                            cwd=RAIZ, capture_output=True, text=True, check=True)
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        # Formato: "import time: <propio> | <acumulado> | <modulo>" (microsegundos)
+        _, acumulado, modulo = linea[len('import time:'):].split('|')
+        filas.append((int(acumulado), modulo.strip()))
+    filas.sort(reverse=True)
+    return filas[:limite]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de un worker de la aplicación.')
+    parser.add_argument('-n', type=int, default=5, help='Arranques a medir (procesos nuevos).')
+    parser.add_argument('--ruta', default='/auth/login', help='Ruta de la primera petición.')
+    parser.add_argument('--importtime', action='store_true', help='Listar los módulos más lentos de importar.')
+    parser.add_argument('--json', action='store_true', help='Imprimir los resultados como JSON.')
+    args = parser.parse_args()
+
+    if args.importtime:
+        for acumulado, modulo in importaciones_lentas(20):
+            print(f'{acumulado / 1000:9.1f} ms  {modulo}')
+        return
+
+    medidas = [medir(args.ruta) for _ in range(args.n)]
+    campos = ('importar', 'create_app', 'primera_peticion', 'total')
+    resumen = {
+        campo: {
+            'min': min(m[campo] for m in medidas),
+            'mediana': statistics.median(m[campo] for m in medidas),
+            'max': max(m[campo] for m in medidas),
+        } for campo in campos
+    }
+    if args.json:
+        print(json.dumps({'ruta': args.ruta, 'arranques': args.n, 'resumen': resumen, 'medidas': medidas}))
+        return
+
+    print(f'{args.n} arranques, primera petición a {args.ruta} (status {medidas[0]["status"]}, '
+          f'{medidas[0]["modulos"]} módulos cargados)')
+    print(f'{"":<18}{"min":>10}{"mediana":>10}{"max":>10}')
+    for campo in campos:
+        r = resumen[campo]
+        print(f'{campo:<18}{r["min"]:>8.1f}ms{r["mediana"]:>8.1f}ms{r["max"]:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
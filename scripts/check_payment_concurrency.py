@@ -0,0 +1,136 @@
+# scripts/check_payment_concurrency.py
+# Cobros simultáneos de un mismo pedido contra un servidor en marcha: comprueba que queda un
+# solo Pago y que el resumen diario y el sello de ventas suben una sola vez.
+#
+#   python scripts/check_payment_concurrency.py --usuario cajero1 --clave 123456 --rol 2 \
+#       --mismo-token 12 --tokens-distintos 13 --hilos 10
+#
+# --mismo-token: N POST al cobro del pedido con el mismo token_pago (doble clic, reenvío).
+# --tokens-distintos: N POST con un token distinto cada uno (varias pestañas o cajeros).
+# Los pedidos deben estar abiertos, tener líneas y ser de la sede del cajero. Cada hilo tiene su
+# propia sesión y su propia conexión, y todos envían a la vez. Lee la base de datos (MYSQL_*)
+# antes y después para comparar. Termina con código 1 si alguna verificación falla.
+
+import argparse
+import os
+import sys
+import threading
+import uuid
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark_http import Cliente # noqa: E402  (scripts/ está en sys.path al ejecutar el script)
+from sqlalchemy import func # noqa: E402
+from app import create_app, db # noqa: E402
+from app.models.order import Pedido, DetallePedido # noqa: E402
+from app.models.payment import Pago # noqa: E402
+from app.models.sales_summary import ResumenVentaDiaria, VersionVentasDia # noqa: E402
+
+
+def estado_pedido(id_pedido):
+    """(pedido, pagos del pedido, unidades en el resumen del día, sello de ventas del día)."""
+    pedido = db.session.get(Pedido, id_pedido, populate_existing=True)
+    fecha, id_sede = pedido.fecha_creacion.date(), pedido.mesa.id_sede
+    productos = [d.id_producto for d in DetallePedido.query.filter_by(id_pedido=id_pedido).all()]
+    pagos = Pago.query.filter_by(id_pedido=id_pedido).count()
+    unidades = db.session.query(func.coalesce(func.sum(ResumenVentaDiaria.cantidad), 0)).filter(
+        ResumenVentaDiaria.fecha == fecha, ResumenVentaDiaria.id_sede == id_sede,
+        ResumenVentaDiaria.id_producto.in_(productos)
+    ).scalar()
+    sello = db.session.query(VersionVentasDia.version).filter_by(fecha=fecha, id_sede=id_sede).scalar() or 0
+    return pedido, pagos, int(unidades), sello
+
+
+def cobrar_a_la_vez(args, id_pedido, monto, tokens):
+    """Un POST por token, todos a la vez; devuelve los códigos HTTP."""
+    barrera = threading.Barrier(len(tokens))
+    codigos = []
+    lock = threading.Lock()
+
+    def cobrar(token):
+        cliente = Cliente(args.servidor)
+        cliente.iniciar_sesion(args.usuario, args.clave, args.rol)
+        cuerpo = urlencode({'metodo_pago': 'tarjeta', 'monto_recibido': str(monto), 'token_pago': token})
+        barrera.wait()
+        try:
+            codigo = cliente.pedir('POST', f'/cashier/order/{id_pedido}/register_payment', cuerpo)
+        except Exception as e:
+            codigo = repr(e)
+        with lock:
+            codigos.append(codigo)
+
+    hilos = [threading.Thread(target=cobrar, args=(token,)) for token in tokens]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return codigos
+
+
+def probar(app, args, nombre, id_pedido, tokens):
+    with app.app_context():
+        pedido, pagos_antes, unidades_antes, sello_antes = estado_pedido(id_pedido)
+        if pedido.estado in ('pagado', 'cancelado'):
+            raise SystemExit(f'El pedido {id_pedido} ya está {pedido.estado}; usa un pedido abierto.')
+        unidades_pedido = int(db.session.query(func.coalesce(func.sum(DetallePedido.cantidad), 0))
+                              .filter_by(id_pedido=id_pedido).scalar())
+        monto = pedido.total_pedido
+        db.session.remove()
+
+    codigos = cobrar_a_la_vez(args, id_pedido, monto, tokens)
+
+    with app.app_context():
+        pedido, pagos, unidades, sello = estado_pedido(id_pedido)
+        db.session.remove()
+
+    print(f'{nombre}: pedido {id_pedido}, {len(tokens)} POST, respuestas {sorted(map(str, codigos))}')
+    print(f'  pagos +{pagos - pagos_antes}, resumen +{unidades - unidades_antes} unidades '
+          f'(pedido: {unidades_pedido}), sello +{sello - sello_antes}, estado {pedido.estado}')
+
+    fallas = []
+    if any(not isinstance(c, int) or c >= 500 for c in codigos):
+        fallas.append('alguna petición falló con error del servidor')
+    if pagos - pagos_antes != 1:
+        fallas.append(f'se registraron {pagos - pagos_antes} pagos')
+    if unidades - unidades_antes != unidades_pedido:
+        fallas.append(f'el resumen diario subió {unidades - unidades_antes} unidades, esperado {unidades_pedido}')
+    if sello - sello_antes != 1:
+        fallas.append(f'el sello de ventas del día subió {sello - sello_antes} veces')
+    if pedido.estado != 'pagado':
+        fallas.append(f'el pedido quedó en estado "{pedido.estado}"')
+    return [f'{nombre}: {falla}' for falla in fallas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Un solo pago por pedido con cobros simultáneos.')
+    parser.add_argument('--servidor', default='http://127.0.0.1:5000')
+    parser.add_argument('--usuario', required=True)
+    parser.add_argument('--clave', required=True)
+    parser.add_argument('--rol', required=True, help='id_rol del usuario (2 = Cajero).')
+    parser.add_argument('--mismo-token', type=int, metavar='ID_PEDIDO', help='Pedido a cobrar N veces con un token.')
+    parser.add_argument('--tokens-distintos', type=int, metavar='ID_PEDIDO', help='Pedido a cobrar con N tokens.')
+    parser.add_argument('--hilos', type=int, default=10, help='POST simultáneos por pedido.')
+    args = parser.parse_args()
+    if args.mismo_token is None and args.tokens_distintos is None:
+        parser.error('indica --mismo-token, --tokens-distintos o ambos')
+
+    app = create_app()
+    fallas = []
+    if args.mismo_token is not None:
+        token = uuid.uuid4().hex
+        fallas += probar(app, args, 'mismo token', args.mismo_token, [token] * args.hilos)
+    if args.tokens_distintos is not None:
+        fallas += probar(app, args, 'tokens distintos', args.tokens_distintos,
+                         [uuid.uuid4().hex for _ in range(args.hilos)])
+
+    for falla in fallas:
+        print(f'FALLA: {falla}')
+    if fallas:
+        sys.exit(1)
+    print('OK: un pago y un incremento del resumen por pedido')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# scripts/check_query_budget.py
+# Hace cumplir el presupuesto de consultas de las pantallas de meseros y cajeros: muestra cada
+# una con pocas y con muchas mesas, pedidos y líneas, con SQL_QUERY_BUDGET_STRICT activo, y
+# verifica que el número de sentencias SQL sea el mismo (sin N+1) y no supere el presupuesto.
+#
+#   python scripts/check_query_budget.py --sede 1 --mesero 3 --cajero 2 --muchos 20
+#
+# Crea mesas, pedidos y líneas de prueba en la sede (sin tocar el inventario) y los borra al
+# terminar. El mesero y el cajero deben ser de esa sede, y la sede debe tener productos en su
+# inventario. Termina con código 1 si alguna pantalla falla.
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db # noqa: E402
+from app.models.branch import Mesa # noqa: E402
+from app.models.inventory import Inventario # noqa: E402
+from app.models.order import Pedido, DetallePedido # noqa: E402
+from app.utils.principal import cache_principales # noqa: E402
+from app.utils.query_budget import PresupuestoConsultasExcedido # noqa: E402
+
+
+def crear_datos(args, productos, mesas_libres, pedidos, lineas, creados):
+    """Mesas libres y mesas ocupadas con un pedido de 'lineas' líneas; devuelve (pedido, mesa) del último."""
+    for _ in range(mesas_libres):
+        mesa = Mesa(estado='libre', id_sede=args.sede)
+        db.session.add(mesa)
+        db.session.flush()
+        creados['mesas'].append(mesa.id_mesa)
+    pedido = mesa = None
+    for _ in range(pedidos):
+        mesa = Mesa(estado='ocupada', id_sede=args.sede)
+        db.session.add(mesa)
+        db.session.flush()
+        pedido = Pedido(estado='pendiente', total_pedido=0, id_usuario_mesero=args.mesero, id_mesa=mesa.id_mesa)
+        db.session.add(pedido)
+        db.session.flush()
+        creados['mesas'].append(mesa.id_mesa)
+        creados['pedidos'].append(pedido.id_pedido)
+        for producto in productos[:lineas]:
+            detalle = DetallePedido(cantidad=1, precio_unitario=producto.precio_venta, costo_unitario=producto.costo_compra,
+                                    subtotal=producto.precio_venta, id_pedido=pedido.id_pedido, id_producto=producto.id_producto)
+            db.session.add(detalle)
+            pedido.total_pedido += producto.precio_venta
+    db.session.commit()
+    return pedido.id_pedido, mesa.id_mesa
+
+
+def cliente(app, id_usuario):
+    c = app.test_client()
+    with c.session_transaction() as sesion:
+        sesion['_user_id'] = str(id_usuario) # Sesión de Flask-Login sin pasar por el formulario
+        sesion['_fresh'] = True
+    return c
+
+
+def sentencias(c, url):
+    """Sentencias SQL de la segunda petición a la URL (la primera calienta cachés), o un mensaje de falla."""
+    try:
+        c.get(url)
+        respuesta = c.get(url)
+    except PresupuestoConsultasExcedido as e:
+        return f'supera el presupuesto: {e}'
+    if respuesta.status_code != 200:
+        return f'respondió {respuesta.status_code}'
+    return int(respuesta.headers['X-SQL-Queries'])
+
+
+def medir(app, args, id_pedido, id_mesa):
+    mesero, cajero = cliente(app, args.mesero), cliente(app, args.cajero)
+    return {
+        'waiter_dashboard': sentencias(mesero, '/waiter/orders/'),
+        'view_order_details': sentencias(mesero, f'/waiter/orders/order/{id_pedido}/details'),
+        'cashier_dashboard': sentencias(cajero, '/cashier/'),
+        'view_order_for_payment': sentencias(cajero, f'/cashier/table/{id_mesa}/order_details'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentencias SQL fijas por pantalla, con pocos y muchos datos.')
+    parser.add_argument('--sede', type=int, required=True)
+    parser.add_argument('--mesero', type=int, required=True, help='id_usuario de un mesero de la sede.')
+    parser.add_argument('--cajero', type=int, required=True, help='id_usuario de un cajero de la sede.')
+    parser.add_argument('--muchos', type=int, default=20, help='Mesas, pedidos y líneas del escenario grande.')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.testing = True # Envía X-SQL-Queries y propaga PresupuestoConsultasExcedido
+    app.config['SQL_QUERY_BUDGET_STRICT'] = True
+    cache_principales.configurar(0) # Misma carga del usuario en cada petición
+
+    creados = {'mesas': [], 'pedidos': []}
+    try:
+        with app.app_context():
+            productos = [i.producto for i in Inventario.query.filter_by(id_sede=args.sede).limit(args.muchos).all()]
+            if not productos:
+                raise SystemExit(f'La sede {args.sede} no tiene productos en su inventario.')
+            pocos = medir(app, args, *crear_datos(args, productos, 1, 1, 1, creados))
+            muchos = medir(app, args, *crear_datos(args, productos, args.muchos, args.muchos, args.muchos, creados))
+    finally:
+        with app.app_context():
+            db.session.rollback()
+            if creados['pedidos']:
+                DetallePedido.query.filter(DetallePedido.id_pedido.in_(creados['pedidos'])).delete(synchronize_session=False)
+                Pedido.query.filter(Pedido.id_pedido.in_(creados['pedidos'])).delete(synchronize_session=False)
+            if creados['mesas']:
+                Mesa.query.filter(Mesa.id_mesa.in_(creados['mesas'])).delete(synchronize_session=False)
+            db.session.commit()
+
+    fallas = []
+    for vista in pocos:
+        antes, despues = pocos[vista], muchos[vista]
+        print(f'{vista:<24} pocos: {antes}  muchos: {despues}')
+        if isinstance(antes, str) or isinstance(despues, str):
+            fallas.append(f'{vista}: {antes if isinstance(antes, str) else despues}')
+        elif antes != despues:
+            fallas.append(f'{vista}: {antes} sentencias con pocos datos y {despues} con muchos (N+1)')
+
+    for falla in fallas:
+        print(f'FALLA: {falla}')
+    if fallas:
+        sys.exit(1)
+    print('OK: todas las pantallas ejecutan las mismas sentencias con pocos y muchos datos')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# scripts/check_report_cache.py
+# Comprueba que un pago registrado en OTRO proceso invalida la caché de reportes de este.
+#
+#   python scripts/check_report_cache.py --sede 1 --fecha 2025-01-15
+#
+# Guarda un reporte en la caché de este proceso con el sello actual, aumenta el sello del día
+# desde un proceso hijo (lo mismo que hace registrar_pago en otro worker) y verifica que la
+# entrada ya no se sirve. Necesita la base de datos configurada (MYSQL_*); solo modifica
+# Version_Ventas_Dia. Termina con código 1 si la entrada sigue sirviéndose.
+
+import argparse
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from app import create_app, db # noqa: E402
+from app.utils.report_cache import cache_reportes, version_ventas # noqa: E402
+
+# Proceso hijo: un "pago" en otro worker (solo el sello, en su propia transacción)
+_PAGO_EN_OTRO_PROCESO = '''
+import sys
+from datetime import date
+from app import create_app, db
+from app.utils.report_cache import incrementar_version_ventas
+app = create_app()
+with app.app_context():
+    incrementar_version_ventas(int(sys.argv[1]), date.fromisoformat(sys.argv[2]))
+    db.session.commit()
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Invalidación de la caché de reportes entre procesos.')
+    parser.add_argument('--sede', type=int, required=True)
+    parser.add_argument('--fecha', required=True, help='Día del pago simulado (YYYY-MM-DD).')
+    args = parser.parse_args()
+
+    dia = datetime.strptime(args.fecha, '%Y-%m-%d')
+    fecha_inicio, fecha_fin = dia, dia + timedelta(days=1) - timedelta(seconds=1)
+    clave = cache_reportes.clave('detalle', 'csv', fecha_inicio, fecha_fin, args.sede)
+
+    app = create_app()
+    with app.app_context():
+        version = version_ventas(fecha_inicio, fecha_fin, args.sede)
+        cache_reportes.guardar(clave, b'reporte de prueba', version)
+        assert cache_reportes.obtener(clave, version) == b'reporte de prueba', 'la entrada recién guardada no se sirve'
+
+    subprocess.run([sys.executable, '-c', _PAGO_EN_OTRO_PROCESO, str(args.sede), args.fecha], cwd=RAIZ, check=True)
+
+    # Nuevo contexto (nueva transacción): como la siguiente petición a este worker
+    with app.app_context():
+        nueva = version_ventas(fecha_inicio, fecha_fin, args.sede)
+        contenido = cache_reportes.obtener(clave, nueva)
+        db.session.remove()
+
+    print(f'sello antes {version}, después {nueva}')
+    if contenido is not None:
+        print('FALLA: la caché siguió sirviendo el reporte después del pago en otro proceso')
+        sys.exit(1)
+    print('OK: el pago en otro proceso invalidó el reporte en caché')
+
+
+if __name__ == '__main__':
+    main()
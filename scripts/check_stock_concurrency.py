@@ -0,0 +1,121 @@
+# scripts/check_stock_concurrency.py
+# Pedidos en paralelo contra las últimas unidades de un producto: comprueba que no se vende
+# más de lo que hay (oversell) y que no se pierden actualizaciones del pedido ni del stock.
+#
+#   python scripts/check_stock_concurrency.py --sede 1 --producto 4 --pedido 12 --stock 5 --hilos 20
+#
+# Pone el stock del producto en la sede en --stock (y lo desbloquea), y lanza --hilos hilos que
+# a la vez añaden 1 unidad al pedido con agregar_lineas_pedido + ejecutar_con_reintentos, cada
+# uno con su propia conexión. El pedido debe estar abierto ('pendiente' o 'en_preparacion').
+# Mide el tiempo de la ronda (pedidos por segundo) y cuenta las transacciones repetidas por
+# deadlock (1213) o espera de bloqueo (1205) en ejecutar_con_reintentos.
+# Usar en una base de pruebas: modifica el inventario y el pedido. Termina con código 1 si
+# alguna verificación falla.
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db # noqa: E402
+from app.models.inventory import Inventario # noqa: E402
+from app.models.order import Pedido, DetallePedido # noqa: E402
+from app.utils.inventory import ejecutar_con_reintentos, contador_reintentos, StockInsuficienteError # noqa: E402
+from app.utils.orders import agregar_lineas_pedido # noqa: E402
+
+
+def estado_actual(args):
+    item = Inventario.query.filter_by(id_sede=args.sede, id_producto=args.producto).one()
+    pedido = db.session.get(Pedido, args.pedido)
+    detalle = DetallePedido.query.filter_by(id_pedido=args.pedido, id_producto=args.producto).first()
+    return item.cantidad, item.esta_bloqueado, pedido.total_pedido, detalle.cantidad if detalle else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sobreventa y actualizaciones perdidas con pedidos simultáneos.')
+    parser.add_argument('--sede', type=int, required=True)
+    parser.add_argument('--producto', type=int, required=True)
+    parser.add_argument('--pedido', type=int, required=True, help='Pedido abierto de una mesa de la sede.')
+    parser.add_argument('--stock', type=int, default=5, help='Unidades disponibles al empezar.')
+    parser.add_argument('--hilos', type=int, default=20, help='Pedidos simultáneos de 1 unidad.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        Inventario.query.filter_by(id_sede=args.sede, id_producto=args.producto)\
+            .update({Inventario.cantidad: args.stock, Inventario.esta_bloqueado: False})
+        db.session.commit()
+        _, _, total_antes, lineas_antes = estado_actual(args)
+        precio = Inventario.query.filter_by(id_sede=args.sede, id_producto=args.producto).one().producto.precio_venta
+        db.session.remove()
+
+    inicio = {}
+    # El reloj arranca cuando todos los hilos ya cargaron el pedido y pasan la barrera juntos
+    barrera = threading.Barrier(args.hilos, action=lambda: inicio.setdefault('t', time.perf_counter()))
+    resultados = {'vendidas': 0, 'sin_stock': 0, 'errores': []}
+    lock = threading.Lock()
+
+    def pedir():
+        with app.app_context():
+            pedido = db.session.get(Pedido, args.pedido)
+            barrera.wait() # Todos los hilos intentan a la vez
+            try:
+                ejecutar_con_reintentos(lambda: agregar_lineas_pedido(pedido, [(args.producto, 1)]))
+                clave = 'vendidas'
+            except StockInsuficienteError:
+                clave = 'sin_stock'
+            except Exception as e:
+                with lock:
+                    resultados['errores'].append(repr(e))
+                return
+            finally:
+                db.session.remove()
+            with lock:
+                resultados[clave] += 1
+
+    hilos = [threading.Thread(target=pedir) for _ in range(args.hilos)]
+    reintentos_antes = contador_reintentos.estadisticas()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio['t']
+    reintentos = {clave: valor - reintentos_antes[clave] for clave, valor in contador_reintentos.estadisticas().items()}
+
+    with app.app_context():
+        cantidad, bloqueado, total_despues, lineas_despues = estado_actual(args)
+
+    vendidas = resultados['vendidas']
+    print(f'vendidas {vendidas}, sin stock {resultados["sin_stock"]}, errores {len(resultados["errores"])}')
+    print(f'{args.hilos} pedidos en {segundos:.3f} s ({args.hilos / segundos:.1f} pedidos/s); '
+          f'reintentos: {reintentos["deadlocks_1213"]} por deadlock, {reintentos["esperas_bloqueo_1205"]} por '
+          f'espera de bloqueo, {reintentos["agotados"]} agotados')
+    print(f'stock final {cantidad} (bloqueado: {bloqueado}), líneas del pedido +{lineas_despues - lineas_antes}, '
+          f'total del pedido +{total_despues - total_antes}')
+
+    fallas = []
+    if resultados['errores']:
+        fallas.append(f'errores inesperados: {resultados["errores"][:3]}')
+    if vendidas != min(args.stock, args.hilos):
+        fallas.append(f'se vendieron {vendidas} de {args.stock} unidades disponibles')
+    if cantidad != args.stock - vendidas or cantidad < 0:
+        fallas.append(f'stock final {cantidad}, esperado {args.stock - vendidas} (actualización perdida o sobreventa)')
+    if lineas_despues - lineas_antes != vendidas:
+        fallas.append('la cantidad de la línea del pedido no coincide con las unidades vendidas')
+    if total_despues - total_antes != vendidas * precio:
+        fallas.append('el total del pedido no coincide con las unidades vendidas')
+    if cantidad == 0 and not bloqueado:
+        fallas.append('el producto llegó a cero y no quedó bloqueado')
+
+    for falla in fallas:
+        print(f'FALLA: {falla}')
+    if fallas:
+        sys.exit(1)
+    print('OK: sin sobreventa ni actualizaciones perdidas')
+
+
+if __name__ == '__main__':
+    main()
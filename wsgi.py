@@ -0,0 +1,15 @@
+# wsgi.py
+# Punto de entrada de producción: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Con preload_app (gunicorn.conf.py) este módulo se importa una vez en el proceso maestro y los
+# workers se crean con fork: comparten las páginas de memoria del código, las plantillas
+# compiladas y los mappers del ORM ya configurados.
+
+from sqlalchemy.orm import configure_mappers
+
+from app import create_app
+
+app = create_app()
+
+# Resuelve ahora las relaciones entre modelos (lo haría la primera consulta de cada worker)
+configure_mappers()